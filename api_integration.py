@@ -4,31 +4,52 @@ import os
 import sys
 import json
 import uuid
+import time
 import asyncio
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, Body, HTTPException
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Query, Body, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-# Redis is optional - only import if available
-try:
-    import redis
-    REDIS_AVAILABLE = True
-except ImportError:
-    REDIS_AVAILABLE = False
-
 # Add pharma_agents to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'pharma_agents'))
-from pharma_agents.master_agent import MasterAgent
+# MasterAgent (LangGraph / LangChain) is imported on the first analysis, see warmup()
 from pharma_agents.config import settings
+from admission import AdmissionController, AdmissionRejected, client_key
+from llm_client import GroqLLM, stream_tokens, token_source
+from pharma_agents.entity_resolver import canonical_molecule_id
+from orchestration_queue import ORCHESTRATION_CONCURRENCY, JobQueue, JobWorker, job_info, run_in_thread
+from dossier import build_dossier
+from http_encoding import FastJSONResponse, ResponseEncodingMiddleware, dumps, is_not_modified, loads
+from portfolio import PORTFOLIO_MAX_CANDIDATES, rank_candidates
+from report_jobs import ReportQueueFull
+from report_store import decode_cursor, encode_cursor
+from session_events import EVENT_LOG_SESSIONS, create_session_events
+from session_retrieval import RETRIEVAL_TOP_K, RetrievalCache, build_index
+from session_store import SessionWaiters, create_session_store
+from tabular_export import ExportFormatUnavailable, export_response
+from ws_fanout import SessionFanout
 
 load_dotenv()
 
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))   # comment line when a stream is idle
+SSE_RETRY_MS = 3000
+TOKEN_FLUSH_S = float(os.getenv("TOKEN_FLUSH_S", "0.1"))  # streamed LLM tokens are broadcast in batches this often
+SESSION_LONG_POLL_MAX_S = float(os.getenv("SESSION_LONG_POLL_MAX_S", "55"))  # cap for ?wait=, under proxy timeouts
+# The web process consumes orchestration jobs itself unless ORCHESTRATION_INLINE=0
+# (then run `python orchestration_worker.py` processes next to it)
+ORCHESTRATION_INLINE = os.getenv("ORCHESTRATION_INLINE", "1") == "1"
+
 # Initialize FastAPI app
-app = FastAPI(title="PharmaVerse API Integration")
+app = FastAPI(title="PharmaVerse API Integration", default_response_class=FastJSONResponse)
+
+# orjson bodies, msgpack via Accept and br/gzip via Accept-Encoding
+app.add_middleware(ResponseEncodingMiddleware, minimum_size=1024)
 
 # CORS middleware
 app.add_middleware(
@@ -39,15 +60,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session storage (use Redis in production)
-sessions: Dict[str, Dict[str, Any]] = {}
-active_websockets: Dict[str, List[WebSocket]] = {}
+# Session storage: in-memory LRU + TTL, SQLite or Redis (SESSION_STORE, see session_store.py)
+sessions = create_session_store()
+# Long-poll requests parked until their session's version changes
+session_waiters = SessionWaiters(sessions)
+# WebSocket clients per session, each with its own bounded send queue (see ws_fanout.py)
+ws_fanout = SessionFanout()
+# Sequence-numbered broadcast history per session, replayed to reconnecting clients.
+# With a shared backend (EVENT_BUS, defaults to SESSION_STORE) it is also the
+# pub/sub channel between worker processes: every event, from whichever worker
+# runs the orchestration, reaches this worker's WebSocket / SSE / long-poll clients.
+session_events = create_session_events()
+session_events.subscribe(ws_fanout.broadcast)
+session_events.subscribe(lambda session_id, event: session_waiters.notify(session_id))
+# Orchestrations are jobs in a durable queue (SQLite, see orchestration_queue.py)
+orchestration_jobs = JobQueue()
+inline_worker: Optional[JobWorker] = None
+# Per-client rate, LLM token budget and queue depth checks in front of the queue (see admission.py)
+admission = AdmissionController()
+# BM25 index over each completed session's summaries and raw results, for follow-up chat
+retrieval = RetrievalCache()
 
-# Import report_storage from mock_api if available
+# Import the report index (SQLite, see report_store.py) from mock_api if available
 try:
-    from mock_api import report_storage
+    from mock_api import CHART_BACKENDS, report_storage, submit_portfolio_report
 except ImportError:
-    report_storage: Dict[str, Dict[str, Any]] = {}
+    report_storage = None
+    submit_portfolio_report = None
+    CHART_BACKENDS = ()
 
 # ============================================================================
 # Pydantic Models
@@ -59,49 +99,140 @@ class OrchestrateRequest(BaseModel):
     geography: Optional[str] = "Global"
     timeframe: Optional[str] = "2024-2026"
     strategic_question: Optional[str] = ""
+    priority: Optional[int] = 0   # higher runs first when orchestrations are queued
 
 class ChatRequest(BaseModel):
     session_id: str
     message: str
 
+class PortfolioCandidate(BaseModel):
+    molecule: str
+    indication: Optional[str] = None
+
+class PortfolioRequest(BaseModel):
+    title: Optional[str] = "Portfolio Review"
+    session_ids: List[str] = []
+    candidates: List[PortfolioCandidate] = []
+    chart_backend: Optional[str] = None
+
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
+def new_master_agent():
+    """MasterAgent, imported on first use - LangGraph and LangChain are slow to import"""
+    from pharma_agents.master_agent import MasterAgent
+    return MasterAgent()
+
+
+def warmup() -> None:
+    """Import the agent workflow stack ahead of the first analysis"""
+    started = time.perf_counter()
+    import langchain_groq  # noqa: F401
+    import pharma_agents.master_agent  # noqa: F401
+    print(f"[WARMUP] agent stack loaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+@app.on_event("startup")
+async def start_shared_state() -> None:
+    """Startup: receive other workers' session events on this event loop, consume orchestration jobs"""
+    global inline_worker
+    session_events.start(asyncio.get_running_loop())
+    if session_events.shared or sessions.shared:
+        print(f"[WORKER] sessions: {sessions.backend}, events: {session_events.backend}")
+    if ORCHESTRATION_INLINE and inline_worker is None:
+        inline_worker = JobWorker(orchestration_jobs, run_orchestration_job, ORCHESTRATION_CONCURRENCY)
+        app.state.orchestration_worker_task = asyncio.create_task(inline_worker.run())
+
+@app.on_event("shutdown")
+async def stop_shared_state() -> None:
+    # Unfinished orchestrations go back to the queue for the next worker
+    if inline_worker is not None:
+        await inline_worker.stop()
+    session_events.stop()
+
+
 def get_session(session_id: str) -> Dict[str, Any]:
     """Get session data"""
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return sessions[session_id]
+    return session
 
-def store_session(session_id: str, data: Dict[str, Any]):
-    """Store session data"""
-    sessions[session_id] = {
-        **data,
-        "updated_at": datetime.now().isoformat()
+def _session_keys(molecule: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Secondary index entries for a session, see sessions.find"""
+    return {
+        "molecule": canonical_molecule_id(molecule.get("name")),
+        "indication": (molecule.get("indication") or "").strip().lower() or None,
     }
 
+def store_session(session_id: str, data: Dict[str, Any]):
+    """Store a new session (later writes go through sessions.update / set_item / append)"""
+    sessions.create(session_id, data, keys=_session_keys(data.get("molecule", {})))
+
 async def broadcast_to_session(session_id: str, message: Dict[str, Any]):
-    """Broadcast message to all WebSocket connections for a session"""
-    if session_id in active_websockets:
-        disconnected = []
-        for ws in active_websockets[session_id]:
-            try:
-                await ws.send_json(message)
-            except:
-                disconnected.append(ws)
-        
-        # Remove disconnected websockets
-        for ws in disconnected:
-            active_websockets[session_id].remove(ws)
+    """
+    Log a message with the session's next seq and the patch to its state
+    since the previous one, then queue it for every WebSocket client
+    (never waits on a client). The store read and the log write run on the
+    event log's writer thread.
+    """
+    await session_events.append_async(session_id, message, lambda: _changed_snapshot(session_id))
+
+SNAPSHOT_FIELDS = ("version", "molecule", "status", "plan", "agent_results", "final_answer", "chat_history")
+_snapshot_versions: "OrderedDict[str, int]" = OrderedDict()   # writer thread only
+
+def _changed_snapshot(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The session's snapshot for the next event, or None (no patch) if the
+    session is gone or its version hasn't moved since the last snapshot
+    """
+    version = sessions.version(session_id)
+    if version is None or _snapshot_versions.get(session_id) == version:
+        return None
+    session = sessions.get(session_id, fields=SNAPSHOT_FIELDS)
+    if session is None:
+        return None
+    _snapshot_versions[session_id] = session.get("version", version)
+    _snapshot_versions.move_to_end(session_id)
+    while len(_snapshot_versions) > EVENT_LOG_SESSIONS:
+        _snapshot_versions.popitem(last=False)
+    return _session_snapshot(session)
+
+def _session_snapshot(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Session state without the raw agent payloads (those stay behind GET /api/session/{id})"""
+    agent_results = session.get("agent_results", {})
+    return {
+        "molecule": session.get("molecule", {}),
+        "status": session.get("status", "processing"),
+        "plan": session.get("plan", {}),
+        "agent_results": {
+            agent: {"summary": result.get("summary", "")} for agent, result in agent_results.items()
+        },
+        "progress": len(agent_results) / 6 * 100,
+        "final_answer": session.get("final_answer", ""),
+        "chat_history": session.get("chat_history", []),
+    }
 
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
 @app.post("/api/orchestrate")
-async def orchestrate(request: OrchestrateRequest):
+async def orchestrate(request: OrchestrateRequest, http_request: Request):
     """Handle 'Launch Agent Run' from Case Setup Screen"""
+    # Shed load before creating anything: 429 for a client over its rate, 503 when the queue is too deep
+    queue_stats = await asyncio.to_thread(orchestration_jobs.stats)
+    try:
+        admitted = admission.admit_job(
+            client_key(http_request.headers, http_request.client.host if http_request.client else None),
+            queue_stats["queued"],
+            queue_stats["running"],
+            max(ORCHESTRATION_CONCURRENCY, queue_stats["running"]),
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.body(), headers=e.headers())
+
     session_id = str(uuid.uuid4())
     
     # Build user query from form data
@@ -128,35 +259,218 @@ async def orchestrate(request: OrchestrateRequest):
         "chat_history": [],
         "created_at": datetime.now().isoformat()
     }
-    store_session(session_id, session_data)
-    
-    # Run agents asynchronously
-    asyncio.create_task(run_agents_async(session_id, user_query))
+    payload = {
+        "session_id": session_id,
+        "user_query": user_query,
+        "session": session_data,
+        "admission": admission.instance_id,
+    }
+    try:
+        store_session(session_id, session_data)
+
+        # Queue the run; a worker (this process or orchestration_worker.py) picks it up
+        job = await asyncio.to_thread(orchestration_jobs.enqueue, "orchestration", payload, request.priority or 0)
+    except BaseException:
+        _refund_admission(payload)
+        raise
+    if inline_worker is not None:
+        inline_worker.wake()
     
     return {
         "session_id": session_id,
         "status": "processing",
-        "agents_launched": ["iqvia", "exim", "patents", "trials", "internal", "web"]
+        "agents_launched": ["iqvia", "exim", "patents", "trials", "internal", "web"],
+        "job_id": job["job_id"],
+        "queue_position": orchestration_jobs.position(job),
+        "job_url": f"/api/jobs/{job['job_id']}",
+        **admitted,
     }
 
+def _refund_admission(payload: Dict[str, Any]) -> None:
+    """Give back the LLM budget `orchestrate` reserved for a job, if this process reserved it"""
+    if payload.get("admission") == admission.instance_id:
+        admission.refund_job()
+
+async def run_orchestration_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """JobWorker handler: run one queued orchestration (again, on a retry)"""
+    payload = job["payload"]
+    session_id = payload["session_id"]
+    llm_called = asyncio.Event()
+    try:
+        if await asyncio.to_thread(sessions.version, session_id) is None:
+            # Expired, or lost with an in-memory store across a restart
+            await asyncio.to_thread(store_session, session_id, payload["session"])
+        elif job["attempts"] > 1:
+            await asyncio.to_thread(sessions.update, session_id, status="processing")
+            await broadcast_to_session(session_id, {
+                "type": "chat_message",
+                "sender": "master",
+                "message": f"Retrying the analysis (attempt {job['attempts']} of {job['max_attempts']})..."
+            })
+        started = time.monotonic()
+        await run_agents_async(session_id, payload["user_query"], raise_errors=True, llm_called=llm_called)
+    except Exception:
+        # The reservation covers the first attempt; it is unused if that never reached the LLM
+        if job["attempts"] == 1 and not llm_called.is_set():
+            _refund_admission(payload)
+        raise
+    admission.job_finished(time.monotonic() - started)
+    session = await asyncio.to_thread(sessions.get, session_id, fields=("status",))
+    return {"session_id": session_id, "status": (session or {}).get("status")}
+
+@app.get("/api/jobs/stats")
+async def orchestration_job_stats():
+    """Orchestration queue depth by status, and this process's worker"""
+    return {
+        **await asyncio.to_thread(orchestration_jobs.stats),
+        "inline_worker": inline_worker.info() if inline_worker is not None else None,
+    }
+
+@app.get("/api/admission/stats")
+async def admission_stats():
+    """Orchestrations accepted / queued / rejected (by reason) by this process, and its limits"""
+    return admission.stats()
+
+@app.get("/api/jobs")
+async def list_orchestration_jobs(
+    status: Optional[str] = Query(None, description="queued, running, completed, failed or cancelled"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Recent orchestration jobs, newest first"""
+    jobs = await asyncio.to_thread(orchestration_jobs.list, status, limit)
+    return {"jobs": [job_info(orchestration_jobs, job) for job in jobs]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_orchestration_job(job_id: str):
+    """Status of one orchestration job: position while queued, attempts, worker, error"""
+    job = await asyncio.to_thread(orchestration_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_info(orchestration_jobs, job)
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_orchestration_job(job_id: str):
+    """Cancel a job that hasn't started"""
+    if not await asyncio.to_thread(orchestration_jobs.cancel, job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued")
+    job = await asyncio.to_thread(orchestration_jobs.get, job_id)
+    if job["attempts"] == 0:
+        _refund_admission(job["payload"])   # never ran, so its LLM budget was never used
+    session_id = job["payload"]["session_id"]
+    try:
+        await asyncio.to_thread(sessions.update, session_id, status="cancelled")
+    except KeyError:
+        pass   # expired meanwhile
+    return job_info(orchestration_jobs, job)
+
+async def _read_if_modified(
+    request: Request, session_id: str, wait: float, fields: Optional[Tuple[str, ...]] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[Response]]:
+    """
+    (session, None) when the client needs a body, (None, 304 response) when
+    its If-None-Match still names the current version - after parking up
+    to `wait` seconds for a change - and (None, None) for unknown sessions.
+    """
+    fields = fields + ("version",) if fields is not None else None
+    session = await asyncio.to_thread(sessions.get, session_id, fields=fields)
+    if session is None:
+        return None, None
+    version = session["version"]
+    if is_not_modified(request.headers, f'"v{version}"', "") and wait > 0:
+        changed = await session_waiters.wait_for_change(session_id, version, min(wait, SESSION_LONG_POLL_MAX_S))
+        if changed != version:
+            session = await asyncio.to_thread(sessions.get, session_id, fields=fields)
+            if session is None:
+                return None, None
+            version = session["version"]
+    if is_not_modified(request.headers, f'"v{version}"', ""):
+        return None, Response(status_code=304, headers=_session_cache_headers(version))
+    return session, None
+
+def _session_cache_headers(version: int) -> Dict[str, str]:
+    # Weak: the same version may go out gzip/br/msgpack encoded
+    return {"ETag": f'W/"v{version}"', "Cache-Control": "no-cache"}
+
+class _TokenForwarder:
+    """
+    Token sink for a session's analysis. Runs on the agent thread and hands
+    batches of tokens (every TOKEN_FLUSH_S) to the event loop as `token`
+    events, so clients see summaries and the final answer as they are written.
+    """
+
+    def __init__(self, session_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.session_id = session_id
+        self.loop = loop
+        self.agent = "master"
+        self.source: Optional[str] = None
+        self.pending: List[str] = []
+        self.last_flush = time.monotonic()
+
+    def __call__(self, source: str, token: str) -> None:
+        if source != self.source:
+            self.flush()
+            self.source = source
+        self.pending.append(token)
+        if time.monotonic() - self.last_flush >= TOKEN_FLUSH_S:
+            self.flush()
+
+    def flush(self) -> None:
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        message = {"type": "token", "agent": self.agent, "source": self.source, "text": "".join(self.pending)}
+        self.pending = []
+        self.loop.call_soon_threadsafe(_broadcast_token, self.session_id, message)
+
+def _broadcast_token(session_id: str, message: Dict[str, Any]) -> None:
+    # Logged for replay, but without a state patch: tokens don't change session state
+    session_events.append_async(session_id, message)
+
+async def _run_streaming(forwarder: _TokenForwarder, agent: str, fn, *args):
+    """Run a blocking agent call off the event loop, forwarding its LLM tokens"""
+    forwarder.agent = agent
+
+    def run():
+        with stream_tokens(forwarder):
+            try:
+                return fn(*args)
+            finally:
+                forwarder.flush()
+
+    # A cancelled job (lost lease, shutdown) waits here until the agent's thread returns
+    return await run_in_thread(run)
+
 @app.get("/api/session/{session_id}/status")
-async def get_session_status(session_id: str):
-    """Get session status for polling"""
-    if session_id not in sessions:
+async def get_session_status(
+    session_id: str,
+    request: Request,
+    wait: float = Query(0, ge=0, description="Long-poll: with If-None-Match, wait up to this many seconds for a change"),
+):
+    """Get session status for polling (ETag / 304, optional long-poll)"""
+    session, not_modified = await _read_if_modified(request, session_id, wait, ("status", "agent_results"))
+    if not_modified is not None:
+        return not_modified
+    if session is None:
         return {"status": "not_found"}
-    session = sessions[session_id]
-    return {
+    return FastJSONResponse({
         "status": session.get("status", "processing"),
         "agent_results": list(session.get("agent_results", {}).keys()),
         "progress": len(session.get("agent_results", {})) / 6 * 100
-    }
+    }, headers=_session_cache_headers(session["version"]))
 
-async def run_agents_async(session_id: str, user_query: str):
-    """Run agents asynchronously and emit updates"""
+async def run_agents_async(
+    session_id: str, user_query: str, raise_errors: bool = False, llm_called: Optional[asyncio.Event] = None
+):
+    """
+    Run agents asynchronously and emit updates (`raise_errors`: re-raise after
+    reporting, so the job is retried; `llm_called` is set before the first LLM call)
+    """
     try:
         # Small delay to ensure session is stored
         await asyncio.sleep(0.1)
-        master = MasterAgent()
+        # First use imports LangGraph / LangChain - keep that off the event loop
+        master = await run_in_thread(new_master_agent)
+        forwarder = _TokenForwarder(session_id, asyncio.get_running_loop())
         
         # Send initial message
         await broadcast_to_session(session_id, {
@@ -191,11 +505,11 @@ async def run_agents_async(session_id: str, user_query: str):
             "final_answer": "",
             "report": {}
         }
-        plan_state = master._plan_agents(temp_state)
+        if llm_called is not None:
+            llm_called.set()
+        plan_state = await run_in_thread(master._plan_agents, temp_state)
         plan = plan_state["plan"]
-        session = get_session(session_id)
-        session["plan"] = plan
-        store_session(session_id, session)
+        await asyncio.to_thread(sessions.update, session_id, plan=plan)
         
         # Step 2: Run workers
         worker_results = []
@@ -242,30 +556,29 @@ async def run_agents_async(session_id: str, user_query: str):
             
             try:
                 # Run the appropriate agent
+                # (off the event loop, summary tokens streamed to clients as they arrive)
                 if agent_key == "iqvia":
-                    result = master.iqvia_agent.run(context)
+                    result = await _run_streaming(forwarder, agent_key, master.iqvia_agent.run, context)
                 elif agent_key == "exim":
                     exim_query = context
                     if plan.get("molecule"):
                         exim_query += f"\nProduct: {plan['molecule']} API"
-                    result = master.exim_agent.run(exim_query)
+                    result = await _run_streaming(forwarder, agent_key, master.exim_agent.run, exim_query)
                 elif agent_key == "patents":
-                    result = master.patent_agent.run(context)
+                    result = await _run_streaming(forwarder, agent_key, master.patent_agent.run, context)
                 elif agent_key == "trials":
-                    result = master.ct_agent.run(context)
+                    result = await _run_streaming(forwarder, agent_key, master.ct_agent.run, context)
                 elif agent_key == "internal":
-                    result = master.internal_agent.run(context)
+                    result = await _run_streaming(forwarder, agent_key, master.internal_agent.run, context)
                 elif agent_key == "web":
-                    result = master.web_agent.run(context)
+                    result = await _run_streaming(forwarder, agent_key, master.web_agent.run, context)
                 else:
                     continue
                 
                 worker_results.append(result)
                 
                 # Update session
-                session = get_session(session_id)
-                session["agent_results"][agent_key] = result
-                store_session(session_id, session)
+                await asyncio.to_thread(sessions.set_item, session_id, "agent_results", agent_key, result)
                 
                 # Send completion update
                 await broadcast_to_session(session_id, {
@@ -304,7 +617,7 @@ async def run_agents_async(session_id: str, user_query: str):
                 })
         
         # Step 3: Generate final answer
-        final_answer_state = master._generate_final_answer({
+        final_answer_state = await _run_streaming(forwarder, "master", master._generate_final_answer, {
             "user_query": user_query,
             "plan": plan,
             "worker_results": worker_results,
@@ -313,12 +626,26 @@ async def run_agents_async(session_id: str, user_query: str):
         })
         
         # Update session with final answer
-        session = get_session(session_id)
-        session["final_answer"] = final_answer_state["final_answer"]
-        session["worker_results"] = worker_results
-        session["status"] = "completed"
-        store_session(session_id, session)
+        await asyncio.to_thread(
+            sessions.update,
+            session_id,
+            final_answer=final_answer_state["final_answer"],
+            worker_results=worker_results,
+            status="completed",
+        )
         
+        await broadcast_to_session(session_id, {
+            "type": "final_answer",
+            "message": final_answer_state["final_answer"]
+        })
+
+        # Materialize the dossier and index the results now, so the first
+        # dossier view or follow-up question doesn't pay for it
+        completed = await asyncio.to_thread(sessions.get, session_id, fields=("molecule", "agent_results"))
+        if completed is not None:
+            await run_in_thread(_materialize_dossier, session_id, completed)
+            await run_in_thread(retrieval.build, session_id, completed.get("agent_results", {}))
+
         # Send final message
         await broadcast_to_session(session_id, {
             "type": "chat_message",
@@ -327,50 +654,134 @@ async def run_agents_async(session_id: str, user_query: str):
         })
         
     except Exception as e:
+        try:
+            await asyncio.to_thread(sessions.update, session_id, status="error")
+        except KeyError:
+            pass   # expired meanwhile
         await broadcast_to_session(session_id, {
             "type": "chat_message",
             "sender": "master",
             "message": f"⚠️ An error occurred during analysis: {str(e)}"
         })
-        session = get_session(session_id)
-        session["status"] = "error"
-        store_session(session_id, session)
+        if raise_errors:
+            raise
 
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time updates"""
+async def websocket_endpoint(
+    websocket: WebSocket,
+    session_id: str,
+    last_seq: Optional[int] = Query(None, ge=0, description="Last event seq this client saw"),
+):
+    """
+    WebSocket endpoint for real-time updates. Broadcast events carry a
+    per-session `seq`; reconnecting with ?last_seq=N replays only the events
+    after N. New clients, and gaps too large to replay, get a compact
+    `session_data` snapshot tagged with the seq it is current to.
+    """
     await websocket.accept()
-    
-    # Add to active connections
-    if session_id not in active_websockets:
-        active_websockets[session_id] = []
-    active_websockets[session_id].append(websocket)
-    
+    # Live broadcasts queue up from here, sent only once the replay or
+    # snapshot read below (off the event loop) is queued ahead of them
+    conn = ws_fanout.connect(session_id, websocket, start=False)
+
     try:
-        # Send initial session data if available
-        if session_id in sessions:
-            session = sessions[session_id]
-            await websocket.send_json({
-                "type": "session_data",
-                "data": session
-            })
-        
+        backlog, covered_seq = await asyncio.to_thread(_ws_backlog, session_id, last_seq)
+        ws_fanout.catch_up(conn, backlog, covered_seq)
+
         # Keep connection alive
-        while True:
-            try:
-                data = await websocket.receive_text()
-                # Echo or process any incoming messages
-                await websocket.send_json({"type": "pong", "message": "Connection active"})
-            except WebSocketDisconnect:
-                break
-                
+        while not conn.closed:
+            await websocket.receive_text()
+            ws_fanout.send(conn, {"type": "pong", "message": "Connection active"})
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        # Remove from active connections
-        if session_id in active_websockets:
-            if websocket in active_websockets[session_id]:
-                active_websockets[session_id].remove(websocket)
+        ws_fanout.disconnect(conn)
+
+def _ws_backlog(session_id: str, last_seq: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """(messages, seq they bring the client up to): the events after `last_seq`, else a snapshot"""
+    replay = session_events.since(session_id, last_seq) if last_seq is not None else None
+    if replay is not None:
+        return replay, replay[-1]["seq"] if replay else last_seq
+    seq = session_events.last_seq(session_id)
+    session = sessions.get(session_id)
+    if session is None:
+        return [], None
+    return [{"type": "session_data", "seq": seq, "data": _session_snapshot(session)}], seq
+
+def _sse_event(event: Dict[str, Any]) -> bytes:
+    # Raw agent payloads (agent_result "data") stay behind GET /api/session/{id}
+    data = {key: value for key, value in event.items() if key != "data"}
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+def _sse_snapshot(
+    session_id: str, session: Optional[Dict[str, Any]], fallback: Optional[Dict[str, Any]] = None
+) -> Tuple[int, bytes]:
+    """
+    Current state and its seq; later events' patches apply to exactly this
+    state. Reads the session (else `fallback`) when `session` is None.
+    """
+    seq = session_events.last_seq(session_id)
+    if session is None:
+        session = sessions.get(session_id) or fallback
+    state = session_events.state(session_id) or session_events.base_state(session_id, _session_snapshot(session))
+    return seq, f"id: {seq}\nevent: snapshot\ndata: ".encode() + dumps({"seq": seq, "state": state}) + b"\n\n"
+
+@app.get("/api/session/{session_id}/events")
+async def session_event_stream(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource when it reconnects"),
+):
+    """
+    Server-Sent Events progress stream. The first event is a `snapshot` of
+    the session state; after that each typed event (agent_status,
+    agent_result, chat_message, final_answer, ...) carries `patch`, a JSON
+    Patch against the state as of the previous event id. Reconnecting with
+    Last-Event-ID resumes from there (or restarts from a snapshot if that
+    part of the log is gone). Idle streams get a heartbeat comment every
+    SSE_HEARTBEAT_S.
+    """
+    session = await asyncio.to_thread(get_session, session_id)
+    try:
+        resume = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume = None
+
+    async def stream():
+        yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+        replay = await asyncio.to_thread(session_events.since, session_id, resume) if resume is not None else None
+        if replay is None:
+            seq, snapshot = await asyncio.to_thread(_sse_snapshot, session_id, session)
+            yield snapshot
+        else:
+            seq = resume
+            for event in replay:
+                seq = event["seq"]
+                yield _sse_event(event)
+        while True:
+            if not await session_events.wait(session_id, seq, SSE_HEARTBEAT_S):
+                yield b": keep-alive\n\n"
+                continue
+            events = await asyncio.to_thread(session_events.since, session_id, seq)
+            if events is None:
+                # Fell behind the log: start over from the current state
+                seq, snapshot = await asyncio.to_thread(_sse_snapshot, session_id, None, session)
+                yield snapshot
+                continue
+            for event in events:
+                seq = event["seq"]
+                yield _sse_event(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    """Per-connection queue depth, drops and send lag, plus event log replay counts"""
+    return {**ws_fanout.stats(), "events": await asyncio.to_thread(session_events.info)}
 
 # @app.post("/api/chat")
 # async def chat(request: ChatRequest):
@@ -522,133 +933,139 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 #         "sender": "master",
 #         "agents_used": [selected_agent] if selected_agent else []
 #     }
+CHAT_SYSTEM_PROMPT = (
+    "You answer follow-up questions about a pharmaceutical analysis that has already been run. "
+    "Use only the numbered passages provided; cite them like [1]. "
+    "If they don't answer the question, say so. Reply in at most three sentences."
+)
+CHAT_NO_ANSWER = (
+    "Nothing in this session's results answers that question. "
+    "Try asking about the market, trade, clinical trial, patent or internal "
+    "findings shown in the tabs."
+)
+
+# Created on the first question (importing LangChain is slow); chats run in
+# worker threads, so creation is locked to build a single client
+_chat_llm: Optional[GroqLLM] = None
+_chat_llm_lock = threading.Lock()
+
+def _get_chat_llm() -> GroqLLM:
+    global _chat_llm
+    with _chat_llm_lock:
+        if _chat_llm is None:
+            _chat_llm = GroqLLM(temperature=0.2)
+        return _chat_llm
+
+def _grounded_answer(question: str, hits: List[Tuple[float, Dict[str, str]]]) -> str:
+    """One small LLM call over the retrieved passages (the passages themselves if it fails)"""
+    passages = "\n".join(f"[{i}] ({chunk['agent']}) {chunk['text']}" for i, (_, chunk) in enumerate(hits, 1))
+    try:
+        llm = _get_chat_llm()
+        with token_source("chat"):
+            return llm.chat(CHAT_SYSTEM_PROMPT, f"Passages:\n{passages}\n\nQuestion: {question}").strip()
+    except Exception as e:
+        print(f"[CHAT] LLM answer failed, replying with the passages: {e}")
+        return " ".join(chunk["text"] for _, chunk in hits[:2])
+
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
-    session = get_session(request.session_id)
+    """Answer a follow-up from the session's results: top-k retrieved chunks + one short LLM call"""
+    session = await asyncio.to_thread(get_session, request.session_id)
 
-    session["chat_history"].append({
+    await asyncio.to_thread(sessions.append, request.session_id, "chat_history", {
         "sender": "user",
         "message": request.message,
         "timestamp": datetime.now().isoformat()
     })
 
-    lower = request.message.lower()
     agent_results = session.get("agent_results", {})
+    hits: List[Tuple[float, Dict[str, str]]] = []
+    if agent_results:
+        if session.get("status") == "completed":
+            index = retrieval.get(request.session_id)
+            if index is None:   # evicted, restarted, or completed on another worker
+                index = await asyncio.to_thread(retrieval.build, request.session_id, agent_results)
+        else:
+            # Results are still arriving - index what's there without caching it
+            index = await asyncio.to_thread(build_index, agent_results)
+        hits = index.search(request.message, RETRIEVAL_TOP_K)
 
-    intent_map = {
-        "iqvia": ["market", "sales", "cagr"],
-        "exim": ["trade", "export", "import"],
-        "trials": ["trial", "clinical", "phase"],
-        "patents": ["patent", "fto", "ip"],
-        "internal": ["internal", "strategy"],
-        "web": ["web", "guideline", "news"]
-    }
-
-    selected_agent = None
-    for agent, keys in intent_map.items():
-        if any(k in lower for k in keys):
-            selected_agent = agent
-            break
-
-    # READ ONLY
-    if selected_agent and selected_agent in agent_results:
-        summary = agent_results[selected_agent].get("summary", "")
-        response = ". ".join(summary.split(".")[:3]).strip() + "."
+    if hits:
+        forwarder = _TokenForwarder(request.session_id, asyncio.get_running_loop())
+        response = await _run_streaming(forwarder, "master", _grounded_answer, request.message, hits)
     else:
-        response = (
-            "This question does not affect the data shown in the tabs. "
-            "You can continue exploring the Market, Trade, Trials, and Patent tabs "
-            "without any changes."
-        )
+        response = CHAT_NO_ANSWER
 
-    session["chat_history"].append({
+    await asyncio.to_thread(sessions.append, request.session_id, "chat_history", {
         "sender": "master",
         "message": response,
         "timestamp": datetime.now().isoformat()
     })
 
-    store_session(request.session_id, session)
-
     return {
         "response": response,
-        "sender": "master"
+        "sender": "master",
+        "agents_used": list(dict.fromkeys(chunk["agent"] for _, chunk in hits)),
+        "sources": [
+            {"agent": chunk["agent"], "kind": chunk["kind"], "text": chunk["text"], "score": round(score, 3)}
+            for score, chunk in hits
+        ],
     }
 
 @app.get("/api/session/{session_id}")
-async def get_session_data(session_id: str):
-    """Get session data"""
-    session = get_session(session_id)
-    return {
+async def get_session_data(
+    session_id: str,
+    request: Request,
+    wait: float = Query(0, ge=0, description="Long-poll: with If-None-Match, wait up to this many seconds for a change"),
+):
+    """Get session data (ETag / 304, optional long-poll)"""
+    session, not_modified = await _read_if_modified(request, session_id, wait)
+    if not_modified is not None:
+        return not_modified
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return FastJSONResponse({
         "molecule": session["molecule"],
         "agent_results": session.get("agent_results", {}),
         "chat_history": session.get("chat_history", []),
         "final_answer": session.get("final_answer", ""),
         "plan": session.get("plan", {}),
         "status": session.get("status", "processing")
-    }
+    }, headers=_session_cache_headers(session["version"]))
+
+@app.get("/api/sessions/stats")
+async def session_store_stats():
+    """Session store backend, live session count and bytes held"""
+    return {**await asyncio.to_thread(sessions.stats), "long_polls": session_waiters.waiting()}
+
+def _materialize_dossier(session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the dossier from `session` (molecule, agent_results) and store it with the session"""
+    dossier = build_dossier(session.get("molecule", {}), session.get("agent_results", {}))
+    sessions.update(session_id, dossier=dossier)
+    return dossier
 
 @app.get("/api/dossier/{session_id}")
-async def get_dossier(session_id: str):
-    """Get molecule dossier data"""
-    session = get_session(session_id)
-    agent_results = session.get("agent_results", {})
-    
-    # Extract data from agent results
-    trials_data = agent_results.get("trials", {}).get("raw", {})
-    patents_data = agent_results.get("patents", {}).get("raw", {})
-    iqvia_data = agent_results.get("iqvia", {}).get("raw", {})
-    
-    # Format unmet needs (extract from summaries)
-    unmet_needs = []
-    for agent_key, result in agent_results.items():
-        summary = result.get("summary", "")
-        if summary:
-            # Extract first few sentences
-            sentences = summary.split('.')[:2]
-            for sent in sentences:
-                if len(sent.strip()) > 20:
-                    unmet_needs.append(sent.strip() + ".")
-    
-    # Format innovation opportunities (placeholder - can be enhanced with LLM)
-    innovation_opportunities = [
-        {
-            "title": "Extended-Release Formulation",
-            "description": "Develop once-daily or once-weekly formulation to improve patient compliance",
-            "feasibility": "High",
-            "impact": "High"
-        },
-        {
-            "title": "Fixed-Dose Combination",
-            "description": "Combine with complementary mechanism of action for enhanced efficacy",
-            "feasibility": "Medium",
-            "impact": "High"
-        },
-        {
-            "title": "Pediatric Formulation",
-            "description": "Develop age-appropriate formulation for pediatric patients",
-            "feasibility": "High",
-            "impact": "Medium"
-        },
-        {
-            "title": "Indication Expansion",
-            "description": "Explore efficacy in related disease areas based on mechanism of action",
-            "feasibility": "Medium",
-            "impact": "Very High"
-        }
-    ]
-    
-    return {
-        "molecule": session["molecule"],
-        "unmet_needs": unmet_needs[:4],
-        "trials": trials_data.get("active_trials", []),
-        "patents": patents_data.get("patent_status", []),
-        "innovation_opportunities": innovation_opportunities,
-        "patient_stats": {
-            "us_patients": "12.5M",
-            "global_patients": "45M",
-            "market_cagr": f"{iqvia_data.get('markets', [{}])[0].get('cagr_5y', '8.5')}%" if iqvia_data.get('markets') else "8.5%"
-        }
-    }
+async def get_dossier(session_id: str, request: Request):
+    """
+    Get molecule dossier data: the view materialized when the analysis
+    completed (ETag / 304). Sessions still running get a fresh, unstored build.
+    """
+    session = await asyncio.to_thread(sessions.get, session_id, fields=("status", "dossier"))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    dossier = session.get("dossier")
+    if dossier is None:
+        source = await asyncio.to_thread(sessions.get, session_id, fields=("molecule", "agent_results")) or {}
+        if session.get("status") == "completed":
+            # Completed before dossiers were materialized
+            dossier = await asyncio.to_thread(_materialize_dossier, session_id, source)
+        else:
+            dossier = await asyncio.to_thread(build_dossier, source.get("molecule", {}), source.get("agent_results", {}))
+
+    headers = {"ETag": f'W/"{dossier["etag"]}"', "Cache-Control": "no-cache"}
+    if is_not_modified(request.headers, f'"{dossier["etag"]}"', ""):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(dossier, headers=headers)
 
 # @app.post("/api/generate-report")
 # async def generate_report_integration(
@@ -774,80 +1191,251 @@ async def get_dossier(session_id: str):
 #             "error": str(e)
 #         }
 
+def _parse_timestamp(value: Optional[str], name: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or date-time")
+
+
+def _report_listing(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Report index row in the shape the frontend report list expects"""
+    session = sessions.get(record.get("session_id") or "", fields=("molecule",)) or {}
+    molecule = session.get("molecule", {})
+    indication = record.get("indication") or molecule.get("indication")
+    return {
+        "report_id": record["report_id"],
+        "session_id": record.get("session_id"),
+        "topic": record.get("topic"),
+        "molecule": record.get("molecule") or molecule.get("name"),
+        "indication": indication,
+        "geography": molecule.get("geography"),
+        "date": record["timestamp"],
+        "tags": [indication] if indication else [],
+        "size_bytes": record.get("size_bytes"),
+        "page_count": record.get("page_count"),
+        "render_ms": record.get("render_ms"),
+        "download_link": f"/downloads/reports/{record['report_id']}.pdf",
+    }
+
+
 @app.get("/api/reports")
-async def list_reports():
-    """List all saved reports"""
-    reports = []
-    for session_id, session in sessions.items():
-        if "report_id" in session:
-            reports.append({
-                "report_id": session["report_id"],
-                "session_id": session_id,
-                "molecule": session["molecule"]["name"],
-                "indication": session["molecule"]["indication"],
-                "geography": session["molecule"]["geography"],
-                "date": session.get("created_at", ""),
-                "tags": [session["molecule"]["indication"]]  # Simple tag generation
-            })
-    
-    # Sort by date (newest first)
-    reports.sort(key=lambda x: x["date"], reverse=True)
-    return reports
+async def list_reports(
+    response: Response,
+    molecule: Optional[str] = Query(None, description="Molecule name, brand or alias"),
+    indication: Optional[str] = Query(None, description="Indication (case-insensitive)"),
+    since: Optional[str] = Query(None, description="ISO date/time, inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/time, exclusive"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated, use cursor"),
+):
+    """
+    List generated reports, newest first (indexed by molecule, indication and
+    date). When there are more, the X-Next-Cursor header holds the cursor
+    for the next page.
+    """
+    if report_storage is None:
+        return []
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    records = await asyncio.to_thread(
+        report_storage.list,
+        molecule=canonical_molecule_id(molecule),
+        indication=indication,
+        since=_parse_timestamp(since, "since"),
+        until=_parse_timestamp(until, "until"),
+        limit=limit + 1,
+        offset=offset,
+        after=after,
+    )
+    if len(records) > limit:
+        records = records[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(records[-1])
+    return await asyncio.to_thread(lambda: [_report_listing(record) for record in records])
 
 @app.get("/api/reports/{report_id}")
 async def get_report(report_id: str):
     """Get specific report data"""
-    # Find session with this report_id
-    for session_id, session in sessions.items():
-        if session.get("report_id") == report_id:
+    record = await asyncio.to_thread(report_storage.get, report_id) if report_storage is not None else None
+    if record:
+        return {
+            **await asyncio.to_thread(_report_listing, record),
+            "status": record["status"],
+            "error": record.get("error"),
+            "session": await asyncio.to_thread(sessions.get, record.get("session_id") or ""),
+        }
+    raise HTTPException(status_code=404, detail="Report not found")
+
+def _session_sources(session_ids: Optional[List[str]], molecule: Optional[str]):
+    """Sessions as export sources, looked up one at a time while the export streams"""
+    wanted = canonical_molecule_id(molecule) if molecule else None
+    if not session_ids:
+        session_ids = sessions.find("molecule", wanted) if wanted else list(sessions)
+    for session_id in session_ids:
+        session = sessions.get(session_id)
+        if not session:
+            continue
+        name = session.get("molecule", {}).get("name")
+        if wanted and canonical_molecule_id(name) != wanted:
+            continue
+        yield {
+            "session_id": session_id,
+            "molecule": name,
+            "worker_results": session.get("worker_results") or list(session.get("agent_results", {}).values()),
+            "demographics": session.get("demographics"),
+        }
+
+
+def _session_candidate(session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+    """A completed session in report_data shape"""
+    molecule = session.get("molecule", {})
+    name, indication = molecule.get("name"), molecule.get("indication")
+    return {
+        "topic": f"{name} - {indication}" if indication else name,
+        "molecule": name,
+        "indication": indication,
+        "session_id": session_id,
+        "final_answer": session.get("final_answer", ""),
+        "worker_results": session.get("worker_results") or list(session.get("agent_results", {}).values()),
+        "demographics": session.get("demographics"),
+    }
+
+
+def _same_indication(wanted: Optional[str], actual: Optional[str]) -> bool:
+    return not wanted or (actual or "").strip().lower() == wanted.strip().lower()
+
+
+def _resolve_candidate(molecule: str, indication: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Latest completed analysis of a (molecule, indication) pair: a session
+    in memory first, then the data of the newest stored report.
+    """
+    wanted = canonical_molecule_id(molecule)
+    matches = []
+    for session_id in sessions.find("molecule", wanted) if wanted else []:
+        session = sessions.get(session_id, fields=("status", "molecule", "updated_at"))
+        if (
+            session
+            and session.get("status") == "completed"
+            and _same_indication(indication, session.get("molecule", {}).get("indication"))
+        ):
+            matches.append((session.get("updated_at") or "", session_id))
+    if matches:
+        _, session_id = max(matches)
+        session = sessions.get(session_id)
+        if session:
+            return _session_candidate(session_id, session)
+
+    if report_storage is None or wanted is None:
+        return None
+    for record in report_storage.list(molecule=wanted, indication=(indication or "").strip() or None, limit=20):
+        if record["report_format"] == "portfolio":
+            continue
+        stored = report_storage.get_report_data(record["report_id"])
+        if stored:
+            data = loads(stored)
             return {
-                "report_id": report_id,
-                "session": session,
-                "download_link": f"/downloads/reports/{report_id}.pdf"
+                **data,
+                "molecule": data.get("molecule") or molecule,
+                "indication": record.get("indication") or indication,
+                "session_id": record.get("session_id"),
             }
-    
-    raise HTTPException(status_code=404, detail="Report not found")
+    return None
+
+
+def _portfolio_candidates(request: PortfolioRequest) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(candidates found, requested ones that weren't) - reads the session and report stores"""
+    candidates, missing = [], []
+    for session_id in request.session_ids:
+        session = sessions.get(session_id)
+        if session and session.get("status") == "completed":
+            candidates.append(_session_candidate(session_id, session))
+        else:
+            missing.append({"session_id": session_id})
+    for pair in request.candidates:
+        candidate = _resolve_candidate(pair.molecule, pair.indication)
+        if candidate:
+            candidates.append(candidate)
+        else:
+            missing.append({"molecule": pair.molecule, "indication": pair.indication})
+    return candidates, missing
 
-# Import PDF generation function from mock_api
+
+@app.post("/api/portfolio-report", status_code=202)
+async def create_portfolio_report(request: PortfolioRequest):
+    """
+    One comparative PDF for many candidates - completed sessions and/or
+    (molecule, indication) pairs - with a ranked summary table. The ranking
+    is returned straight away; the PDF renders in the background.
+    """
+    if submit_portfolio_report is None:
+        raise HTTPException(status_code=503, detail="Report rendering is unavailable")
+    if request.chart_backend and request.chart_backend not in CHART_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"chart_backend must be one of {', '.join(CHART_BACKENDS)}")
+    requested = len(request.session_ids) + len(request.candidates)
+    if requested == 0:
+        raise HTTPException(status_code=400, detail="Give session_ids and/or candidates")
+    if requested > PORTFOLIO_MAX_CANDIDATES:
+        raise HTTPException(status_code=400, detail=f"At most {PORTFOLIO_MAX_CANDIDATES} candidates per portfolio")
+
+    candidates, missing = await asyncio.to_thread(_portfolio_candidates, request)
+    if not candidates:
+        raise HTTPException(status_code=404, detail={"message": "No completed analyses found", "missing": missing})
+
+    rows = rank_candidates(candidates)
+    try:
+        job = submit_portfolio_report(request.title or "Portfolio Review", candidates, rows, request.chart_backend)
+    except ReportQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Report queue is full ({e}). Please retry shortly.", headers={"Retry-After": "10"})
+
+    return {
+        "status": "queued",
+        "report_id": job.report_id,
+        "job_id": job.job_id,
+        "candidates": len(candidates),
+        "missing": missing,
+        "ranking": [{k: v for k, v in row.items() if k != "index"} for row in rows],
+        "download_url": f"/downloads/reports/{job.report_id}.pdf",
+        "status_url": f"/api/report-jobs/{job.job_id}",
+        "result_url": f"/api/report-jobs/{job.job_id}/result",
+        "events_url": f"/ws/report-jobs/{job.job_id}",
+    }
+
+
+@app.get("/api/export")
+async def export_results(
+    format: str = Query("csv", description="csv, parquet or xlsx"),
+    table: Optional[str] = Query(None, description="markets, trade, patents, trials, documents or charts"),
+    session_id: Optional[List[str]] = Query(None, description="Sessions to export (default: all)"),
+    molecule: Optional[str] = Query(None, description="Only sessions about this molecule"),
+):
+    """Stream agent results as typed tables - one session or the whole portfolio"""
+    try:
+        return export_response(
+            format,
+            table,
+            lambda _: _session_sources(session_id, molecule),
+            filename=f"pharmaverse_{session_id[0]}" if session_id and len(session_id) == 1 else "pharmaverse_portfolio",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExportFormatUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+# PDF downloads are served by mock_api's route, which streams the stored
+# file (ETag / 304 / Range) and renders only a PDF that does not exist yet
 try:
     import sys
     sys.path.insert(0, os.path.dirname(__file__))
-    from mock_api import generate_pdf_content, report_storage
-except ImportError:
-    # Fallback if import fails
-    def generate_pdf_content(report_id, topic, report_data):
-        return b"%PDF-1.4\n%Mock PDF\n"
-    
-    report_storage = {}
-
-@app.get("/downloads/reports/{report_id}.pdf")
-async def download_pdf_report_integration(report_id: str):
-    """Serve PDF reports from report storage"""
-    if report_id not in report_storage:
-        return Response(
-            content=json.dumps({"error": "Report not found"}).encode(),
-            media_type="application/json",
-            status_code=404
-        )
-    
-    stored_data = report_storage[report_id]
-    topic = stored_data.get("topic", "Pharma Innovation Assessment")
-    report_data = stored_data.get("report_data", {})
-    
-    try:
-        pdf_content = generate_pdf_content(report_id, topic, report_data)
-    except Exception as e:
-        # Fallback PDF
-        pdf_content = f"%PDF-1.4\n1 0 obj<<</Type/Catalog>>endobj\nxref 0 1\ntrailer<</Size 1/Root 1 0 R>>startxref 50 %%EOF".encode()
-    
-    return Response(
-        content=pdf_content,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{report_id}.pdf"',
-            "Content-Length": str(len(pdf_content))
-        }
-    )
+    from mock_api import download_report
+    app.api_route("/downloads/reports/{report_id}.pdf", methods=["GET", "HEAD"])(download_report)
+except ImportError as e:
+    print(f"[API] PDF downloads unavailable, mock_api could not be imported: {e}")
 
 if __name__ == "__main__":
     import uvicorn
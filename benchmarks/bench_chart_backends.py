@@ -0,0 +1,92 @@
+# benchmarks/bench_chart_backends.py
+# Compares PDF render time and file size for raster (Matplotlib PNG) vs vector (ReportLab) charts
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_chart_backends.py [--charts 18] [--runs 3]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import mock_api
+from chart_cache import ChartCache
+
+AGENTS = [
+    "IQVIA Insights Agent",
+    "EXIM Trends Agent",
+    "Patent Landscape Agent",
+    "Clinical Trials Agent",
+    "Internal Knowledge Agent",
+    "Web Intelligence Agent",
+]
+CHART_TYPES = ["bar", "line", "pie", "donut"]
+
+
+def build_report(num_charts: int, seed: int) -> dict:
+    labels = ["US", "EU", "India", "China", "Japan", "Brazil"]
+    demographics = {name: [] for name in AGENTS}
+    for i in range(num_charts):
+        agent = AGENTS[i % len(AGENTS)]
+        demographics[agent].append({
+            "id": f"chart-{i}",
+            "title": f"{agent.split()[0]} metric {i}",
+            "insight": "Synthetic benchmark data",
+            "recommended_chart": CHART_TYPES[i % len(CHART_TYPES)],
+            "data": {"labels": labels, "values": [(seed + i * 7 + j * 13) % 90 + 10 for j in range(len(labels))]},
+        })
+    return {
+        "topic": "Chart backend benchmark",
+        "final_answer": "Benchmark report.",
+        "worker_results": [{"agent": name, "summary": f"{name} summary."} for name in AGENTS],
+        "demographics": {"agents": demographics},
+    }
+
+
+def time_render(report: dict, backend: str, out: Path) -> tuple:
+    path = out / f"{backend}.pdf"
+    started = time.perf_counter()
+    mock_api.generate_pdf("bench", {**report, "chart_backend": backend}, path)
+    return (time.perf_counter() - started) * 1000, path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Raster vs vector chart backend benchmark")
+    parser.add_argument("--charts", type=int, default=18, help="Charts per report")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {"raster (cold cache)": [], "raster (warm cache)": [], "vector": []}
+    sizes = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        for run in range(args.runs):
+            report = build_report(args.charts, seed=run)
+            # Fresh cache per run so the first raster render really rasterizes
+            mock_api.chart_cache = ChartCache(out / f"charts-{run}")
+
+            ms, size = time_render(report, "raster", out)
+            results["raster (cold cache)"].append(ms)
+            sizes["raster (cold cache)"] = size
+            ms, size = time_render(report, "raster", out)
+            results["raster (warm cache)"].append(ms)
+            sizes["raster (warm cache)"] = size
+            ms, size = time_render(report, "vector", out)
+            results["vector"].append(ms)
+            sizes["vector"] = size
+
+    print("=" * 70)
+    print(f"{args.charts} charts per report, {args.runs} runs")
+    print(f"{'backend':<22}{'median ms':>12}{'PDF size':>14}")
+    for name, times in results.items():
+        print(f"{name:<22}{statistics.median(times):>12.1f}{sizes[name] / 1024:>11.1f} KiB")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
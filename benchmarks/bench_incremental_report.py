@@ -0,0 +1,74 @@
+# benchmarks/bench_incremental_report.py
+# Full report build vs. rebuild after a single agent's results changed (section fragment cache)
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_incremental_report.py [--charts 18] [--backend raster|vector] [--runs 3]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import mock_api
+from bench_chart_backends import build_report
+from chart_cache import ChartCache
+from report_sections import PYPDF_AVAILABLE, SectionCache
+
+
+def timed(report: dict, path: Path) -> float:
+    started = time.perf_counter()
+    mock_api.generate_pdf("bench", report, path)
+    return (time.perf_counter() - started) * 1000
+
+
+def refresh_patents(report: dict, run: int) -> dict:
+    """Same report with only the Patent Landscape Agent's summary and charts changed"""
+    demographics = {name: list(charts) for name, charts in report["demographics"]["agents"].items()}
+    demographics["Patent Landscape Agent"] = [
+        {**chart, "data": {**chart["data"], "values": [v + run + 1 for v in chart["data"]["values"]]}}
+        for chart in demographics["Patent Landscape Agent"]
+    ]
+    worker_results = [
+        {**agent, "summary": agent["summary"] + f" Refreshed ({run})."} if agent["agent"] == "Patent Landscape Agent" else agent
+        for agent in report["worker_results"]
+    ]
+    return {**report, "worker_results": worker_results, "demographics": {"agents": demographics}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incremental report rebuild benchmark")
+    parser.add_argument("--charts", type=int, default=18, help="Charts per report")
+    parser.add_argument("--backend", choices=("raster", "vector"), default="raster")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if not PYPDF_AVAILABLE:
+        print("pypdf is not installed - reports are always built as one document")
+
+    results = {"full build (cold caches)": [], "unchanged rebuild": [], "one agent refreshed": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        for run in range(args.runs):
+            mock_api.chart_cache = ChartCache(out / f"charts-{run}")
+            mock_api.section_cache = SectionCache(out / f"sections-{run}")
+            report = {**build_report(args.charts, seed=run), "chart_backend": args.backend}
+
+            results["full build (cold caches)"].append(timed(report, out / "full.pdf"))
+            results["unchanged rebuild"].append(timed(report, out / "same.pdf"))
+            results["one agent refreshed"].append(timed(refresh_patents(report, run), out / "refreshed.pdf"))
+
+    print("=" * 70)
+    print(f"{args.charts} charts, {args.backend} backend, {args.runs} runs")
+    full = statistics.median(results["full build (cold caches)"])
+    for name, times in results.items():
+        median = statistics.median(times)
+        print(f"{name:<28}{median:>10.1f} ms{median / full:>8.0%}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_portfolio_report.py
+# Portfolio report build time vs. number of candidates, against one PDF per candidate
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_portfolio_report.py [--sizes 5,10,20,40] [--charts 6] [--backend raster|vector]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import mock_api
+import pdf_report
+from bench_chart_backends import build_report
+from chart_cache import ChartCache
+from portfolio import rank_candidates
+from report_sections import SectionCache
+
+
+def build_candidate(i: int, num_charts: int) -> dict:
+    """Synthetic candidate; its first chart is identical across candidates (shared market context)"""
+    report = build_report(num_charts - 1, seed=i + 1)
+    agents = dict(report["demographics"]["agents"])
+    shared_agent, shared_charts = next(iter(build_report(1, seed=0)["demographics"]["agents"].items()))
+    agents[shared_agent] = shared_charts + agents[shared_agent]
+    worker_results = [dict(agent) for agent in report["worker_results"]]
+    worker_results[0]["raw"] = {
+        "markets": [
+            {"country": "US", "sales_2024_musd": 200 + (i * 37) % 900, "cagr_5y": (i * 13) % 11 - 2},
+            {"country": "EU", "sales_2024_musd": 100 + (i * 53) % 400, "cagr_5y": (i * 7) % 9},
+        ],
+        "unmet_need_flag": i % 3 == 0,
+    }
+    worker_results[2]["raw"] = {"patent_status": [{"patent_number": f"US{i}"}], "fto_flag": ("Clear", "Caution", "Blocked")[i % 3]}
+    return {
+        **report,
+        "topic": f"Candidate {i}",
+        "molecule": f"Molecule {i}",
+        "indication": ("CML", "T2D", "Obesity", "NSCLC")[i % 4],
+        "final_answer": f"Candidate {i} executive summary. " * 20,
+        "worker_results": worker_results,
+        "demographics": {"agents": agents},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Portfolio report scaling benchmark")
+    parser.add_argument("--sizes", default="5,10,20,40", help="Candidate counts")
+    parser.add_argument("--charts", type=int, default=6, help="Charts per candidate")
+    parser.add_argument("--backend", choices=("raster", "vector"), default="raster")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip one-PDF-per-candidate runs")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    print("=" * 78)
+    print(f"{args.charts} charts per candidate, {args.backend} backend, {pdf_report.PORTFOLIO_WORKERS} section workers")
+    print("=" * 78)
+    print(f"{'candidates':>10}{'portfolio ms':>14}{'ms/cand.':>10}{'warm ms':>10}{'KiB':>9}{'separate ms':>13}{'KiB':>9}")
+
+    # Spawn the section workers before timing anything
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        warm = [build_candidate(i, args.charts) for i in range(2)]
+        pdf_report.generate_portfolio_pdf("warm-up", warm, rank_candidates(warm), out / "warm.pdf",
+                                          ChartCache(out / "charts"), SectionCache(out / "sections"), args.backend)
+
+    for n in sizes:
+        candidates = [build_candidate(i, args.charts) for i in range(n)]
+        rows = rank_candidates(candidates)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            charts, sections = ChartCache(out / "charts"), SectionCache(out / "sections")
+
+            started = time.perf_counter()
+            pdf_report.generate_portfolio_pdf("Benchmark", candidates, rows, out / "portfolio.pdf", charts, sections, args.backend)
+            cold_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            pdf_report.generate_portfolio_pdf("Benchmark", candidates, rows, out / "portfolio.pdf", charts, sections, args.backend)
+            warm_ms = (time.perf_counter() - started) * 1000
+            portfolio_kib = (out / "portfolio.pdf").stat().st_size / 1024
+
+            separate = "-"
+            separate_kib = "-"
+            if not args.no_baseline:
+                mock_api.chart_cache = ChartCache(out / "charts-separate")
+                mock_api.section_cache = SectionCache(out / "sections-separate")
+                started = time.perf_counter()
+                total = 0
+                for i, candidate in enumerate(candidates):
+                    path = out / f"separate-{i}.pdf"
+                    mock_api.generate_pdf(f"bench-{i}", {**candidate, "chart_backend": args.backend}, path)
+                    total += path.stat().st_size
+                separate = f"{(time.perf_counter() - started) * 1000:.0f}"
+                separate_kib = f"{total / 1024:.0f}"
+
+        print(f"{n:>10}{cold_ms:>14.0f}{cold_ms / n:>10.1f}{warm_ms:>10.0f}{portfolio_kib:>9.0f}{separate:>13}{separate_kib:>9}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_response_encoding.py
+# Encode time and bytes on the wire: stdlib json vs orjson, identity vs gzip/br, JSON vs msgpack
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_response_encoding.py [--sessions 1] [--repeat 200]
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import mock_api
+import http_encoding
+
+
+def build_session_blob(sessions: int) -> Dict[str, Any]:
+    """Build a payload shaped like /api/session/{id} using the mock data APIs"""
+    raw_results = {
+        "iqvia": mock_api.get_iqvia("imatinib"),
+        "exim": mock_api.get_exim_trends("imatinib api"),
+        "patents": mock_api.get_patent_landscape("imatinib"),
+        "trials": mock_api.get_clinical_trials(molecule="imatinib"),
+        "internal": mock_api.get_internal_knowledge(topic="imatinib"),
+        "web": mock_api.get_web_intelligence("imatinib"),
+    }
+    summary = (
+        "Imatinib remains a first-line option for chronic phase CML. "
+        "Generic entry has compressed prices in the US and EU while emerging markets grow. "
+    ) * 12
+
+    blobs = []
+    for i in range(sessions):
+        blobs.append({
+            "molecule": {"name": "Imatinib", "indication": "CML", "geography": "Global"},
+            "agent_results": {
+                key: {"agent": key, "params": {"molecule": "imatinib"}, "raw": raw, "summary": summary}
+                for key, raw in raw_results.items()
+            },
+            "chat_history": [
+                {"sender": "user" if j % 2 == 0 else "master", "message": summary[:200], "timestamp": "2025-01-01T00:00:00"}
+                for j in range(20)
+            ],
+            "final_answer": summary * 2,
+            "plan": {"molecule": "imatinib", "indication": "CML", "call_iqvia": True},
+            "status": "completed",
+            "session_index": i,
+        })
+    return blobs[0] if sessions == 1 else {"sessions": blobs}
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    # Mirrors starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    total = 0.0
+    out = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        best = min(best, elapsed)
+    return {"mean_us": total / repeat * 1e6, "best_us": best * 1e6, "bytes": len(out)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Response encoding benchmark")
+    parser.add_argument("--sessions", type=int, default=1, help="Number of session blobs in the payload")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = build_session_blob(args.sessions)
+    json_body = stdlib_dumps(payload)
+
+    cases: List[tuple] = [
+        ("json (stdlib), identity", lambda: stdlib_dumps(payload)),
+        ("json (stdlib), gzip-6", lambda: gzip.compress(stdlib_dumps(payload), 6)),
+    ]
+    if http_encoding.ORJSON_AVAILABLE:
+        cases.append(("json (orjson), identity", lambda: http_encoding.dumps(payload)))
+        cases.append(("json (orjson), gzip-6", lambda: http_encoding.compress(http_encoding.dumps(payload), "gzip")))
+        if http_encoding.BROTLI_AVAILABLE:
+            cases.append(("json (orjson), br-4", lambda: http_encoding.compress(http_encoding.dumps(payload), "br")))
+    if http_encoding.MSGPACK_AVAILABLE:
+        import msgpack
+        cases.append(("msgpack, identity", lambda: msgpack.packb(payload, use_bin_type=True)))
+        if http_encoding.BROTLI_AVAILABLE:
+            cases.append(("msgpack, br-4", lambda: http_encoding.compress(msgpack.packb(payload, use_bin_type=True), "br")))
+
+    print("=" * 70)
+    print(f"Payload: {args.sessions} session blob(s), {len(json_body) / 1024:.1f} KiB as JSON")
+    print(f"orjson={http_encoding.ORJSON_AVAILABLE} brotli={http_encoding.BROTLI_AVAILABLE} msgpack={http_encoding.MSGPACK_AVAILABLE}")
+    print("=" * 70)
+    print(f"{'encoding':<28}{'mean (us)':>12}{'best (us)':>12}{'wire bytes':>12}{'vs before':>11}")
+
+    baseline = None
+    for label, fn in cases:
+        stats = timed(fn, args.repeat)
+        if baseline is None:
+            baseline = stats
+        ratio = stats["bytes"] / baseline["bytes"]
+        print(f"{label:<28}{stats['mean_us']:>12.1f}{stats['best_us']:>12.1f}{stats['bytes']:>12}{ratio:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_ws_fanout.py
+# Broadcast cost and client lag with one slow WebSocket client: sequential sends vs. per-connection queues
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_ws_fanout.py [--clients 20] [--messages 200] [--slow-ms 50] [--policy coalesce]
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ws_fanout import OVERFLOW_POLICIES, SessionFanout
+
+
+class FakeWebSocket:
+    """Accepts text frames after a fixed delay, like a client on a slow link"""
+
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.received = 0
+
+    async def send_text(self, text: str) -> None:
+        await asyncio.sleep(self.delay_s)
+        self.received += 1
+
+    async def send_json(self, message) -> None:
+        await self.send_text("")
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        pass
+
+
+def message(i: int) -> dict:
+    if i % 3:
+        return {"type": "agent_status", "agent": f"agent{i % 6}", "status": "running", "message": "..." * 20}
+    return {"type": "chat_message", "sender": "master", "message": f"update {i} " * 20}
+
+
+async def sequential(clients, messages: int, interval_s: float) -> float:
+    """The previous broadcast: await each client's send in turn"""
+    started = time.perf_counter()
+    for i in range(messages):
+        for ws in clients:
+            await ws.send_json(message(i))
+        await asyncio.sleep(interval_s)
+    return time.perf_counter() - started
+
+
+async def fanout(clients, messages: int, interval_s: float, policy: str, queue: int):
+    hub = SessionFanout(max_queue=queue, policy=policy)
+    for ws in clients:
+        hub.connect("bench", ws)
+    started = time.perf_counter()
+    for i in range(messages):
+        hub.broadcast("bench", message(i))
+        await asyncio.sleep(interval_s)
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.2)
+    return elapsed, hub.stats()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="WebSocket fan-out benchmark")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--slow-ms", type=float, default=50, help="send delay of the one slow client")
+    parser.add_argument("--interval-ms", type=float, default=2, help="time between broadcasts")
+    parser.add_argument("--policy", choices=OVERFLOW_POLICIES, default="coalesce")
+    parser.add_argument("--queue", type=int, default=64)
+    args = parser.parse_args()
+
+    def make_clients():
+        return [FakeWebSocket(args.slow_ms / 1000)] + [FakeWebSocket(0) for _ in range(args.clients - 1)]
+
+    print("=" * 70)
+    print(f"{args.clients} clients (1 slow, {args.slow_ms:.0f} ms/send), {args.messages} broadcasts every {args.interval_ms} ms")
+    print("=" * 70)
+
+    ideal = args.messages * args.interval_ms / 1000
+    seq_s = await sequential(make_clients(), args.messages, args.interval_ms / 1000)
+    print(f"{'sequential sends':<28}{seq_s * 1000:>10.0f} ms  (producer ideal {ideal * 1000:.0f} ms)")
+
+    clients = make_clients()
+    fan_s, stats = await fanout(clients, args.messages, args.interval_ms / 1000, args.policy, args.queue)
+    print(f"{'queued fan-out (' + args.policy + ')':<28}{fan_s * 1000:>10.0f} ms")
+    fast = [c for c in stats["connections"] if c["max_lag_ms"] < args.slow_ms]
+    slow = [c for c in stats["connections"] if c not in fast]
+    print(f"  fast clients: {len(fast)}, max lag {max((c['max_lag_ms'] for c in fast), default=0):.1f} ms, "
+          f"received {min(ws.received for ws in clients[1:])}/{args.messages}")
+    for c in slow:
+        print(f"  slow client: max lag {c['max_lag_ms']:.0f} ms, dropped {c['dropped']}, coalesced {c['coalesced']}, "
+              f"queued {c['queued']}")
+    if args.policy == "disconnect":
+        print(f"  disconnected: {stats['totals']['disconnected']}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+# benchmarks/import_profile.py
+# Import-time profile of the server entry points (a summarized `python -X importtime`)
+#
+# Usage (from the repo root):
+#   python benchmarks/import_profile.py [--module start_server] [--top 15] [--budget-ms 0]
+#
+# Each run imports the module in a fresh interpreter, so results are cold-ish
+# (the OS file cache is warm after the first run). With --budget-ms the script
+# exits non-zero when the import takes longer, to catch start-up regressions.
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Libraries that should only load on first use (see warmup() in mock_api / api_integration)
+HEAVY_PACKAGES = (
+    "matplotlib", "reportlab", "pypdf", "pyarrow", "openpyxl",
+    "langchain", "langchain_core", "langchain_groq", "langgraph", "groq",
+)
+
+# Prints which heavy packages ended up in sys.modules after the import
+PROBE = (
+    "import importlib, sys, json; importlib.import_module({module!r}); "
+    "print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}})))"
+)
+
+
+def profile(module: str) -> Tuple[List[Tuple[str, int, int, int]], List[str]]:
+    """(name, self_us, cumulative_us, depth) per imported module, plus the loaded top-level packages"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return rows, loaded
+
+
+def by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package"""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import-time profile")
+    parser.add_argument("--module", default="start_server", help="module to import")
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="runs; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if the import is slower (0 = off)")
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.repeat)]
+    rows, loaded = min(runs, key=lambda run: sum(r[1] for r in run[0]))
+    total_ms = sum(r[1] for r in rows) / 1000
+
+    print("=" * 70)
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(rows)} modules (best of {args.repeat})")
+    print("=" * 70)
+
+    print(f"{'package':<40}{'self (ms)':>12}{'share':>10}")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{package:<40}{self_us / 1000:>12.1f}{self_us / 1000 / total_ms:>10.0%}")
+
+    print()
+    print(f"{'slowest first-party imports':<40}{'cumulative (ms)':>16}")
+    first_party = {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")} | {"pharma_agents"}
+    own = [r for r in rows if r[0].split(".")[0] in first_party]
+    for name, _, cumulative_us, _ in sorted(own, key=lambda r: -r[2])[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>16.1f}")
+
+    heavy = [package for package in HEAVY_PACKAGES if package in loaded]
+    print()
+    print(f"heavy packages loaded at import: {', '.join(heavy) if heavy else 'none'}")
+
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
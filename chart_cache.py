@@ -0,0 +1,73 @@
+# chart_cache.py
+# Content-hashed, size-bounded on-disk cache of rendered chart PNGs
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from chart_specs import CHART_DPI, CHART_SIZE, prepare_chart
+from disk_cache import DiskLRUCache
+
+CHART_CACHE_MAX_MB = int(os.getenv("CHART_CACHE_MAX_MB", "256"))
+
+
+def chart_key(chart: Dict[str, Any], size: Tuple[float, float] = CHART_SIZE, dpi: int = CHART_DPI) -> Optional[str]:
+    """
+    Hash of the normalized chart spec (type, labels, values, title) plus
+    output size and DPI. None if the chart can't be drawn at all.
+    """
+    spec = prepare_chart(chart)
+    if spec is None:
+        return None
+    payload = {**spec, "size": [float(s) for s in size], "dpi": int(dpi)}
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ChartCache(DiskLRUCache):
+    """
+    Renders each distinct chart spec once and reuses the PNG afterwards.
+    Entries are `<sha256>.png`, bounded by `max_bytes` (see DiskLRUCache).
+    """
+
+    suffix = ".png"
+
+    def __init__(self, directory: Path, max_bytes: int = CHART_CACHE_MAX_MB * 1024 * 1024) -> None:
+        super().__init__(directory, max_bytes)
+
+    def get_many(self, charts: List[Dict[str, Any]], size: Tuple[float, float] = CHART_SIZE, dpi: int = CHART_DPI) -> List[Optional[Path]]:
+        """
+        Return a PNG path (or None for undrawable specs) for every chart,
+        rendering only the specs that aren't cached yet - concurrently and
+        once per distinct spec even if a report repeats a chart.
+        """
+        keys = [chart_key(chart, size, dpi) for chart in charts]
+        found: Dict[str, Optional[Path]] = {}
+        to_render: Dict[str, Dict[str, Any]] = {}
+
+        for key, chart in zip(keys, charts):
+            if key is None or key in found or key in to_render:
+                continue
+            path = self._lookup(key)
+            self._count(hit=path is not None)
+            if path is not None:
+                found[key] = path
+            else:
+                to_render[key] = chart
+
+        if to_render:
+            # Matplotlib is only imported once something actually needs drawing
+            from chart_renderer import render_charts
+
+            # Render to temporary names, then atomically move into place so
+            # readers in other processes never see a half-written PNG.
+            jobs = [(chart, self._temp_path(key)) for key, chart in to_render.items()]
+            for key, (_, tmp), written in zip(to_render, jobs, render_charts(jobs)):
+                if written is None:
+                    found[key] = None
+                    tmp.unlink(missing_ok=True)
+                    continue
+                found[key] = self._commit(key, tmp)
+
+        return [found.get(key) if key else None for key in keys]
@@ -0,0 +1,80 @@
+# chart_renderer.py
+# Chart rendering on per-call Figure/Agg canvases - no pyplot global state, no leaked figures
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from chart_specs import CHART_DPI, CHART_SIZE, prepare_chart
+
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "4"))
+
+
+def _draw(fig: Figure, spec: Dict[str, Any]) -> None:
+    ax = fig.add_subplot()
+    labels, values = spec["labels"], spec["values"]
+
+    if spec["type"] == "bar":
+        ax.bar(labels, values)
+    elif spec["type"] == "line":
+        ax.plot(labels, values, marker="o")
+    elif spec["type"] == "pie":
+        ax.pie(values, labels=labels, autopct="%1.1f%%")
+    elif spec["type"] == "donut":
+        ax.pie(values, labels=labels, autopct="%1.1f%%", pctdistance=0.78, wedgeprops={"width": 0.45})
+
+    ax.set_title(spec["title"])
+    fig.tight_layout()
+
+
+def render_chart(
+    chart: Dict[str, Any],
+    path: Path,
+    size: Tuple[float, float] = CHART_SIZE,
+    dpi: int = CHART_DPI,
+) -> Optional[Path]:
+    """Render one chart spec to a PNG at `path`; returns None for undrawable specs"""
+    spec = prepare_chart(chart)
+    if spec is None:
+        return None
+
+    # A Figure attached to its own Agg canvas is independent of pyplot,
+    # so it is garbage-collected like any other object once dropped.
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        _draw(fig, spec)
+        fig.savefig(str(path))
+    finally:
+        fig.clear()
+    return path
+
+
+def _render_safely(job: Tuple[Dict[str, Any], Path]) -> Optional[Path]:
+    chart, path = job
+    try:
+        return render_chart(chart, path)
+    except Exception as e:
+        # Skip problematic charts but don't break the whole report
+        print(f"[CHARTS] Rendering '{chart.get('title', 'chart')}' failed: {e}")
+        return None
+
+
+def render_charts(
+    jobs: Sequence[Tuple[Dict[str, Any], Path]],
+    max_workers: int = CHART_RENDER_WORKERS,
+) -> List[Optional[Path]]:
+    """
+    Render many (chart, path) pairs concurrently, preserving order.
+    Each result is the written path, or None if that chart was skipped.
+    """
+    if not jobs:
+        return []
+    if len(jobs) == 1 or max_workers <= 1:
+        return [_render_safely(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)), thread_name_prefix="chart") as pool:
+        return list(pool.map(_render_safely, jobs))
@@ -0,0 +1,81 @@
+# chart_specs.py
+# Validation / normalization of demographics chart specs, independent of any drawing backend
+from typing import Any, Dict, List, Optional, Tuple
+
+CHART_SIZE: Tuple[float, float] = (6, 4)
+CHART_DPI = 100
+
+SUPPORTED_CHART_TYPES = ("bar", "line", "pie", "donut")
+
+# Color palette per agent for demographic visuals (PDF and HTML reports)
+AGENT_COLORS = {
+    "IQVIA Insights Agent": "#7c3aed",      # purple
+    "EXIM Trends Agent": "#2563eb",         # blue
+    "Patent Landscape Agent": "#16a34a",    # green
+    "Clinical Trials Agent": "#dc2626",     # red
+    "Internal Knowledge Agent": "#4f46e5",  # indigo
+    "Web Intelligence Agent": "#0891b2",    # cyan
+}
+
+
+def prepare_chart(chart: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Validate a demographics chart spec and return its normalized form:
+    {"type", "labels", "values", "title"} - or None if it can't be drawn.
+
+    Shared by the Matplotlib (raster) and ReportLab (vector) backends. All
+    validation happens here, before any figure exists, so a rejected chart
+    can never leave a figure behind.
+    """
+    data = chart.get("data") or {}
+    labels = [str(label) for label in data.get("labels") or []]
+    values = data.get("values") or []
+
+    # ✅ HARD VALIDATION
+    numeric_values = []
+    for v in values:
+        try:
+            numeric_values.append(float(v))
+        except (ValueError, TypeError):
+            # ❌ Skip charts with invalid numeric data
+            return None
+
+    if not labels or not numeric_values or len(labels) != len(numeric_values):
+        return None
+
+    ctype = chart.get("recommended_chart")
+    if ctype not in SUPPORTED_CHART_TYPES:
+        return None
+    # pie/donut cannot have negatives (or nothing to divide up)
+    if ctype in ("pie", "donut") and (any(v < 0 for v in numeric_values) or sum(numeric_values) <= 0):
+        return None
+
+    return {
+        "type": ctype,
+        "labels": labels,
+        "values": numeric_values,
+        "title": str(chart.get("title", "")),
+    }
+
+
+def agent_sections(report_data: Dict[str, Any]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    """
+    (agent name, summary, charts) per worker result - the section table of
+    both the PDF and the HTML report.
+    Use demographics exactly as passed from the 8080 API:
+     - Either {"agents": {...}}  (direct)
+     - Or {"agent": "...", "raw": {"agents": {...}}}  (via DemographicAgent)
+    """
+    raw_demographics = report_data.get("demographics") or {}
+    if isinstance(raw_demographics, dict) and "agents" in raw_demographics:
+        demographics = raw_demographics.get("agents") or {}
+    elif isinstance(raw_demographics, dict) and isinstance(raw_demographics.get("raw"), dict):
+        demographics = raw_demographics["raw"].get("agents") or {}
+    else:
+        demographics = {}
+
+    agents = []
+    for agent in report_data.get("worker_results") or []:
+        agent_name = agent.get("agent", "Unknown Agent")
+        agents.append((agent_name, (agent.get("summary") or "").strip(), demographics.get(agent_name) or []))
+    return agents
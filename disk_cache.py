@@ -0,0 +1,115 @@
+# disk_cache.py
+# Size-bounded LRU of content-addressed files in one directory (shared by the chart and section caches)
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class DiskLRUCache:
+    """
+    Files are named `<sha256><suffix>`. The in-memory index is LRU-ordered and
+    rebuilt from file mtimes on start-up, so recency survives restarts; hits
+    refresh the mtime. When the directory grows past `max_bytes` the least
+    recently used files are deleted.
+
+    Several processes may share the directory: entries are written to a
+    temporary name and moved into place atomically.
+    """
+
+    suffix = ".bin"
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # key -> size in bytes
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _temp_path(self, key: str) -> Path:
+        return self.directory / f".{key}.{uuid.uuid4().hex}.tmp{self.suffix}"
+
+    def reload(self) -> None:
+        """Rebuild the index from disk (picks up entries from other processes)"""
+        with self._lock:
+            self._index.clear()
+            self._bytes = 0
+            self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            if len(path.stem) != 64:
+                continue  # not a cache entry (temp file, legacy per-report file)
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        with self._lock:
+            if key not in self._index:
+                return None
+            if not path.exists():
+                # Evicted by another process sharing the directory
+                self._bytes -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def _admit(self, key: str, path: Path) -> None:
+        size = path.stat().st_size
+        with self._lock:
+            if key in self._index:
+                self._bytes -= self._index[key]
+            self._index[key] = size
+            self._index.move_to_end(key)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                old_key, old_size = self._index.popitem(last=False)
+                self._bytes -= old_size
+                self._stats["evictions"] += 1
+                try:
+                    self._path(old_key).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _commit(self, key: str, tmp: Path) -> Path:
+        """Move a fully written temp file into place and index it"""
+        final = self._path(key)
+        os.replace(tmp, final)
+        self._admit(key, final)
+        return final
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,170 @@
+# dossier.py
+# Molecule dossier (Screen 4) derived from a session's IQVIA / trials / patents / web / internal results
+import hashlib
+import re
+import time
+from typing import Any, Dict, Iterator, List
+
+from http_encoding import dumps
+from portfolio import candidate_metrics
+
+MAX_UNMET_NEEDS = 4
+MAX_EXPANSIONS = 3
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+PHASE_FEASIBILITY = {"Phase 4": "High", "Phase 3": "High", "Phase 2": "Medium"}
+
+
+def _raw(agent_results: Dict[str, Dict[str, Any]], agent: str) -> Dict[str, Any]:
+    raw = (agent_results.get(agent) or {}).get("raw")
+    return raw if isinstance(raw, dict) else {}
+
+
+def _same_indication(a: str, b: str) -> bool:
+    """'CML' matches 'Chronic Myeloid Leukemia', 'Obesity' matches 'Cardiovascular Disease / Obesity'"""
+    a, b = a.strip().lower(), b.strip().lower()
+    if not a or not b or a in b or b in a:
+        return True
+    initials = lambda text: "".join(word[0] for word in re.findall(r"[a-z]+", text))  # noqa: E731
+    return a.replace(" ", "") == initials(b) or b.replace(" ", "") == initials(a)
+
+
+# ============================================================================
+# Sections
+# ============================================================================
+
+def _unmet_needs(agent_results: Dict[str, Dict[str, Any]]) -> List[str]:
+    needs = []
+    iqvia = _raw(agent_results, "iqvia")
+    if iqvia.get("unmet_need_flag"):
+        needs.append(f"IQVIA flags an unmet need in {iqvia.get('therapy_area') or 'this therapy area'}.")
+    dynamics = (iqvia.get("competition_summary") or {}).get("therapy_dynamics")
+    if dynamics:
+        needs.append(f"Market dynamics: {dynamics}.")
+    for insight in _raw(agent_results, "web").get("patient_forum_insights") or []:
+        themes = ", ".join(insight.get("key_themes") or [])
+        if themes:
+            needs.append(f"Patients discuss {themes} ({insight.get('source')}: {insight.get('sentiment', 'n/a')}).")
+
+    # Fill up from the agents' own summaries
+    for result in agent_results.values():
+        for sentence in SENTENCE_RE.split(result.get("summary") or "")[:2]:
+            if len(needs) >= MAX_UNMET_NEEDS:
+                return needs
+            if len(sentence.strip()) > 20:
+                needs.append(sentence.strip())
+    return needs[:MAX_UNMET_NEEDS]
+
+
+def _indication_expansions(agent_results: Dict[str, Dict[str, Any]], indication: str) -> Iterator[Dict[str, Any]]:
+    """Active trials outside the primary indication, most advanced first, one per indication"""
+    trials = [
+        trial for trial in _raw(agent_results, "trials").get("active_trials") or []
+        if trial.get("indication") and not _same_indication(trial["indication"], indication)
+    ]
+    trials.sort(key=lambda trial: trial.get("phase") or "", reverse=True)
+    seen = set()
+    for trial in trials:
+        if trial["indication"] in seen or len(seen) >= MAX_EXPANSIONS:
+            continue
+        seen.add(trial["indication"])
+        yield {
+            "title": f"Indication Expansion: {trial['indication']}",
+            "description": (
+                f"{trial.get('phase', 'Clinical')} trial {trial.get('nct_id')} ({trial.get('sponsor')}, "
+                f"n={trial.get('enrollment')}) is {str(trial.get('status', 'active')).lower()}"
+            ),
+            "feasibility": PHASE_FEASIBILITY.get(trial.get("phase"), "Low"),
+            "impact": "Medium",
+            "source": "trials",
+        }
+
+
+def _innovation_opportunities(
+    agent_results: Dict[str, Dict[str, Any]], indication: str, metrics: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    opportunities = []
+    market_impact = "High" if metrics["market_musd"] >= 1000 else "Medium"
+
+    patents = _raw(agent_results, "patents")
+    fto = (patents.get("fto_flag") or "").lower()
+    if fto.startswith("clear"):
+        opportunities.append({
+            "title": "Generic / Value-Added Generic Entry",
+            "description": patents.get("generic_opportunity") or patents.get("fto_flag"),
+            "feasibility": "High",
+            "impact": market_impact,
+            "source": "patents",
+        })
+    elif fto.startswith("blocked"):
+        expiries = sorted(
+            p["expiry_date"] for p in patents.get("patent_status") or []
+            if p.get("expiry_date") and str(p.get("status", "")).lower() == "active"
+        )
+        opportunities.append({
+            "title": f"Generic Entry from {expiries[0][:4]}" if expiries else "Generic Entry After Patent Expiry",
+            "description": patents.get("generic_opportunity") or patents.get("fto_flag"),
+            "feasibility": "Low",
+            "impact": market_impact,
+            "source": "patents",
+        })
+
+    opportunities.extend(_indication_expansions(agent_results, indication))
+
+    markets = [m for m in _raw(agent_results, "iqvia").get("markets") or [] if (m.get("cagr_5y") or 0) > 0]
+    if markets:
+        best = max(markets, key=lambda m: m["cagr_5y"])
+        opportunities.append({
+            "title": f"Geographic Focus: {best.get('country')}",
+            "description": (
+                f"Fastest-growing reported market: {best['cagr_5y']}% 5y CAGR "
+                f"on ${best.get('sales_2024_musd')}M 2024 sales"
+            ),
+            "feasibility": "High",
+            "impact": "Medium",
+            "source": "iqvia",
+        })
+
+    growth = (_raw(agent_results, "internal").get("comparative_analysis") or {}).get("growth_opportunity")
+    if growth:
+        opportunities.append({
+            "title": "Internal Strategy Alignment",
+            "description": growth,
+            "feasibility": "Medium",
+            "impact": "Medium",
+            "source": "internal",
+        })
+    return opportunities
+
+
+# ============================================================================
+# Dossier
+# ============================================================================
+
+def build_dossier(molecule: Dict[str, Any], agent_results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The dossier view of one session. `etag` is a hash of the content, so it
+    only changes when the derived data does (not on chat or status writes).
+    """
+    indication = molecule.get("indication") or ""
+    metrics = candidate_metrics({"worker_results": list(agent_results.values())})
+    trials = _raw(agent_results, "trials")
+    dossier = {
+        "molecule": molecule,
+        "unmet_needs": _unmet_needs(agent_results),
+        "trials": trials.get("active_trials", []),
+        "patents": _raw(agent_results, "patents").get("patent_status", []),
+        "innovation_opportunities": _innovation_opportunities(agent_results, indication, metrics),
+        "market_stats": {
+            "market_musd": metrics["market_musd"],
+            "cagr_5y": metrics["cagr_5y"],
+            "unmet_need": metrics["unmet_need"],
+            "fto": metrics["fto"],
+            "active_trials": metrics["active_trials"],
+            "total_trials": trials.get("total_trials"),
+        },
+        "agents": sorted(agent_results),
+    }
+    dossier["etag"] = hashlib.sha1(dumps(dossier)).hexdigest()[:20]
+    dossier["built_at"] = time.time()
+    return dossier
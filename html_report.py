@@ -0,0 +1,175 @@
+# html_report.py
+# Lightweight HTML report from the same report_data as the PDF, with client-side (lazy) charts
+import hashlib
+import json
+import os
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from chart_specs import AGENT_COLORS, agent_sections, prepare_chart
+from disk_cache import DiskLRUCache
+
+REPORT_HTML_CACHE_MB = int(os.getenv("REPORT_HTML_CACHE_MB", "256"))
+CHART_JS_URL = os.getenv("CHART_JS_URL", "https://cdn.jsdelivr.net/npm/chart.js@4.4.4/dist/chart.umd.min.js")
+
+# Bump when the template changes so cached pages are not reused
+HTML_TEMPLATE_VERSION = "1"
+
+PALETTE = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+]
+
+STYLE = """
+body{font-family:-apple-system,Segoe UI,Helvetica,Arial,sans-serif;max-width:860px;margin:2rem auto;padding:0 1rem;color:#1f2933;line-height:1.5}
+h1{font-size:1.9rem;margin-bottom:.2rem}h2{margin-top:2.5rem;border-bottom:1px solid #e5e7eb;padding-bottom:.3rem}
+.topic{color:#52606d;font-size:1.2rem}.agent h2{color:#2c3e50}.insight{font-style:italic;margin-top:0}
+figure.chart{margin:1rem 0 2rem;min-height:280px;position:relative}figure.chart canvas{max-height:320px}
+figcaption{font-weight:600;margin-bottom:.3rem}table.fallback{border-collapse:collapse;font-size:.9rem}
+table.fallback td,table.fallback th{border:1px solid #e5e7eb;padding:.2rem .6rem;text-align:left}
+.actions{margin:1rem 0}.actions a{color:#2563eb}
+"""
+
+# Loads Chart.js only once the first chart scrolls into view, then draws
+# each chart as it becomes visible. Without JS the data tables stay visible.
+SCRIPT = """
+(function(){
+  var charts=[].slice.call(document.querySelectorAll('figure.chart[data-spec]'));
+  if(!charts.length||!('IntersectionObserver' in window))return;
+  var loading=null;
+  function lib(){
+    if(window.Chart)return Promise.resolve();
+    if(!loading)loading=new Promise(function(ok,fail){var s=document.createElement('script');s.src=document.body.dataset.chartjs;s.onload=ok;s.onerror=fail;document.head.appendChild(s);});
+    return loading;
+  }
+  var io=new IntersectionObserver(function(entries){
+    entries.forEach(function(e){
+      if(!e.isIntersecting)return;
+      io.unobserve(e.target);
+      lib().then(function(){
+        var fig=e.target,canvas=document.createElement('canvas');
+        fig.appendChild(canvas);
+        new Chart(canvas,JSON.parse(fig.dataset.spec));
+        var table=fig.querySelector('table.fallback');if(table)table.hidden=true;
+      });
+    });
+  },{rootMargin:'200px'});
+  charts.forEach(function(c){io.observe(c);});
+})();
+"""
+
+
+def chart_js_spec(chart: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Chart.js config for a chart spec, or None if `prepare_chart` rejects it"""
+    spec = prepare_chart(chart)
+    if spec is None:
+        return None
+    round_chart = spec["type"] in ("pie", "donut")
+    dataset: Dict[str, Any] = {"label": spec["title"], "data": spec["values"]}
+    if round_chart:
+        dataset["backgroundColor"] = [PALETTE[i % len(PALETTE)] for i in range(len(spec["values"]))]
+    else:
+        dataset["backgroundColor"] = PALETTE[0]
+        dataset["borderColor"] = PALETTE[0]
+    return {
+        "type": {"donut": "doughnut"}.get(spec["type"], spec["type"]),
+        "data": {"labels": spec["labels"], "datasets": [dataset]},
+        "options": {
+            "animation": False,
+            "maintainAspectRatio": False,
+            "plugins": {"legend": {"display": round_chart}},
+        },
+    }
+
+
+def html_key(report_data: Dict[str, Any], pdf_url: Optional[str] = None) -> str:
+    """Content hash of everything the page shows"""
+    payload = {
+        "version": HTML_TEMPLATE_VERSION,
+        "pdf_url": pdf_url,
+        "topic": report_data.get("topic", "Innovation Opportunity Assessment"),
+        "final_answer": report_data.get("final_answer", ""),
+        "agents": [
+            [name, summary, [[chart.get("title"), chart.get("insight"), prepare_chart(chart)] for chart in charts]]
+            for name, summary, charts in agent_sections(report_data)
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _paragraphs(text: str) -> str:
+    return "".join(f"<p>{escape(block.strip())}</p>" for block in text.split("\n\n") if block.strip())
+
+
+def _chart_html(chart: Dict[str, Any], color: str) -> str:
+    spec = chart_js_spec(chart)
+    if spec is None:
+        return ""
+    title = escape(str(chart.get("title", "Chart")))
+    insight = chart.get("insight")
+    rows = "".join(
+        f"<tr><td>{escape(str(label))}</td><td>{value:g}</td></tr>"
+        for label, value in zip(spec["data"]["labels"], spec["data"]["datasets"][0]["data"])
+    )
+    return (
+        f'<figure class="chart" data-spec="{escape(json.dumps(spec, separators=(",", ":")))}">'
+        f'<figcaption style="color:{color}">{title}</figcaption>'
+        + (f'<p class="insight" style="color:{color}">{escape(str(insight))}</p>' if insight else "")
+        + f'<table class="fallback"><tbody>{rows}</tbody></table></figure>'
+    )
+
+
+def render_html(report_data: Dict[str, Any], pdf_url: Optional[str] = None) -> str:
+    """Full standalone HTML page for a report; charts are JSON specs drawn by Chart.js on demand"""
+    topic = escape(report_data.get("topic", "Innovation Opportunity Assessment"))
+    final_answer = report_data.get("final_answer", "")
+
+    parts = [
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">",
+        "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">",
+        f"<title>{topic} - PharmaVerse</title><style>{STYLE}</style></head>",
+        f'<body data-chartjs="{escape(CHART_JS_URL)}">',
+        "<h1>PharmaVerse Innovation Assessment</h1>",
+        f'<p class="topic">{topic}</p>',
+    ]
+    if pdf_url:
+        parts.append(f'<p class="actions"><a href="{escape(pdf_url)}">Download PDF</a></p>')
+
+    parts.append("<section><h2>Executive Summary</h2>")
+    parts.append(_paragraphs(final_answer) if final_answer else "<p>No executive summary available.</p>")
+    parts.append("</section>")
+
+    for name, summary, charts in agent_sections(report_data):
+        color = AGENT_COLORS.get(name, "#111827")
+        parts.append(f'<section class="agent"><h2>{escape(name)}</h2>')
+        if summary:
+            parts.append("<h3>Narrative Summary</h3>" + _paragraphs(summary))
+        figures = "".join(_chart_html(chart, color) for chart in charts)
+        if figures:
+            parts.append("<h3>Visual Insights</h3>" + figures)
+        parts.append("</section>")
+
+    parts.append(f"<script>{SCRIPT}</script></body></html>")
+    return "".join(parts)
+
+
+class HtmlReportCache(DiskLRUCache):
+    """Rendered pages keyed by `html_key`, so identical reports share one file"""
+
+    suffix = ".html"
+
+    def __init__(self, directory: Path, max_bytes: int = REPORT_HTML_CACHE_MB * 1024 * 1024) -> None:
+        super().__init__(directory, max_bytes)
+
+    def get_or_render(self, report_data: Dict[str, Any], pdf_url: Optional[str] = None) -> Tuple[str, Path]:
+        """(key, path) of the cached page, rendering it first if needed"""
+        key = html_key(report_data, pdf_url)
+        path = self._lookup(key)
+        self._count(hit=path is not None)
+        if path is None:
+            tmp = self._temp_path(key)
+            tmp.write_text(render_html(report_data, pdf_url), encoding="utf-8")
+            path = self._commit(key, tmp)
+        return key, path
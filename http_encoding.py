@@ -0,0 +1,291 @@
+# http_encoding.py
+# Fast JSON encoding and Accept-Encoding / Accept negotiation for the FastAPI apps
+import gzip
+import json
+import os
+from email.utils import parsedate
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# orjson, brotli and msgpack are optional - fall back gracefully if missing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Only text-like bodies are worth compressing; PDFs and PNGs are already dense
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+# ============================================================================
+# JSON Encoding
+# ============================================================================
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to compact UTF-8 JSON, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=str
+    ).encode("utf-8")
+
+
+def loads(body: bytes) -> Any:
+    """Parse a JSON body, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class for the API apps (orjson-backed when installed)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ============================================================================
+# Content Negotiation
+# ============================================================================
+
+def _parse_quality_list(header_value: str) -> Dict[str, float]:
+    """Parse an Accept / Accept-Encoding header into {token: q}"""
+    parsed: Dict[str, float] = {}
+    for item in header_value.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        token = parts[0].lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        parsed[token] = q
+    return parsed
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content-coding ('br' or 'gzip') or None"""
+    offered = _parse_quality_list(accept_encoding)
+    candidates = []
+    if BROTLI_AVAILABLE:
+        candidates.append("br")
+    candidates.append("gzip")
+
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = offered.get(coding, offered.get("*", 0.0))
+        # Ties keep the earlier (preferred) candidate
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """True if the client explicitly asked for a msgpack body"""
+    offered = _parse_quality_list(accept)
+    msgpack_q = max(offered.get(t, 0.0) for t in MSGPACK_MEDIA_TYPES)
+    json_q = offered.get("application/json", 0.0)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _is_compressible(media_type: str) -> bool:
+    return any(media_type.startswith(t) for t in COMPRESSIBLE_MEDIA_TYPES)
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compress a body with the negotiated content-coding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+# ============================================================================
+# File Delivery
+# ============================================================================
+
+def is_not_modified(request_headers: Headers, etag: str, last_modified: str) -> bool:
+    """Evaluate If-None-Match (preferred) / If-Modified-Since against a file's validators"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses weak comparison: W/"x" matches "x"
+        return etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        since, modified = parsedate(if_modified_since), parsedate(last_modified)
+        return since is not None and modified is not None and since >= modified
+    return False
+
+
+def file_response(
+    request: Request,
+    path: Union[str, Path],
+    media_type: str,
+    filename: Optional[str] = None,
+    stat_result: Optional[os.stat_result] = None,
+    etag: Optional[str] = None,
+    weak: bool = False,
+) -> Response:
+    """
+    Serve a file that is already on disk.
+
+    Conditional requests get a bodiless 304. Everything else is a
+    FileResponse, which streams the file in chunks (or hands the path to the
+    server via `http.response.pathsend` where supported), advertises
+    `Accept-Ranges` and answers Range / If-Range requests with 206.
+
+    `etag` replaces the mtime/size ETag for content-addressed files whose
+    mtime is touched on every cache hit. Pass `weak` for text files that
+    ResponseEncodingMiddleware may compress: the bytes sent then differ from
+    the file, so a strong ETag would be wrong.
+    """
+    stat_result = stat_result or os.stat(path)
+    response = FileResponse(path, media_type=media_type, filename=filename, stat_result=stat_result)
+    response.headers["cache-control"] = "private, no-cache"
+    if etag:
+        response.headers["etag"] = f'"{etag}"'
+    if weak and not response.headers["etag"].startswith("W/"):
+        response.headers["etag"] = "W/" + response.headers["etag"]
+
+    if request.method in ("GET", "HEAD") and is_not_modified(
+        request.headers, response.headers["etag"], response.headers["last-modified"]
+    ):
+        return Response(
+            status_code=304,
+            headers={k: response.headers[k] for k in ("etag", "last-modified", "cache-control")},
+        )
+    return response
+
+
+# ============================================================================
+# Middleware
+# ============================================================================
+
+class ResponseEncodingMiddleware:
+    """
+    Re-encodes JSON bodies as msgpack when the client asks for it via Accept,
+    then compresses bodies above `minimum_size` with br/gzip according to
+    Accept-Encoding.
+
+    Only single-message bodies (regular JSON/text responses) are touched.
+    Streaming and file responses (PDF downloads, SSE) pass through unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        enable_msgpack: bool = True,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enable_msgpack = enable_msgpack and MSGPACK_AVAILABLE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        want_msgpack = self.enable_msgpack and accepts_msgpack(headers.get("accept", ""))
+
+        if not encoding and not want_msgpack:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                # e.g. http.response.pathsend from FileResponse
+                if start_message is not None and not passthrough:
+                    passthrough = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            response_headers = MutableHeaders(raw=start_message["headers"])
+            media_type = response_headers.get("content-type", "").split(";")[0].strip().lower()
+
+            if (
+                message.get("more_body", False)
+                or not message.get("body")
+                or start_message["status"] in (204, 206, 304)
+                or "content-encoding" in response_headers
+                or not _is_compressible(media_type)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+
+            if want_msgpack and media_type == "application/json":
+                body = msgpack.packb(loads(body), use_bin_type=True)
+                response_headers["content-type"] = "application/msgpack"
+                response_headers.add_vary_header("Accept")
+
+            if encoding and len(body) >= self.minimum_size:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                response_headers["content-encoding"] = encoding
+                response_headers.add_vary_header("Accept-Encoding")
+
+            response_headers["content-length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,76 @@
+# json_patch.py
+# Minimal RFC 6902 JSON Patch: diff two JSON-like values, apply a patch
+import copy
+from typing import Any, Dict, List
+
+Patch = List[Dict[str, Any]]
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(a: Any, b: Any) -> bool:
+    """JSON equality: unlike ==, 1 and True (or 0 and False, 1 and 1.0) differ"""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def diff(old: Any, new: Any, path: str = "") -> Patch:
+    """
+    Operations turning `old` into `new`. Dicts are diffed key by key; a list
+    that only grew gets `add .../-` per new item (chat history, logs),
+    anything else is replaced whole.
+    """
+    if _same(old, new):
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: Patch = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops.extend(diff(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(new) > len(old) and _same(new[:len(old)], old):
+        return [{"op": "add", "path": f"{path}/-", "value": item} for item in new[len(old):]]
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply(document: Any, patch: Patch) -> Any:
+    """`document` with `patch` applied (the input is not modified)"""
+    document = copy.deepcopy(document)
+    for op in patch:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            if op["op"] != "remove":
+                document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if op["op"] == "remove":
+            del parent[int(last) if isinstance(parent, list) else last]
+        elif isinstance(parent, list):
+            if last == "-":
+                parent.append(copy.deepcopy(op["value"]))
+            elif op["op"] == "add":
+                parent.insert(int(last), copy.deepcopy(op["value"]))
+            else:
+                parent[int(last)] = copy.deepcopy(op["value"])
+        else:
+            parent[last] = copy.deepcopy(op["value"])
+    return document
@@ -1,20 +1,28 @@
-from fastapi import FastAPI, Query, Body,Request
+from fastapi import FastAPI, Query, Body,Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
+import asyncio
 import json
+import time
+import os
 from pathlib import Path
 import io
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from matplotlib import pyplot as plt
+from http_encoding import FastJSONResponse, ResponseEncodingMiddleware, dumps, file_response, loads
+from pharma_agents.entity_resolver import canonical_molecule_id, mentioned_molecules
+from report_jobs import ReportJob, ReportJobManager, ReportQueueFull, TERMINAL_STATUSES
+from report_store import REPORT_GC_INTERVAL_S, ReportStore, new_report_id
+from tabular_export import ExportFormatUnavailable, export_response
 
 
-# In-memory storage for report data (in production, use a database)
-report_storage: Dict[str, Dict[str, Any]] = {}
+# Durable report index (SQLite) - survives restarts, see report_store.py
+report_storage = ReportStore()
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# orjson bodies, msgpack via Accept and br/gzip via Accept-Encoding
+app.add_middleware(ResponseEncodingMiddleware, minimum_size=1024)
 
 # Allow your frontend / agent framework to call this
 app.add_middleware(
@@ -30,7 +38,8 @@ app.add_middleware(
 @app.get("/api/iqvia")
 def get_iqvia(molecule: str):
     """Queries IQVIA datasets for sales trends, volume shifts and therapy area dynamics"""
-    if molecule.lower() == "metformin":
+    molecule_id = canonical_molecule_id(molecule)
+    if molecule_id == "metformin":
         return {
             "molecule": "Metformin",
             "markets": [
@@ -45,7 +54,7 @@ def get_iqvia(molecule: str):
                 "therapy_dynamics": "Stable growth driven by diabetes prevalence increase"
             }
         }
-    elif molecule.lower() == "imatinib":
+    elif molecule_id == "imatinib":
         return {
             "molecule": "Imatinib",
             "markets": [
@@ -81,7 +90,8 @@ def get_exim_trends(
     year: Optional[int] = 2024
 ):
     """Extracts export-import data for APIs/formulations across countries"""
-    if product.lower() == "metformin api":
+    product_id = canonical_molecule_id(product)
+    if product_id == "metformin":
         return {
             "product": "Metformin API",
             "year": year,
@@ -115,7 +125,7 @@ def get_exim_trends(
             "sourcing_insights": "Market dominated by Asian manufacturers, particularly China and India",
             "trend": "Increasing shift towards Indian suppliers due to geopolitical factors"
         }
-    elif product.lower() == "imatinib api" or product.lower() == "imatinib":
+    elif product_id == "imatinib":
         return {
             "product": "Imatinib API",
             "year": year,
@@ -158,7 +168,7 @@ def get_exim_trends(
             "sourcing_insights": "India dominates imatinib API manufacturing post-patent expiry. Multiple WHO-prequalified suppliers available.",
             "trend": "Stable supply with competitive pricing due to generic competition. India accounts for 60% of global imatinib API production."
         }
-    elif product.lower() == "paracetamol":
+    elif product_id == "paracetamol":
         return {
             "product": "Paracetamol",
             "year": year,
@@ -193,7 +203,8 @@ def get_exim_trends(
 @app.get("/api/patents")
 def get_patent_landscape(molecule: str, indication: Optional[str] = None):
     """Searches USPTO and other IP databases for active patents, expiry timelines and FTO flags"""
-    if molecule.lower() == "imatinib":
+    molecule_id = canonical_molecule_id(molecule)
+    if molecule_id == "imatinib":
         return {
             "molecule": "Imatinib",
             "indication": indication or "CML",
@@ -227,7 +238,7 @@ def get_patent_landscape(molecule: str, indication: Optional[str] = None):
             },
             "generic_opportunity": "High - All major patents expired globally"
         }
-    elif molecule.lower() == "semaglutide":
+    elif molecule_id == "semaglutide":
         return {
             "molecule": "Semaglutide",
             "indication": indication or "Type 2 Diabetes / Obesity",
@@ -274,7 +285,8 @@ def get_clinical_trials(
     phase: Optional[str] = None
 ):
     """Fetches trial pipeline data from ClinicalTrials.gov or WHO ICTRP"""
-    if molecule and molecule.lower() == "semaglutide":
+    molecule_id = canonical_molecule_id(molecule)
+    if molecule_id == "semaglutide":
         return {
             "molecule": "Semaglutide",
             "total_trials": 287,
@@ -330,7 +342,7 @@ def get_clinical_trials(
                 "Asia": 44
             }
         }
-    elif molecule and molecule.lower() == "imatinib":
+    elif molecule_id == "imatinib":
         return {
             "molecule": "Imatinib",
             "total_trials": 1847,
@@ -503,7 +515,7 @@ def get_internal_knowledge(
                 "growth_rate_vs_market": "+2.1% above market average"
             }
         }
-    elif topic and ("imatinib" in topic.lower() or "oncology" in topic.lower() or "cml" in topic.lower()):
+    elif topic and ("imatinib" in mentioned_molecules(topic) or "oncology" in topic.lower() or "cml" in topic.lower()):
         return {
             "topic": "Imatinib / Oncology Strategy",
             "documents_found": 12,
@@ -640,7 +652,7 @@ def get_web_intelligence(
                 }
             ]
         }
-    elif "imatinib" in query.lower():
+    elif "imatinib" in mentioned_molecules(query):
         return {
             "query": query,
             "results_count": 3456,
@@ -727,7 +739,7 @@ def get_web_intelligence(
                 }
             ]
         }
-    elif "metformin" in query.lower() and "patient" in query.lower():
+    elif "metformin" in mentioned_molecules(query) and "patient" in query.lower():
         return {
             "query": query,
             "results_count": 2340,
@@ -775,14 +787,9 @@ def get_web_intelligence(
 
 from fastapi import Query, Body
 from fastapi.responses import FileResponse
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
-)
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import matplotlib.pyplot as plt
+from chart_cache import ChartCache
+from html_report import HtmlReportCache
+from report_sections import PYPDF_AVAILABLE, REPORT_SECTION_CACHE, SectionCache
 
 # ============================================================================
 # Storage
@@ -792,8 +799,34 @@ CHART_DIR = REPORT_DIR / "charts"
 REPORT_DIR.mkdir(parents=True, exist_ok=True)
 CHART_DIR.mkdir(parents=True, exist_ok=True)
 
+# Identical chart specs (same data, title, size, DPI) are rendered once and reused
+chart_cache = ChartCache(CHART_DIR)
+
+# "raster" (cached Matplotlib PNGs) or "vector" (native ReportLab drawings);
+# a report can override it with "chart_backend" in its request body
+REPORT_CHART_BACKEND = os.getenv("REPORT_CHART_BACKEND", "raster")
+CHART_BACKENDS = ("raster", "vector")
+
+# "pdf" renders the PDF straight away in a worker process; "html" reports
+# are rendered inline and the PDF only when someone downloads it. ReportAgent
+# asks for "html"; the default stays "pdf" for API clients that expect a job
+REPORT_DEFAULT_FORMAT = os.getenv("REPORT_DEFAULT_FORMAT", "pdf")
+REPORT_FORMATS = ("html", "pdf")
+# How long a download waits for an on-demand PDF before answering 202
+REPORT_ON_DEMAND_WAIT_S = float(os.getenv("REPORT_ON_DEMAND_WAIT_S", "60"))
+
+# Rendered HTML pages, keyed by a hash of their content
+html_cache = HtmlReportCache(REPORT_DIR / "html")
+
+# Portfolio reports lay out many candidates in one job, so they get longer
+PORTFOLIO_JOB_TIMEOUT_S = float(os.getenv("PORTFOLIO_JOB_TIMEOUT_S", "900"))
+
+# ReportLab / Matplotlib are imported on the first render. Set this to pay
+# that cost at start-up instead (in the background, plus in report workers).
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") not in ("0", "false", "no")
+
 # ============================================================================
-# Chart Generator
+# Chart Generator (see chart_renderer.py)
 # ============================================================================
 # def generate_chart(chart: Dict[str, Any], path: Path):
 #     labels = chart["data"]["labels"]
@@ -817,44 +850,6 @@ CHART_DIR.mkdir(parents=True, exist_ok=True)
 #     plt.savefig(path)
 #     plt.close()
 #     return path
-def generate_chart(chart: Dict[str, Any], path: Path):
-    labels = chart["data"].get("labels", [])
-    values = chart["data"].get("values", [])
-
-    # ✅ HARD VALIDATION
-    numeric_values = []
-    for v in values:
-        try:
-            numeric_values.append(float(v))
-        except (ValueError, TypeError):
-            # ❌ Skip charts with invalid numeric data
-            return None
-
-    if not labels or not numeric_values:
-        return None
-
-    plt.figure(figsize=(6, 4))
-
-    ctype = chart.get("recommended_chart")
-
-    if ctype == "bar":
-        plt.bar(labels, numeric_values)
-    elif ctype == "line":
-        plt.plot(labels, numeric_values, marker="o")
-    elif ctype == "pie":
-        # pie cannot have negatives
-        if any(v < 0 for v in numeric_values):
-            return None
-        plt.pie(numeric_values, labels=labels, autopct="%1.1f%%")
-    else:
-        return None
-
-    plt.title(chart.get("title", ""))
-    plt.tight_layout()
-    plt.savefig(str(path))
-    plt.close()
-    return path
-
 # ============================================================================
 # PDF Generator
 # ============================================================================
@@ -912,165 +907,33 @@ def generate_chart(chart: Dict[str, Any], path: Path):
 #         story.append(PageBreak())
 
 #     doc.build(story)
-def generate_pdf(report_id: str, report_data: Dict[str, Any], output_path: Path):
+# Unchanged report sections are reused as PDF fragments (see report_sections.py)
+section_cache = SectionCache(REPORT_DIR / "sections")
+
+
+def warmup() -> None:
+    """Import the PDF / chart rendering stack ahead of the first report"""
+    started = time.perf_counter()
+    import chart_renderer  # noqa: F401  (Matplotlib)
+    import pdf_report  # noqa: F401  (ReportLab, pypdf)
+    print(f"[WARMUP] report rendering stack loaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def generate_pdf(report_id: str, report_data: Dict[str, Any], output_path: Path) -> int:
     """
-    Generate a professional-looking PDF report with:
-      - Cover page
-      - Executive summary
-      - Per-agent sections (only if demographics / charts available)
-      - Charts appended after each agent summary
-
-    NOTE: To keep this endpoint self-contained and robust in offline
-    environments, we format agent summaries heuristically instead of
-    calling an LLM again here. The summaries coming from agents are
-    already LLM-generated.
+    Render a report PDF (layout in pdf_report.py) and return its page count.
+    ReportLab and Matplotlib are imported here, on the first render, rather
+    than when the API starts.
     """
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(
-        name="AgentHeader",
-        fontSize=18,
-        spaceAfter=12,
-        textColor=colors.HexColor("#2c3e50")
-    ))
-    styles.add(ParagraphStyle(
-        name="AgentSummary",
-        fontSize=11,
-        leading=14,
-        spaceAfter=6,
-    ))
-    styles.add(ParagraphStyle(
-        name="SectionTitle",
-        fontSize=14,
-        spaceAfter=8,
-        textColor=colors.HexColor("#1f2933")
-    ))
-
-    # Convert Path → str for reportlab
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=A4,
-        leftMargin=40,
-        rightMargin=40,
-        topMargin=40,
-        bottomMargin=40,
-    )
-
-    story: List[Any] = []
-
-    topic = report_data.get("topic", "Innovation Opportunity Assessment")
-    final_answer = report_data.get("final_answer", "")
-
-    # ------------------------------------------------------------------
-    # Cover
-    # ------------------------------------------------------------------
-    story.append(Paragraph("PharmaVerse Innovation Assessment", styles["Title"]))
-    story.append(Spacer(1, 0.3 * inch))
-    story.append(Paragraph(topic, styles["Heading2"]))
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(
-        Paragraph(
-            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-            styles["Normal"]
-        )
+    import pdf_report
+
+    return pdf_report.generate_pdf(
+        report_data,
+        output_path,
+        chart_cache,
+        section_cache,
+        chart_backend=report_data.get("chart_backend") or REPORT_CHART_BACKEND,
     )
-    story.append(PageBreak())
-
-    # ------------------------------------------------------------------
-    # Executive Summary (already LLM-generated)
-    # ------------------------------------------------------------------
-    story.append(Paragraph("Executive Summary", styles["Heading1"]))
-    if final_answer:
-        # final_answer may contain markdown-like formatting; keep simple
-        for line in final_answer.split("\n\n"):
-            if not line.strip():
-                continue
-            story.append(Paragraph(line.strip(), styles["Normal"]))
-            story.append(Spacer(1, 0.1 * inch))
-    else:
-        story.append(Paragraph("No executive summary available.", styles["Normal"]))
-    story.append(PageBreak())
-
-    # ------------------------------------------------------------------
-    # Agent Sections with demographics (if available)
-    # Use demographics exactly as passed from the 8080 API:
-    #  - Either {"agents": {...}}  (direct)
-    #  - Or {"agent": "...", "raw": {"agents": {...}}}  (via DemographicAgent)
-    # ------------------------------------------------------------------
-    raw_demographics = report_data.get("demographics") or {}
-    if isinstance(raw_demographics, dict) and "agents" in raw_demographics:
-        demographics = raw_demographics.get("agents") or {}
-    elif isinstance(raw_demographics, dict) and isinstance(raw_demographics.get("raw"), dict):
-        demographics = raw_demographics["raw"].get("agents") or {}
-    else:
-        demographics = {}
-    worker_results = report_data.get("worker_results") or []
-
-    # Color palette per agent for demographic visuals
-    agent_colors = {
-        "IQVIA Insights Agent": "#7c3aed",      # purple
-        "EXIM Trends Agent": " #2563eb",        # blue
-        "Patent Landscape Agent": "#16a34a",    # green
-        "Clinical Trials Agent": "#dc2626",     # red
-        "Internal Knowledge Agent": "#4f46e5",  # indigo
-        "Web Intelligence Agent": "#0891b2",    # cyan
-    }
-
-    for agent in worker_results:
-        agent_name = agent.get("agent", "Unknown Agent")
-        agent_summary = agent.get("summary", "").strip()
-        agent_charts = demographics.get(agent_name) or []
-
-        # ------------------------------------------------------------------
-        # Agent header
-        # ------------------------------------------------------------------
-        story.append(Paragraph(agent_name, styles["AgentHeader"]))
-
-        # Lightly structure the agent summary (already LLM-generated text)
-        if agent_summary:
-            story.append(Paragraph("Narrative Summary", styles["SectionTitle"]))
-            for block in agent_summary.split("\n\n"):
-                text = block.strip()
-                if not text:
-                    continue
-                story.append(Paragraph(text, styles["AgentSummary"]))
-                story.append(Spacer(1, 0.05 * inch))
-            story.append(Spacer(1, 0.2 * inch))
-
-        # ------------------------------------------------------------------
-        # Charts / Visual Insights (optional)
-        # ------------------------------------------------------------------
-        chart_images: List[Path] = []
-        if agent_charts:
-            story.append(Paragraph("Visual Insights", styles["SectionTitle"]))
-
-            for chart in agent_charts:
-                try:
-                    img_path = CHART_DIR / f"{report_id}_{chart.get('id', chart.get('title', 'chart'))}.png"
-                    saved = generate_chart(chart, img_path)
-                    if not saved:
-                        continue
-                    chart_images.append(saved)
-
-                    title = chart.get("title", "Chart")
-                    insight = chart.get("insight", "")
-                    color = agent_colors.get(agent_name, "#111827")
-
-                    # Colored title and insight per agent
-                    story.append(Paragraph(f'<font color="{color}">{title}</font>', styles["Heading3"]))
-                    if insight:
-                        story.append(Paragraph(f'<font color="{color}">{insight}</font>', styles["Italic"]))
-                    story.append(Image(str(saved), width=5 * inch, height=3 * inch))
-                    story.append(Spacer(1, 0.3 * inch))
-                except Exception as e:
-                    # Skip problematic charts but don't break the whole report
-                    print(f"[REPORT][{agent_name}] Chart generation failed: {e}")
-                    continue
-
-        # Add reasonable spacing after each agent section instead of page break
-        story.append(Spacer(1, 0.5 * inch))
-
-    doc.build(story)
-    print(f"[REPORT GENERATED] {output_path.resolve()}")
 
 # ============================================================================
 # API: Generate Report
@@ -1125,22 +988,124 @@ def generate_pdf(report_id: str, report_data: Dict[str, Any], output_path: Path)
 #             "status": "error",
 #             "message": str(e)
 #         }
-@app.post("/api/generate-report")
+def render_report_file(report_id: str, report_data: Dict[str, Any], output_path: str) -> Dict[str, Any]:
+    """Process-pool entry point: render one PDF and report how long it took"""
+    started = time.perf_counter()
+    before = chart_cache.stats(), section_cache.stats()
+    page_count = generate_pdf(report_id=report_id, report_data=report_data, output_path=Path(output_path))
+    after = chart_cache.stats(), section_cache.stats()
+    return {
+        "render_ms": round((time.perf_counter() - started) * 1000, 1),
+        "page_count": page_count,
+        "chart_cache": {k: after[0][k] - before[0][k] for k in ("hits", "misses", "evictions")},
+        "section_cache": {k: after[1][k] - before[1][k] for k in ("hits", "misses", "evictions")},
+    }
+
+
+def render_portfolio_file(report_id: str, portfolio: Dict[str, Any], output_path: str) -> Dict[str, Any]:
+    """Process-pool entry point for portfolio reports (see pdf_report.generate_portfolio_pdf)"""
+    import pdf_report
+
+    started = time.perf_counter()
+    before = chart_cache.stats(), section_cache.stats()
+    page_count = pdf_report.generate_portfolio_pdf(
+        portfolio["title"],
+        portfolio["candidates"],
+        portfolio["rows"],
+        Path(output_path),
+        chart_cache,
+        section_cache,
+        chart_backend=portfolio.get("chart_backend") or REPORT_CHART_BACKEND,
+    )
+    after = chart_cache.stats(), section_cache.stats()
+    return {
+        "render_ms": round((time.perf_counter() - started) * 1000, 1),
+        "page_count": page_count,
+        "candidates": len(portfolio["rows"]),
+        "chart_cache": {k: after[0][k] - before[0][k] for k in ("hits", "misses", "evictions")},
+        "section_cache": {k: after[1][k] - before[1][k] for k in ("hits", "misses", "evictions")},
+    }
+
+
+def submit_portfolio_report(
+    title: str,
+    candidates: List[Dict[str, Any]],
+    rows: List[Dict[str, Any]],
+    chart_backend: Optional[str] = None,
+) -> ReportJob:
+    """
+    Queue one portfolio PDF. `candidates` are report_data-shaped dicts and
+    `rows` their ranking (portfolio.rank_candidates). Raises ReportQueueFull.
+    """
+    report_id = new_report_id()
+    pdf_path = REPORT_DIR / f"{report_id}.pdf"
+    portfolio = {"title": title, "candidates": candidates, "rows": rows, "chart_backend": chart_backend}
+    job = report_jobs.submit(
+        report_id, title, report_id, portfolio, str(pdf_path),
+        render_fn=render_portfolio_file,
+        timeout_s=PORTFOLIO_JOB_TIMEOUT_S,
+    )
+    report_storage.add(
+        report_id,
+        str(pdf_path),
+        topic=title,
+        chart_backend=chart_backend or REPORT_CHART_BACKEND,
+        report_format="portfolio",
+        report_data=dumps(portfolio),
+    )
+    return job
+
+
+def _store_finished_report(job: ReportJob) -> None:
+    """Record the outcome in the report index so the download route can find it"""
+    if job.status != "completed":
+        print(f"[REPORT FAILED] {job.report_id}: {job.error}")
+        record = report_storage.get(job.report_id)
+        # An HTML report stays usable when only its on-demand PDF failed
+        if not record or record["report_format"] != "html":
+            report_storage.mark_failed(job.report_id, job.error)
+        return
+    for key, value in job.result.get("chart_cache", {}).items():
+        chart_cache_totals[key] = chart_cache_totals.get(key, 0) + value
+    for key, value in job.result.get("section_cache", {}).items():
+        section_cache_totals[key] = section_cache_totals.get(key, 0) + value
+    report_storage.mark_completed(job.report_id, job.render_ms, job.result.get("page_count"))
+
+
+report_jobs = ReportJobManager(render_fn=render_report_file, on_complete=_store_finished_report)
+
+# Chart cache counters summed over all report jobs (renders run in worker processes)
+chart_cache_totals = {"hits": 0, "misses": 0, "evictions": 0}
+section_cache_totals = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _pdf_url(report_id: str) -> str:
+    return f"/downloads/reports/{report_id}.pdf"
+
+
+def _job_links(job: ReportJob) -> Dict[str, str]:
+    return {
+        "download_url": _pdf_url(job.report_id),
+        "status_url": f"/api/report-jobs/{job.job_id}",
+        "result_url": f"/api/report-jobs/{job.job_id}/result",
+        "events_url": f"/ws/report-jobs/{job.job_id}",
+    }
+
+
+@app.post("/api/generate-report", status_code=202)
 async def generate_report(request: Request):
-    """Generate a comprehensive PDF report"""
+    """
+    Create a report. As PDF (default) it is queued for a worker process; as
+    HTML ("format": "html") it is ready immediately and the PDF is rendered
+    on first download.
+    """
     try:
         data = await request.json()
 
         topic = data.get("topic", "Report")
-        user_query = data.get("user_query", "")
-        plan = data.get("plan", {})
-        worker_results = data.get("worker_results", [])
-        demographics = data.get("demographics", {})
-        final_answer = data.get("final_answer", "")
-        include_sections = data.get("include_sections", [])
 
-        # ✅ Generate report ID
-        report_id = f"report_{int(datetime.now().timestamp())}"
+        # ✅ Generate report ID (time-sortable, unique within the same second)
+        report_id = new_report_id()
 
         # ✅ Define real PDF path
         pdf_path = REPORT_DIR / f"{report_id}.pdf"
@@ -1148,41 +1113,202 @@ async def generate_report(request: Request):
         # ✅ BUILD REPORT DATA
         report_data = {
             "topic": topic,
-            "user_query": user_query,
-            "plan": plan,
-            "worker_results": worker_results,
-            "demographics": demographics,
-            "final_answer": final_answer,
-            "include_sections": include_sections,
+            "user_query": data.get("user_query", ""),
+            "plan": data.get("plan", {}),
+            "worker_results": data.get("worker_results", []),
+            "demographics": data.get("demographics", {}),
+            "final_answer": data.get("final_answer", ""),
+            "include_sections": data.get("include_sections", []),
         }
-
-        # 🔥 THIS WAS MISSING — ACTUALLY CREATE THE PDF
-        generate_pdf(
-            report_id=report_id,
-            report_data=report_data,
-            output_path=pdf_path
+        chart_backend = data.get("chart_backend")
+        if chart_backend:
+            if chart_backend not in CHART_BACKENDS:
+                return FastJSONResponse(
+                    status_code=400,
+                    content={"status": "error", "message": f"chart_backend must be one of {', '.join(CHART_BACKENDS)}"}
+                )
+            report_data["chart_backend"] = chart_backend
+        report_format = data.get("format") or REPORT_DEFAULT_FORMAT
+        if report_format not in REPORT_FORMATS:
+            return FastJSONResponse(
+                status_code=400,
+                content={"status": "error", "message": f"format must be one of {', '.join(REPORT_FORMATS)}"}
+            )
+
+        plan = report_data["plan"] if isinstance(report_data["plan"], dict) else {}
+        molecule = canonical_molecule_id(plan.get("molecule"))
+        if molecule is None:
+            mentioned = mentioned_molecules(report_data["user_query"] or topic)
+            molecule = mentioned[0] if mentioned else None
+
+        record = dict(
+            topic=topic,
+            molecule=molecule,
+            indication=plan.get("indication"),
+            session_id=data.get("session_id"),
+            chart_backend=report_data.get("chart_backend") or REPORT_CHART_BACKEND,
+            report_format=report_format,
+            report_data=dumps(report_data),
         )
 
-        # ✅ Store metadata (optional, but fine)
-        report_storage[report_id] = {
-            "path": str(pdf_path),
-            "topic": topic,
-            "timestamp": datetime.now().isoformat()
-        }
-
-        return {
-            "status": "success",
-            "report_id": report_id,
-            "download_url": f"/downloads/reports/{report_id}.pdf",
-            "message": f"Report '{topic}' generated successfully"
-        }
+        if report_format == "html":
+            report_storage.add(report_id, str(pdf_path), status="completed", **record)
+            await asyncio.to_thread(html_cache.get_or_render, report_data, _pdf_url(report_id))
+            return FastJSONResponse(
+                status_code=200,
+                content={
+                    "status": "success",
+                    "report_id": report_id,
+                    "report_format": "html",
+                    "html_url": f"/reports/{report_id}.html",
+                    "download_url": _pdf_url(report_id),
+                    "message": f"Report '{topic}' generated; the PDF is rendered on first download"
+                }
+            )
+
+        job = report_jobs.submit(report_id, topic, report_id, report_data, str(pdf_path))
+        report_storage.add(report_id, str(pdf_path), **record)
+
+        return FastJSONResponse(
+            status_code=202,
+            content={
+                "status": "queued",
+                "job_id": job.job_id,
+                "report_id": report_id,
+                **_job_links(job),
+                "message": f"Report '{topic}' queued for generation"
+            }
+        )
 
+    except ReportQueueFull as e:
+        return FastJSONResponse(
+            status_code=503,
+            headers={"Retry-After": "10"},
+            content={"status": "error", "message": f"Report queue is full ({e}). Please retry shortly."}
+        )
     except Exception as e:
         return {
             "status": "error",
             "message": str(e)
         }
 
+
+@app.get("/api/report-jobs")
+def report_job_stats():
+    """Queue depth, worker count and render timing for report jobs"""
+    return report_jobs.stats()
+
+
+@app.get("/api/report-store")
+def report_store_stats():
+    """Report index totals, section fragment reuse and the last retention run"""
+    section_cache.reload()
+    disk = section_cache.stats()
+    lookups = section_cache_totals["hits"] + section_cache_totals["misses"]
+    return {
+        "reports": report_storage.stats(),
+        "section_cache": {
+            **section_cache_totals,
+            "hit_rate": round(section_cache_totals["hits"] / lookups, 3) if lookups else None,
+            "enabled": PYPDF_AVAILABLE and REPORT_SECTION_CACHE,
+            "entries": disk["entries"],
+            "bytes": disk["bytes"],
+            "max_bytes": disk["max_bytes"],
+        },
+        "html_cache": html_cache.stats(),
+        "last_gc": last_report_gc,
+    }
+
+
+# Result of the most recent retention / garbage-collection pass
+last_report_gc: Dict[str, Any] = {}
+
+
+async def _report_gc_loop() -> None:
+    """Apply the retention policy and disk quota every REPORT_GC_INTERVAL_S"""
+    while True:
+        try:
+            result = await asyncio.to_thread(report_storage.collect_garbage, REPORT_DIR, CHART_DIR)
+            last_report_gc.clear()
+            last_report_gc.update(result, ran_at=datetime.now().isoformat())
+            if result["expired"] or result["over_quota"] or result["orphan_charts"]:
+                print(f"[REPORT GC] {result}")
+        except Exception as e:
+            print(f"[REPORT GC] Failed: {e}")
+        await asyncio.sleep(REPORT_GC_INTERVAL_S)
+
+
+@app.on_event("startup")
+async def start_report_gc() -> None:
+    app.state.report_gc_task = asyncio.create_task(_report_gc_loop())
+    if WARMUP_ON_STARTUP:
+        report_jobs.prestart(warmup)
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warmup))
+
+
+@app.get("/api/charts/cache")
+def chart_cache_stats():
+    """Hit rate of the chart render cache and its size on disk"""
+    chart_cache.reload()
+    disk = chart_cache.stats()
+    lookups = chart_cache_totals["hits"] + chart_cache_totals["misses"]
+    return {
+        **chart_cache_totals,
+        "hit_rate": round(chart_cache_totals["hits"] / lookups, 3) if lookups else None,
+        "entries": disk["entries"],
+        "bytes": disk["bytes"],
+        "max_bytes": disk["max_bytes"],
+    }
+
+
+@app.get("/api/report-jobs/{job_id}")
+def get_report_job(job_id: str):
+    """Current status and timing of a report job"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return FastJSONResponse(status_code=404, content={"status": "not_found", "job_id": job_id})
+    return {**job.to_dict(), **_job_links(job)}
+
+
+@app.get("/api/report-jobs/{job_id}/result")
+async def get_report_job_result(job_id: str, timeout: float = Query(30.0, ge=0, le=120)):
+    """Wait (up to `timeout` seconds) for a report job to finish"""
+    job = await report_jobs.wait(job_id, timeout)
+    if job is None:
+        return FastJSONResponse(status_code=404, content={"status": "not_found", "job_id": job_id})
+
+    body = {**job.to_dict(), **_job_links(job)}
+    if not job.done:
+        return FastJSONResponse(status_code=202, content=body)
+    if job.status == "failed":
+        return {**body, "status": "error", "message": job.error}
+    return {**body, "status": "success", "message": f"Report '{job.topic}' generated successfully"}
+
+
+@app.websocket("/ws/report-jobs/{job_id}")
+async def report_job_events(websocket: WebSocket, job_id: str):
+    """Push report job status changes until the job finishes"""
+    await websocket.accept()
+    job = report_jobs.get(job_id)
+    if job is None:
+        await websocket.send_json({"type": "report_job", "status": "not_found", "job_id": job_id})
+        await websocket.close()
+        return
+
+    queue = report_jobs.subscribe(job_id)
+    try:
+        await websocket.send_json({"type": "report_job", **job.to_dict()})
+        while not job.done:
+            update = await queue.get()
+            await websocket.send_json({"type": "report_job", **update})
+            if update["status"] in TERMINAL_STATUSES:
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        report_jobs.unsubscribe(job_id, queue)
+
 # ============================================================================
 # API: Download Report
 # ============================================================================
@@ -1197,21 +1323,113 @@ async def generate_report(request: Request):
 #         media_type="application/pdf",
 #         filename=f"{report_id}.pdf"
 #     )
-@app.get("/downloads/reports/{report_id}.pdf")
-def download_report(report_id: str):
-    path = REPORT_DIR / f"{report_id}.pdf"
+def _render_on_demand(report_id: str, record: Dict[str, Any]) -> Optional[ReportJob]:
+    """Queue the PDF of a report that was created without one (HTML reports) or whose file is gone"""
+    job = report_jobs.find_by_report(report_id)
+    if job is not None and not job.done:
+        return job
+    stored = report_storage.get_report_data(report_id)
+    if not stored:
+        return None
+    if record["report_format"] == "portfolio":
+        return report_jobs.submit(
+            report_id, record["topic"], report_id, loads(stored), record["path"],
+            render_fn=render_portfolio_file,
+            timeout_s=PORTFOLIO_JOB_TIMEOUT_S,
+        )
+    return report_jobs.submit(report_id, record["topic"], report_id, loads(stored), record["path"])
 
-    if not path.exists():
-        return {
-            "status": "processing",
-            "message": "Report is still being generated. Please try again in a few seconds."
-        }
 
-    return FileResponse(
-        path=str(path),
-        media_type="application/pdf",
-        filename=f"{report_id}.pdf"
-    )
+@app.api_route("/downloads/reports/{report_id}.pdf", methods=["GET", "HEAD"])
+async def download_report(report_id: str, request: Request):
+    """
+    Serve a rendered report PDF straight from disk. Supports ETag /
+    Last-Modified revalidation (304) and Range requests (206) so large
+    reports download fast and interrupted downloads can resume.
+
+    A PDF is rendered here only when its file does not exist: reports
+    created as HTML on their first download, and any report whose file was
+    removed but whose report data is still stored. The request waits up to
+    REPORT_ON_DEMAND_WAIT_S for the render, then answers 202.
+    """
+    record = report_storage.get(report_id) or {}
+    path = Path(record.get("path") or REPORT_DIR / f"{report_id}.pdf")
+
+    if not path.is_file() and record:
+        try:
+            job = _render_on_demand(report_id, record)
+        except ReportQueueFull as e:
+            return FastJSONResponse(
+                status_code=503,
+                headers={"Retry-After": "10"},
+                content={"status": "error", "message": f"Report queue is full ({e}). Please retry shortly."}
+            )
+        if job is not None:
+            await report_jobs.wait(job.job_id, timeout=REPORT_ON_DEMAND_WAIT_S)
+            if job.status == "failed":
+                return FastJSONResponse(
+                    status_code=500,
+                    content={"status": "error", "message": f"PDF rendering failed: {job.error}"}
+                )
+
+    try:
+        stat_result = path.stat()
+    except OSError:
+        job = report_jobs.find_by_report(report_id)
+        if job is not None and not job.done:
+            return FastJSONResponse(
+                status_code=202,
+                headers={"Retry-After": "2"},
+                content={
+                    "status": "processing",
+                    "message": "Report is still being generated. Please try again in a few seconds.",
+                    **_job_links(job),
+                }
+            )
+        return FastJSONResponse(
+            status_code=404,
+            content={"status": "error", "message": f"Report {report_id} not found"}
+        )
+
+    return file_response(request, path, "application/pdf", f"{report_id}.pdf", stat_result=stat_result)
+
+
+@app.api_route("/reports/{report_id}.html", methods=["GET", "HEAD"])
+async def view_report_html(report_id: str, request: Request):
+    """Browser view of a report; the page is cached by content hash and revalidated via ETag"""
+    record = report_storage.get(report_id)
+    stored = report_storage.get_report_data(report_id) if record and record["report_format"] != "portfolio" else None
+    if not stored:
+        return FastJSONResponse(
+            status_code=404,
+            content={"status": "error", "message": f"Report {report_id} not found"}
+        )
+    key, path = await asyncio.to_thread(html_cache.get_or_render, loads(stored), _pdf_url(report_id))
+    return file_response(request, path, "text/html; charset=utf-8", etag=key, weak=True)
+
+# ============================================================================
+# API: Tabular Export
+# ============================================================================
+@app.post("/api/export")
+def export_report_data(
+    format: str = Query("csv", description="csv, parquet or xlsx"),
+    table: Optional[str] = Query(None, description="markets, trade, patents, trials, documents or charts"),
+    report_data: Dict[str, Any] = Body(...),
+):
+    """Stream the worker results / demographics of one report body as typed tables"""
+    plan = report_data.get("plan") if isinstance(report_data.get("plan"), dict) else {}
+    source = {
+        "session_id": report_data.get("session_id"),
+        "molecule": plan.get("molecule") or report_data.get("molecule"),
+        "worker_results": report_data.get("worker_results") or [],
+        "demographics": report_data.get("demographics") or {},
+    }
+    try:
+        return export_response(format, table, lambda _: [source])
+    except ValueError as e:
+        return FastJSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    except ExportFormatUnavailable as e:
+        return FastJSONResponse(status_code=501, content={"status": "error", "message": str(e)})
 
 # ============================================================================
 # Utility endpoint to get all available endpoints
@@ -1228,7 +1446,11 @@ def root():
             "clinical_trials": "/api/clinical-trials?molecule={molecule}&indication={indication}&phase={phase}",
             "internal_knowledge": "/api/internal-knowledge?document_type={type}&topic={topic}",
             "web_intelligence": "/api/web-intelligence?query={search_query}&source_type={type}",
-            "generate_report": "/api/generate-report?report_type={pdf|excel}&topic={topic}"
+            "generate_report": "/api/generate-report",
+            "report_html": "/reports/{report_id}.html",
+            "export": "/api/export?format={csv|parquet|xlsx}&table={markets|trade|patents|trials|documents|charts}",
+            "report_job": "/api/report-jobs/{job_id}",
+            "report_job_result": "/api/report-jobs/{job_id}/result?timeout={seconds}"
         },
         "documentation": "/docs"
     }
\ No newline at end of file
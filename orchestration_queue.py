@@ -0,0 +1,396 @@
+# orchestration_queue.py
+# Durable job queue (SQLite) for agent orchestrations, and the worker loop that consumes it
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from http_encoding import dumps, loads
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "reports/jobs.db")
+ORCHESTRATION_CONCURRENCY = int(os.getenv("ORCHESTRATION_CONCURRENCY", "2"))   # jobs run at once per worker
+JOB_VISIBILITY_TIMEOUT_S = float(os.getenv("JOB_VISIBILITY_TIMEOUT_S", "120"))  # lease; renewed while the job runs
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_S = float(os.getenv("JOB_RETRY_BASE_S", "5"))                   # backoff: base * 2^(attempt-1)
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "0.5"))
+JOB_KEEP_FINISHED_S = float(os.getenv("JOB_KEEP_FINISHED_S", str(7 * 86400)))
+JOB_STOP_GRACE_S = float(os.getenv("JOB_STOP_GRACE_S", "30"))   # on stop, wait this long for cancelled jobs' threads
+
+STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id           TEXT PRIMARY KEY,
+    kind             TEXT NOT NULL,
+    payload          BLOB NOT NULL,
+    priority         INTEGER NOT NULL DEFAULT 0,
+    status           TEXT NOT NULL DEFAULT 'queued',
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    max_attempts     INTEGER NOT NULL,
+    created_at       REAL NOT NULL,
+    visible_at       REAL NOT NULL,
+    lease_owner      TEXT,
+    lease_expires_at REAL,
+    started_at       REAL,
+    finished_at      REAL,
+    error            TEXT,
+    result           BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_expires_at);
+"""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """
+    Jobs in a SQLite file, shared by every process on the host.
+
+    - `enqueue` adds a job; higher `priority` runs first, then oldest first.
+    - `claim` leases the next ready job to a worker for `visibility_timeout_s`;
+      the worker renews it with `heartbeat` while it runs. A job whose lease
+      runs out (the worker died, or a deploy killed it) is claimed again.
+    - `fail` puts the job back with exponential backoff until it has had
+      `max_attempts`, then marks it failed. `release` hands it back at once
+      without counting the attempt (graceful shutdown).
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH, keep_finished_s: float = JOB_KEEP_FINISHED_S) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.keep_finished_s = keep_finished_s
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._last_sweep = 0.0
+
+    @staticmethod
+    def _decode(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = loads(job["payload"])
+        job["result"] = loads(job["result"]) if job["result"] else None
+        return job
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        job_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        now = time.time()
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, payload, priority, max_attempts, created_at, visible_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, dumps(payload), priority, max_attempts, now, now),
+            )
+        return self.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that hasn't started; False if it is running or finished"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cursor.rowcount > 0
+
+    # ------------------------------------------------------------------
+    # Consumer
+    # ------------------------------------------------------------------
+    def claim(self, worker: str, visibility_timeout_s: float = JOB_VISIBILITY_TIMEOUT_S) -> Optional[Dict[str, Any]]:
+        """Lease the next ready job to `worker`, or None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used up their attempts fail instead of running again
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                    "error = COALESCE(error, 'Worker lease expired') "
+                    "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, "
+                    "lease_expires_at = ?, started_at = COALESCE(started_at, ?) "
+                    "WHERE job_id = ("
+                    "  SELECT job_id FROM jobs "
+                    "  WHERE (status = 'queued' AND visible_at <= ?) OR (status = 'running' AND lease_expires_at < ?) "
+                    "  ORDER BY priority DESC, created_at LIMIT 1"
+                    ") RETURNING *",
+                    (worker, now + visibility_timeout_s, now, now, now),
+                ).fetchone()
+                if now - self._last_sweep > 3600:
+                    self._sweep(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._decode(row)
+
+    def heartbeat(self, job_id: str, worker: str, visibility_timeout_s: float = JOB_VISIBILITY_TIMEOUT_S) -> bool:
+        """Extend the lease; False if `worker` no longer holds it"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + visibility_timeout_s, job_id, worker),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'completed', finished_at = ?, result = ?, error = NULL, lease_owner = NULL "
+                "WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time(), dumps(result) if result is not None else None, job_id, worker),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, worker: str, error: str, retry_base_s: float = JOB_RETRY_BASE_S) -> Optional[str]:
+        """Record a failed attempt; the job's new status ('queued' to retry, or 'failed')"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET "
+                "  status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "  visible_at = ? + ? * (1 << (attempts - 1)), "
+                "  finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, "
+                "  error = ?, lease_owner = NULL, lease_expires_at = NULL "
+                "WHERE job_id = ? AND lease_owner = ? AND status = 'running' RETURNING status",
+                (now, retry_base_s, now, error, job_id, worker),
+            ).fetchone()
+        return row["status"] if row else None
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Hand a running job back for another worker right away, not counting the attempt"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, visible_at = ?, "
+                "lease_owner = NULL, lease_expires_at = NULL "
+                "WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time(), job_id, worker),
+            )
+        return cursor.rowcount > 0
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < ?",
+            (now - self.keep_finished_s,),
+        )
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._decode(row)
+
+    def position(self, job: Dict[str, Any]) -> Optional[int]:
+        """Queued jobs that will be claimed before `job` (0 = next), None unless it is queued"""
+        if job["status"] != "queued":
+            return None
+        with self._lock:
+            ahead, = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (job["priority"], job["priority"], job["created_at"]),
+            ).fetchone()
+        return ahead
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest first"""
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest, = self._conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()
+        return {
+            **{status: counts.get(status, 0) for status in STATUSES},
+            "oldest_queued_s": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+
+def job_info(queue: JobQueue, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job for the status API"""
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "position": queue.position(job),
+        "session_id": job["payload"].get("session_id"),
+        "worker": job["lease_owner"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+    }
+
+
+async def run_in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    asyncio.to_thread that, when cancelled, still waits for the thread to
+    return before re-raising. A thread can't be interrupted, so this is how a
+    cancelled job makes sure nothing of it keeps running.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+class JobWorker:
+    """
+    Runs up to `concurrency` jobs at once on the current event loop:
+    `handler(job)` returns the job's result, or raises to fail the attempt.
+    The lease of each running job is renewed every third of the visibility
+    timeout; a job whose lease was lost (taken over by another worker) is
+    cancelled. `stop` hands unfinished jobs back to the queue.
+
+    Handlers should run blocking work through `run_in_thread`, so a
+    cancelled job has really stopped by the time its task ends.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]],
+        concurrency: int = ORCHESTRATION_CONCURRENCY,
+        visibility_timeout_s: float = JOB_VISIBILITY_TIMEOUT_S,
+        poll_s: float = JOB_POLL_S,
+        name: Optional[str] = None,
+    ) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.visibility_timeout_s = visibility_timeout_s
+        self.poll_s = poll_s
+        self.name = name or worker_name()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._heartbeats: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.stats = {"claimed": 0, "completed": 0, "failed": 0, "retried": 0, "released": 0, "lease_lost": 0}
+
+    def wake(self) -> None:
+        """A job was just enqueued (from this process) - look now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        print(f"[JOBS] worker {self.name} consuming, concurrency {self.concurrency}")
+        while not self._stopping:
+            if len(self._running) < self.concurrency:
+                job = await asyncio.to_thread(self.queue.claim, self.name, self.visibility_timeout_s)
+                if job is not None:
+                    self.stats["claimed"] += 1
+                    self._running[job["job_id"]] = asyncio.create_task(self._run_job(job))
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        heartbeat = self._heartbeats[job_id] = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await self.handler(job)
+            await asyncio.to_thread(self.queue.complete, job_id, self.name, result)
+            self.stats["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status = await asyncio.to_thread(self.queue.fail, job_id, self.name, f"{type(e).__name__}: {e}")
+            self.stats["retried" if status == "queued" else "failed"] += 1
+            print(f"[JOBS] {job['kind']} {job_id} attempt {job['attempts']}/{job['max_attempts']} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            self._heartbeats.pop(job_id, None)
+            self._running.pop(job_id, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout_s / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, self.name, self.visibility_timeout_s):
+                # Another worker may already run it: stop ours rather than run the pipeline twice
+                print(f"[JOBS] lost the lease on {job_id}, cancelling it")
+                self.stats["lease_lost"] += 1
+                task = self._running.get(job_id)
+                if task is not None:
+                    task.cancel()
+                return
+
+    async def stop(self, grace_s: float = JOB_STOP_GRACE_S) -> None:
+        """
+        Stop claiming and cancel running jobs. A job goes back to the queue
+        only once its task has finished cancelling (its threads included, see
+        run_in_thread), so the next worker never runs it next to threads still
+        writing to its session. Jobs still busy after `grace_s` keep their
+        lease, stop renewing it, and are retried once it expires.
+        """
+        self._stopping = True
+        self.wake()
+        running = dict(self._running)
+        for task in running.values():
+            task.cancel()
+        if running:
+            await asyncio.wait(running.values(), timeout=grace_s)
+        for job_id, task in running.items():
+            if task.done():
+                if await asyncio.to_thread(self.queue.release, job_id, self.name):
+                    self.stats["released"] += 1
+            else:
+                heartbeat = self._heartbeats.get(job_id)
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                print(f"[JOBS] {job_id} still running after {grace_s:.0f}s, retried when its lease expires")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "worker": self.name,
+            "concurrency": self.concurrency,
+            "running": sorted(self._running),
+            **self.stats,
+        }
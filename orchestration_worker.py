@@ -0,0 +1,49 @@
+# orchestration_worker.py
+# Standalone consumer of queued orchestrations, for running agent pipelines outside the web process
+#
+# Usage (from the repo root, next to `ORCHESTRATION_INLINE=0 python start_server.py`):
+#   SESSION_STORE=sqlite python orchestration_worker.py [--concurrency 2]
+import argparse
+import asyncio
+import signal
+import sys
+
+from orchestration_queue import JOB_VISIBILITY_TIMEOUT_S, ORCHESTRATION_CONCURRENCY, JobWorker
+
+
+async def run(concurrency: int, visibility_timeout_s: float) -> None:
+    import api_integration
+
+    worker = JobWorker(
+        api_integration.orchestration_jobs,
+        api_integration.run_orchestration_job,
+        concurrency=concurrency,
+        visibility_timeout_s=visibility_timeout_s,
+    )
+    loop = asyncio.get_running_loop()
+    stopping = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Unfinished jobs go back to the queue, so a deploy doesn't lose them
+        loop.add_signal_handler(sig, lambda: stopping.append(asyncio.create_task(worker.stop())))
+
+    await asyncio.to_thread(api_integration.warmup)
+    await worker.run()
+    await asyncio.gather(*stopping)
+    print(f"[JOBS] worker {worker.name} stopped: {worker.info()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PharmaVerse orchestration worker")
+    parser.add_argument("--concurrency", type=int, default=ORCHESTRATION_CONCURRENCY, help="orchestrations run at once")
+    parser.add_argument("--visibility-timeout", type=float, default=JOB_VISIBILITY_TIMEOUT_S, help="job lease in seconds")
+    args = parser.parse_args()
+
+    from session_store import SESSION_STORE
+    if SESSION_STORE == "memory":
+        # Sessions and events must be visible to the web process serving the clients
+        sys.exit("orchestration_worker.py needs SESSION_STORE=sqlite or redis")
+    asyncio.run(run(args.concurrency, args.visibility_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+# pdf_report.py
+# ReportLab layout of the PDF report. Imported on the first render (see
+# mock_api.generate_pdf) so the API process starts without ReportLab.
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from chart_cache import ChartCache
+from chart_specs import AGENT_COLORS, agent_sections
+from process_pool import SpawnPool
+from report_sections import (
+    PYPDF_AVAILABLE, REPORT_SECTION_CACHE, SectionCache, merge_fragments, render_fragment, section_key, style_fingerprint,
+)
+from vector_charts import build_vector_chart
+
+
+def _build_vector_charts(charts: List[Dict[str, Any]]) -> List[Any]:
+    """Vector counterpart of `chart_cache.get_many`: one Drawing (or None) per chart"""
+    drawings = []
+    for chart in charts:
+        try:
+            drawings.append(build_vector_chart(chart, width=5 * inch, height=3 * inch))
+        except Exception as e:
+            print(f"[CHARTS] Vector chart '{chart.get('title', 'chart')}' failed: {e}")
+            drawings.append(None)
+    return drawings
+
+
+def _render_charts(charts: List[Dict[str, Any]], chart_backend: str, chart_cache: ChartCache) -> List[Any]:
+    """One Image path / Drawing (or None) per chart, in order"""
+    if not charts:
+        return []
+    if chart_backend == "vector":
+        return _build_vector_charts(charts)
+    return chart_cache.get_many(charts)
+
+
+PDF_DOC_OPTIONS = dict(
+    pagesize=A4,
+    leftMargin=40,
+    rightMargin=40,
+    topMargin=40,
+    bottomMargin=40,
+)
+
+
+def _report_styles():
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name="AgentHeader",
+        fontSize=18,
+        spaceAfter=12,
+        textColor=colors.HexColor("#2c3e50")
+    ))
+    styles.add(ParagraphStyle(
+        name="AgentSummary",
+        fontSize=11,
+        leading=14,
+        spaceAfter=6,
+    ))
+    styles.add(ParagraphStyle(
+        name="SectionTitle",
+        fontSize=14,
+        spaceAfter=8,
+        textColor=colors.HexColor("#1f2933")
+    ))
+    return styles
+
+
+def _cover_story(topic: str, generated: str, styles) -> List[Any]:
+    return [
+        Paragraph("PharmaVerse Innovation Assessment", styles["Title"]),
+        Spacer(1, 0.3 * inch),
+        Paragraph(topic, styles["Heading2"]),
+        Spacer(1, 0.2 * inch),
+        Paragraph(f"Generated: {generated}", styles["Normal"]),
+    ]
+
+
+def _summary_story(final_answer: str, styles) -> List[Any]:
+    # Executive summary is already LLM-generated
+    story: List[Any] = [Paragraph("Executive Summary", styles["Heading1"])]
+    if final_answer:
+        # final_answer may contain markdown-like formatting; keep simple
+        for line in final_answer.split("\n\n"):
+            if not line.strip():
+                continue
+            story.append(Paragraph(line.strip(), styles["Normal"]))
+            story.append(Spacer(1, 0.1 * inch))
+    else:
+        story.append(Paragraph("No executive summary available.", styles["Normal"]))
+    return story
+
+
+def _agent_story(agent_name: str, agent_summary: str, agent_charts: List[Dict[str, Any]], rendered: List[Any], styles) -> List[Any]:
+    # ------------------------------------------------------------------
+    # Agent header
+    # ------------------------------------------------------------------
+    story: List[Any] = [Paragraph(agent_name, styles["AgentHeader"])]
+
+    # Lightly structure the agent summary (already LLM-generated text)
+    if agent_summary:
+        story.append(Paragraph("Narrative Summary", styles["SectionTitle"]))
+        for block in agent_summary.split("\n\n"):
+            text = block.strip()
+            if not text:
+                continue
+            story.append(Paragraph(text, styles["AgentSummary"]))
+            story.append(Spacer(1, 0.05 * inch))
+        story.append(Spacer(1, 0.2 * inch))
+
+    # ------------------------------------------------------------------
+    # Charts / Visual Insights (optional)
+    # ------------------------------------------------------------------
+    if agent_charts:
+        story.append(Paragraph("Visual Insights", styles["SectionTitle"]))
+
+        for chart, saved in zip(agent_charts, rendered):
+            if not saved:
+                continue
+
+            try:
+                title = chart.get("title", "Chart")
+                insight = chart.get("insight", "")
+                color = AGENT_COLORS.get(agent_name, "#111827")
+
+                # Colored title and insight per agent
+                block = [Paragraph(f'<font color="{color}">{title}</font>', styles["Heading3"])]
+                if insight:
+                    block.append(Paragraph(f'<font color="{color}">{insight}</font>', styles["Italic"]))
+                if isinstance(saved, Path):
+                    block.append(Image(str(saved), width=5 * inch, height=3 * inch))
+                else:
+                    block.append(saved)
+                block.append(Spacer(1, 0.3 * inch))
+                story.extend(block)
+            except Exception as e:
+                # Skip problematic charts but don't break the whole report
+                print(f"[REPORT][{agent_name}] Chart generation failed: {e}")
+                continue
+    return story
+
+
+def _merge_with_cover(cover_story: List[Any], fragments: List[Path], output_path: Path, dedupe: bool = False) -> int:
+    """
+    Merge a freshly laid out cover and cached fragments into `output_path`.
+    The cover carries the generation time, so it is never cached.
+    """
+    cover = output_path.with_name(f"{output_path.stem}.cover.pdf")
+    try:
+        render_fragment(cover_story, PDF_DOC_OPTIONS, cover)
+        return merge_fragments([cover] + fragments, output_path, dedupe=dedupe)
+    finally:
+        cover.unlink(missing_ok=True)
+
+
+def generate_pdf(
+    report_data: Dict[str, Any],
+    output_path: Path,
+    chart_cache: ChartCache,
+    section_cache: SectionCache,
+    chart_backend: str = "raster",
+) -> int:
+    """
+    Generate a professional-looking PDF report with:
+      - Cover page
+      - Executive summary
+      - Per-agent sections (only if demographics / charts available)
+      - Charts appended after each agent summary
+
+    Each section is keyed by a hash of its inputs (text, charts, chart
+    backend, styles). With pypdf installed every section is laid out as its
+    own PDF fragment, cached, and the fragments are merged - so re-running a
+    report after one agent's data changed only rebuilds that agent's pages.
+    A fragment can't share a page with its neighbours, so in this layout
+    each agent section starts on a new page. Without pypdf (or with
+    REPORT_SECTION_CACHE=0) the whole story is built as a single document
+    and agent sections flow on from one another.
+
+    NOTE: To keep this endpoint self-contained and robust in offline
+    environments, we format agent summaries heuristically instead of
+    calling an LLM again here. The summaries coming from agents are
+    already LLM-generated.
+
+    Returns the number of pages written.
+    """
+    styles = _report_styles()
+
+    topic = report_data.get("topic", "Innovation Opportunity Assessment")
+    final_answer = report_data.get("final_answer", "")
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+    agents = agent_sections(report_data)
+
+    if not (PYPDF_AVAILABLE and REPORT_SECTION_CACHE):
+        # ------------------------------------------------------------------
+        # Single document: render every chart up front (cached, concurrently)
+        # ------------------------------------------------------------------
+        rendered = iter(_render_charts([c for _, _, charts in agents for c in charts], chart_backend, chart_cache))
+        story: List[Any] = _cover_story(topic, generated, styles) + [PageBreak()]
+        story += _summary_story(final_answer, styles) + [PageBreak()]
+        for agent_name, agent_summary, agent_charts in agents:
+            story += _agent_story(agent_name, agent_summary, agent_charts, [next(rendered) for _ in agent_charts], styles)
+            # Add reasonable spacing after each agent section instead of page break
+            story.append(Spacer(1, 0.5 * inch))
+
+        doc = SimpleDocTemplate(str(output_path), **PDF_DOC_OPTIONS)
+        doc.build(story)
+        print(f"[REPORT GENERATED] {output_path.resolve()}")
+        return doc.page
+
+    # ------------------------------------------------------------------
+    # Section fragments: only sections whose inputs changed are laid out,
+    # and only their charts are rendered
+    # ------------------------------------------------------------------
+    fingerprint = style_fingerprint(styles)
+    sections = [
+        (section_key("summary", {"final_answer": final_answer}, fingerprint),
+         lambda _: _summary_story(final_answer, styles), []),
+    ]
+    for agent_name, agent_summary, agent_charts in agents:
+        payload = {"agent": agent_name, "summary": agent_summary, "charts": agent_charts, "chart_backend": chart_backend}
+        sections.append((
+            section_key("agent", payload, fingerprint),
+            lambda rendered, a=agent_name, t=agent_summary, c=agent_charts: _agent_story(a, t, c, rendered, styles),
+            agent_charts,
+        ))
+
+    fragments: Dict[str, Optional[Path]] = {key: section_cache.get(key) for key, _, _ in sections}
+    stale = [(key, build, charts) for key, build, charts in sections if fragments[key] is None]
+    rendered = iter(_render_charts([c for _, _, charts in stale for c in charts], chart_backend, chart_cache))
+    for key, build, charts in stale:
+        story = build([next(rendered) for _ in charts])
+        if fragments[key] is None:  # an identical section may already be built
+            fragments[key] = section_cache.render(key, story, PDF_DOC_OPTIONS)
+
+    page_count = _merge_with_cover(
+        _cover_story(topic, generated, styles), [fragments[key] for key, _, _ in sections], output_path,
+    )
+    print(f"[REPORT GENERATED] {output_path.resolve()} ({len(stale)}/{len(sections)} sections rebuilt)")
+    return page_count
+
+
+# ============================================================================
+# Portfolio report: many candidates in one document
+# ============================================================================
+PORTFOLIO_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Longest wait for the candidate sections laid out in parallel, all together
+PORTFOLIO_SECTIONS_TIMEOUT_S = float(os.getenv("PORTFOLIO_SECTIONS_TIMEOUT_S", "600"))
+# Store identical PDF objects (chart images shared by candidates) once in the
+# merged file. Smaller output, but merging gets several times slower.
+PORTFOLIO_PDF_DEDUPE = os.getenv("PORTFOLIO_PDF_DEDUPE", "0") not in ("0", "false", "no")
+
+RANKING_COLUMNS = ("Rank", "Molecule", "Indication", "Score", "Market ($M)", "CAGR 5y", "Unmet need", "FTO", "Active trials")
+
+_portfolio_pool: Optional[SpawnPool] = None
+_worker_section_caches: Dict[str, SectionCache] = {}
+
+
+def _fmt(value: Any, suffix: str = "") -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, float):
+        return f"{value:,.1f}{suffix}"
+    return f"{value}{suffix}"
+
+
+def _portfolio_cover_story(title: str, generated: str, rows: List[Dict[str, Any]], styles) -> List[Any]:
+    story = [
+        Paragraph("PharmaVerse Portfolio Review", styles["Title"]),
+        Spacer(1, 0.3 * inch),
+        Paragraph(title, styles["Heading2"]),
+        Spacer(1, 0.2 * inch),
+        Paragraph(f"Generated: {generated} - {len(rows)} candidates", styles["Normal"]),
+        Spacer(1, 0.4 * inch),
+        Paragraph("Ranked Summary", styles["Heading1"]),
+        Paragraph(
+            "Score (0-100) weighs market size, growth, unmet need, freedom to operate and trial activity, "
+            "normalized across this portfolio. It orders the review; it is not a recommendation.",
+            styles["Italic"],
+        ),
+        Spacer(1, 0.15 * inch),
+    ]
+    cell = ParagraphStyle("RankingCell", parent=styles["BodyText"], fontSize=8, leading=10)
+    header = ParagraphStyle("RankingHeader", parent=cell, fontName="Helvetica-Bold", textColor=colors.white)
+    data = [[Paragraph(column, header) for column in RANKING_COLUMNS]]
+    for row in rows:
+        data.append([
+            row["rank"],
+            Paragraph(_fmt(row["molecule"]), cell),
+            Paragraph(_fmt(row["indication"]), cell),
+            _fmt(row["score"]),
+            _fmt(row["market_musd"]),
+            _fmt(row["cagr_5y"], "%"),
+            _fmt(row["unmet_need"]),
+            Paragraph(_fmt(row["fto"]), cell),
+            row["active_trials"],
+        ])
+    table = Table(data, repeatRows=1, colWidths=[32, 70, 75, 38, 52, 45, 42, 112, 44])
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f3f4f6")]),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#d1d5db")),
+    ]))
+    story.append(table)
+    return story
+
+
+def _candidate_story(metrics: Dict[str, Any], candidate: Dict[str, Any], rendered: List[Any], styles) -> List[Any]:
+    """One candidate's pages. Only absolute metrics are shown, so the section doesn't depend on the rest of the portfolio"""
+    name = metrics["molecule"] or candidate.get("topic") or "Candidate"
+    heading = f"{name} - {metrics['indication']}" if metrics["indication"] else name
+    story: List[Any] = [
+        Paragraph(heading, styles["Title"]),
+        Paragraph(
+            f"Market ${_fmt(metrics['market_musd'])}M, CAGR {_fmt(metrics['cagr_5y'], '%')}, "
+            f"unmet need {_fmt(metrics['unmet_need'])}, FTO {_fmt(metrics['fto'])}, "
+            f"{metrics['active_trials']} active trials",
+            styles["Italic"],
+        ),
+        Spacer(1, 0.2 * inch),
+    ]
+    story += _summary_story(candidate.get("final_answer", ""), styles)
+    rendered = iter(rendered)
+    for agent_name, agent_summary, agent_charts in agent_sections(candidate):
+        story.append(Spacer(1, 0.3 * inch))
+        story += _agent_story(agent_name, agent_summary, agent_charts, [next(rendered) for _ in agent_charts], styles)
+    return story
+
+
+def _candidate_charts(candidate: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [chart for _, _, charts in agent_sections(candidate) for chart in charts]
+
+
+def _render_candidate_section(
+    section_dir: str,
+    key: str,
+    metrics: Dict[str, Any],
+    candidate: Dict[str, Any],
+    rendered: Optional[List[Any]],
+) -> str:
+    """Pool entry point: lay out one candidate as a PDF fragment (`rendered` None = vector charts)"""
+    if rendered is None:
+        rendered = _build_vector_charts(_candidate_charts(candidate))
+    cache = _worker_section_caches.get(section_dir)
+    if cache is None:
+        cache = _worker_section_caches[section_dir] = SectionCache(Path(section_dir))
+    return str(cache.render(key, _candidate_story(metrics, candidate, rendered, _report_styles()), PDF_DOC_OPTIONS))
+
+
+def _get_portfolio_pool() -> SpawnPool:
+    global _portfolio_pool
+    if _portfolio_pool is None:
+        _portfolio_pool = SpawnPool(max_workers=PORTFOLIO_WORKERS)
+    return _portfolio_pool
+
+
+def _discard_portfolio_pool() -> None:
+    """Kill the section workers (one may hang) and cancel what's queued; the next run starts a new pool"""
+    global _portfolio_pool
+    pool, _portfolio_pool = _portfolio_pool, None
+    if pool is not None:
+        pool.terminate()
+
+
+def generate_portfolio_pdf(
+    title: str,
+    candidates: List[Dict[str, Any]],
+    rows: List[Dict[str, Any]],
+    output_path: Path,
+    chart_cache: ChartCache,
+    section_cache: SectionCache,
+    chart_backend: str = "raster",
+) -> int:
+    """
+    One comparative PDF for many candidates (each in report_data shape):
+    a cover with the ranked summary table (`rows`, from
+    portfolio.rank_candidates), then one section per candidate in rank order.
+
+    - Styles are built once and shared by every section.
+    - Charts are rendered once per distinct spec across the whole portfolio
+      (ChartCache); with PORTFOLIO_PDF_DEDUPE identical images are also
+      stored once in the merged PDF.
+    - Candidate sections are cached by content hash, so a candidate that was
+      in an earlier portfolio is not laid out again. Stale sections are laid
+      out in parallel (PORTFOLIO_WORKERS processes) and merged.
+
+    Returns the number of pages written.
+    """
+    styles = _report_styles()
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+    ordered = [(row, candidates[row["index"]]) for row in rows]
+
+    def metrics_of(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: row[k] for k in ("molecule", "indication", "market_musd", "cagr_5y", "unmet_need", "fto", "active_trials")}
+
+    if not (PYPDF_AVAILABLE and REPORT_SECTION_CACHE):
+        charts = [_candidate_charts(candidate) for _, candidate in ordered]
+        rendered = iter(_render_charts([c for cs in charts for c in cs], chart_backend, chart_cache))
+        story = _portfolio_cover_story(title, generated, rows, styles)
+        for (row, candidate), candidate_charts in zip(ordered, charts):
+            story.append(PageBreak())
+            story += _candidate_story(metrics_of(row), candidate, [next(rendered) for _ in candidate_charts], styles)
+        doc = SimpleDocTemplate(str(output_path), **PDF_DOC_OPTIONS)
+        doc.build(story)
+        print(f"[PORTFOLIO GENERATED] {output_path.resolve()} ({len(rows)} candidates)")
+        return doc.page
+
+    fingerprint = style_fingerprint(styles)
+    keys: List[str] = []
+    fragments: Dict[str, Optional[Path]] = {}
+    stale: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    for row, candidate in ordered:
+        payload = {
+            "metrics": metrics_of(row),
+            "final_answer": candidate.get("final_answer", ""),
+            "agents": agent_sections(candidate),
+            "chart_backend": chart_backend,
+        }
+        key = section_key("portfolio-candidate", payload, fingerprint)
+        keys.append(key)
+        if key not in fragments:  # the same candidate listed twice is laid out once
+            fragments[key] = section_cache.get(key)
+            if fragments[key] is None:
+                stale[key] = (metrics_of(row), candidate)
+
+    # Every distinct chart of every stale section, rendered once up front
+    rendered_by_key: Dict[str, Optional[List[Any]]] = {key: None for key in stale}
+    if chart_backend != "vector":
+        charts = {key: _candidate_charts(candidate) for key, (_, candidate) in stale.items()}
+        rendered = iter(_render_charts([c for cs in charts.values() for c in cs], chart_backend, chart_cache))
+        for key, candidate_charts in charts.items():
+            rendered_by_key[key] = [next(rendered) for _ in candidate_charts]
+
+    if len(stale) > 1 and PORTFOLIO_WORKERS > 1:
+        pool = _get_portfolio_pool()
+        section_dir = str(section_cache.directory)
+        deadline = time.monotonic() + PORTFOLIO_SECTIONS_TIMEOUT_S
+        try:
+            futures = {
+                key: pool.submit(_render_candidate_section, section_dir, key, metrics, candidate, rendered_by_key[key])
+                for key, (metrics, candidate) in stale.items()
+            }
+            for key, future in futures.items():
+                fragments[key] = Path(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except BaseException:
+            # Timed out, a section failed or the pool broke: don't leave sections running for nobody
+            _discard_portfolio_pool()
+            raise
+        section_cache.reload()
+    else:
+        for key, (metrics, candidate) in stale.items():
+            rendered = rendered_by_key[key]
+            if rendered is None:
+                rendered = _build_vector_charts(_candidate_charts(candidate))
+            fragments[key] = section_cache.render(key, _candidate_story(metrics, candidate, rendered, styles), PDF_DOC_OPTIONS)
+
+    page_count = _merge_with_cover(
+        _portfolio_cover_story(title, generated, rows, styles),
+        [fragments[key] for key in keys],
+        output_path,
+        dedupe=PORTFOLIO_PDF_DEDUPE,
+    )
+    print(f"[PORTFOLIO GENERATED] {output_path.resolve()} ({len(stale)}/{len(keys)} candidate sections rebuilt)")
+    return page_count
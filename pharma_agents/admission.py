@@ -0,0 +1,299 @@
+# admission.py
+# Admission control for LLM-heavy pipeline runs: per-client token buckets, a shared LLM token budget,
+# bounded in-flight runs and waiting room, so overload turns into 429/503 + Retry-After instead of timeouts
+import asyncio
+import hashlib
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "4"))       # pipelines run at once (/run)
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "16"))        # requests waiting for a slot (/run)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))           # queued orchestration jobs
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "30"))        # longest wait a /run request is held
+ADMISSION_MAX_QUEUE_WAIT_S = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT_S", "900"))  # longest estimated wait for a queued job
+ADMISSION_CLIENT_RATE_PER_MIN = float(os.getenv("ADMISSION_CLIENT_RATE_PER_MIN", "6"))  # runs per client (API key or IP)
+ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", "3"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))    # client buckets kept, LRU
+LLM_TOKENS_PER_MIN = float(os.getenv("LLM_TOKENS_PER_MIN", "60000"))        # provider budget for this process
+PIPELINE_EST_TOKENS = float(os.getenv("PIPELINE_EST_TOKENS", "12000"))      # plan + 6 agents + final answer
+PIPELINE_EST_S = float(os.getenv("PIPELINE_EST_S", "60"))                   # run time until measured
+# Client identity for the per-client rate: X-Forwarded-For is only read from these peers (e.g. "127.0.0.1"),
+# and X-API-Key only counts when it is one of these keys; anything else is keyed by the peer address
+ADMISSION_TRUSTED_PROXIES = frozenset(p.strip() for p in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if p.strip())
+ADMISSION_API_KEYS = frozenset(k.strip() for k in os.getenv("ADMISSION_API_KEYS", "").split(",") if k.strip())
+
+
+class AdmissionRejected(Exception):
+    """The request is shed: `status_code` 429 (client over its rate) or 503 (service over capacity)"""
+
+    def __init__(self, status_code: int, reason: str, retry_after_s: float, **detail: Any) -> None:
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+        self.detail = detail
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after_s)))}
+
+    def body(self) -> Dict[str, Any]:
+        return {"message": self.reason, "retry_after_s": round(self.retry_after_s, 1), **self.detail}
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`; the balance may go negative (reservations)"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float = 1.0) -> float:
+        """Take `amount` if available; otherwise take nothing and return the seconds until it is"""
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now, going into debt if needed; seconds until the debt is repaid"""
+        self._refill()
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate) if self.rate > 0 else math.inf
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` could be reserved without debt (nothing is taken)"""
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate) if self.rate > 0 else math.inf
+
+
+def client_key(
+    headers: Any,
+    client_host: Optional[str],
+    trusted_proxies: frozenset = ADMISSION_TRUSTED_PROXIES,
+    api_keys: frozenset = ADMISSION_API_KEYS,
+) -> str:
+    """
+    Who to rate-limit: a known API key, else the caller's IP. Headers can be
+    made up by any caller, so a key only counts if it is in `api_keys`, and
+    X-Forwarded-For only when the peer is a trusted proxy (then the nearest
+    hop that isn't one of them).
+    """
+    api_key = headers.get("x-api-key")
+    if api_key and api_key in api_keys:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    host = client_host or "unknown"
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded and host in trusted_proxies:
+        for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            host = hop
+            if hop not in trusted_proxies:
+                break
+    return f"ip:{host}"
+
+
+class AdmissionController:
+    """
+    Decides, per pipeline request, between run now, wait / queue, and shed:
+
+    - each client (API key or IP) has a token bucket of
+      `client_rate_per_min` runs with bursts of `client_burst` -> 429;
+    - every admitted run reserves `est_tokens` from one LLM token budget
+      refilled at `tokens_per_min`, so a spike is spread over time instead of
+      hitting the provider at once; a wait beyond the limit -> 503;
+    - `acquire` (in-process runs) allows `max_inflight` at once and holds up to
+      `max_waiting` more, each at most `max_wait_s` -> 503;
+    - `admit_job` (queued orchestrations) only checks queue depth and the
+      estimated wait, since the job queue bounds concurrency itself; its
+      reservation is given back with `refund_job` if the job never uses it.
+
+    Rejections carry Retry-After; `stats` has accepted / queued / rejected counts.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        max_waiting: int = ADMISSION_MAX_WAITING,
+        max_wait_s: float = ADMISSION_MAX_WAIT_S,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_queue_wait_s: float = ADMISSION_MAX_QUEUE_WAIT_S,
+        client_rate_per_min: float = ADMISSION_CLIENT_RATE_PER_MIN,
+        client_burst: float = ADMISSION_CLIENT_BURST,
+        max_clients: int = ADMISSION_MAX_CLIENTS,
+        tokens_per_min: float = LLM_TOKENS_PER_MIN,
+        est_tokens: float = PIPELINE_EST_TOKENS,
+        est_run_s: float = PIPELINE_EST_S,
+    ) -> None:
+        self.max_inflight = max_inflight
+        self.max_waiting = max_waiting
+        self.max_wait_s = max_wait_s
+        self.max_queue = max_queue
+        self.max_queue_wait_s = max_queue_wait_s
+        self.client_rate_per_min = client_rate_per_min
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.est_tokens = est_tokens
+        self.llm_budget = TokenBucket(tokens_per_min / 60, max(tokens_per_min, est_tokens))
+        self.avg_run_s = est_run_s
+        # Tags the jobs this controller reserved budget for; only it may refund them
+        self.instance_id = uuid.uuid4().hex
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.counters = {
+            "accepted": 0, "queued": 0, "rejected": 0,
+            "rejected_client_rate": 0, "rejected_llm_budget": 0, "rejected_capacity": 0, "rejected_timeout": 0,
+            "completed": 0, "refunded": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+    def _reject(self, status_code: int, reason: str, counter: str, retry_after_s: float, **detail: Any) -> AdmissionRejected:
+        self.counters["rejected"] += 1
+        self.counters[counter] += 1
+        return AdmissionRejected(status_code, reason, retry_after_s, **detail)
+
+    def _check_client(self, client: str) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.client_rate_per_min / 60, self.client_burst)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        wait = bucket.take()
+        if wait > 0:
+            raise self._reject(429, "Too many runs from this client", "rejected_client_rate", wait)
+        return bucket
+
+    def _reserve_budget(self, max_wait_s: float, client_bucket: TokenBucket) -> float:
+        """
+        Seconds this run should wait for LLM budget (reserved), or a 503 if
+        that is too long; a shed run gives the client its token back.
+        """
+        wait = self.llm_budget.wait_for(self.est_tokens)
+        if wait > max_wait_s:
+            client_bucket.refund(1.0)
+            raise self._reject(
+                503, "LLM token budget exhausted", "rejected_llm_budget", wait - max_wait_s,
+                estimated_wait_s=round(wait, 1),
+            )
+        return self.llm_budget.reserve(self.est_tokens)
+
+    def _record_run(self, duration_s: float) -> None:
+        self.counters["completed"] += 1
+        self.avg_run_s = 0.8 * self.avg_run_s + 0.2 * duration_s
+
+    # ------------------------------------------------------------------
+    # In-process runs (/run, /run/stream)
+    # ------------------------------------------------------------------
+    async def acquire(self, client: str) -> float:
+        """
+        Wait for a run slot (and LLM budget); returns the run's start time, to
+        pass to `release` when it ends. Raises AdmissionRejected instead of
+        waiting when the request would be shed.
+        """
+        # Waiters count as taken slots: they are admitted ahead of this request
+        ahead = self.inflight + self.waiting
+        if ahead >= self.max_inflight + self.max_waiting:
+            raise self._reject(
+                503, "Too many runs in progress", "rejected_capacity",
+                self.avg_run_s * math.ceil((ahead - self.max_inflight + 1) / self.max_inflight),
+                inflight=self.inflight, waiting=self.waiting,
+            )
+        bucket = self._check_client(client)
+        budget_wait = self._reserve_budget(self.max_wait_s, bucket)
+        queued = budget_wait > 0 or ahead >= self.max_inflight
+        self.counters["queued" if queued else "accepted"] += 1
+
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            if budget_wait > 0:
+                await asyncio.sleep(budget_wait)
+            await asyncio.wait_for(self._slots.acquire(), max(0.0, self.max_wait_s - (time.monotonic() - started)))
+        except asyncio.TimeoutError:
+            self.llm_budget.refund(self.est_tokens)
+            raise self._reject(503, "Timed out waiting for a free slot", "rejected_timeout", self.avg_run_s)
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            self.llm_budget.refund(self.est_tokens)
+            raise
+        finally:
+            self.waiting -= 1
+        self.inflight += 1
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        self.inflight -= 1
+        self._slots.release()
+        self._record_run(time.monotonic() - started)
+
+    # ------------------------------------------------------------------
+    # Queued runs (orchestration jobs)
+    # ------------------------------------------------------------------
+    def admit_job(self, client: str, queued: int, running: int, slots: int) -> Dict[str, Any]:
+        """
+        Admission for a job about to be queued behind `queued` others, with
+        `running` of `slots` worker slots busy: {"admission": "accepted" |
+        "queued", "estimated_wait_s"}, or AdmissionRejected.
+        """
+        if queued >= self.max_queue:
+            raise self._reject(
+                503, "Orchestration queue is full", "rejected_capacity",
+                self.avg_run_s * math.ceil((queued - self.max_queue + 1) / max(slots, 1)),
+                queued=queued,
+            )
+        slot_wait = self.avg_run_s * math.ceil((queued + 1) / max(slots, 1)) if running + queued >= slots else 0.0
+        if slot_wait > self.max_queue_wait_s:
+            raise self._reject(503, "Orchestration backlog too long", "rejected_capacity", slot_wait - self.max_queue_wait_s,
+                               queued=queued, estimated_wait_s=round(slot_wait, 1))
+        bucket = self._check_client(client)
+        budget_wait = self._reserve_budget(self.max_queue_wait_s, bucket)
+        wait = max(slot_wait, budget_wait)
+        self.counters["queued" if wait > 0 else "accepted"] += 1
+        return {"admission": "queued" if wait > 0 else "accepted", "estimated_wait_s": round(wait, 1)}
+
+    def refund_job(self) -> None:
+        """Give back an admitted job's LLM budget: it was never queued, cancelled, or failed before any LLM call"""
+        self.llm_budget.refund(self.est_tokens)
+        self.counters["refunded"] += 1
+
+    def job_finished(self, duration_s: float) -> None:
+        """Feed an orchestration's run time into the wait estimates"""
+        self._record_run(duration_s)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "clients": len(self._clients),
+            "llm_budget_wait_s": round(self.llm_budget.wait_for(self.est_tokens), 1),
+            "avg_run_s": round(self.avg_run_s, 1),
+            "limits": {
+                "max_inflight": self.max_inflight,
+                "max_waiting": self.max_waiting,
+                "max_queue": self.max_queue,
+                "client_rate_per_min": self.client_rate_per_min,
+                "client_burst": self.client_burst,
+                "llm_tokens_per_min": round(self.llm_budget.rate * 60),
+                "est_tokens_per_run": self.est_tokens,
+            },
+        }
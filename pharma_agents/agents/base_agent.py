@@ -8,7 +8,12 @@ from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from llm_client import GroqLLM
+# ... and the repo root: the resolver is imported as pharma_agents.entity_resolver
+# everywhere (mock_api, api_integration), so the process has one index and cache
+if str(Path(__file__).parent.parent.parent) not in sys.path:
+    sys.path.append(str(Path(__file__).parent.parent.parent))
+from llm_client import GroqLLM, token_source
+from pharma_agents.entity_resolver import EntityMatch, molecule_resolver, normalize
 from langchain.prompts import ChatPromptTemplate
 
 
@@ -27,6 +32,29 @@ class BaseAgent(ABC):
         """Human readable name for the agent."""
         raise NotImplementedError
 
+    def _resolve_molecule(self, user_query: str) -> Optional[EntityMatch]:
+        """
+        Find the primary molecule locally, without an LLM call: the
+        'Primary molecule' MasterAgent already picked (kept as named when it
+        isn't in the catalog), else the molecule the query mentions most
+        """
+        primary = self._context_value(user_query, "Primary molecule")
+        if primary:
+            match = molecule_resolver.resolve(primary)
+            return match or EntityMatch(normalize(primary), primary, normalize(primary), "unlisted", 1.0)
+        matches = molecule_resolver.extract(user_query)
+        return matches[0] if matches else None
+
+    @staticmethod
+    def _context_value(user_query: str, label: str) -> Optional[str]:
+        """Read a '<label>: value' line from the context MasterAgent builds"""
+        prefix = f"{label.lower()}:"
+        for line in user_query.splitlines():
+            if line.strip().lower().startswith(prefix):
+                value = line.split(":", 1)[1].strip()
+                return value or None
+        return None
+
     def _parse_query_with_llm(self, user_query: str, extraction_prompt: str) -> Dict[str, Any]:
         """Use LLM to parse the user query and extract parameters"""
         system_prompt = (
@@ -67,7 +95,8 @@ class BaseAgent(ABC):
         
         user_prompt = f"{summary_prompt}\n\nJSON Response:\n{json.dumps(json_response, indent=2)}"
         
-        return self.llm.chat(system_prompt, user_prompt)
+        with token_source(self.name):
+            return self.llm.chat(system_prompt, user_prompt)
 
     def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Helper method for GET requests"""
@@ -10,17 +10,23 @@ class ClinicalTrialsAgent(BaseAgent):
 
     def run(self, user_query: str) -> Dict[str, Any]:
         """
-        Uses LLM to extract molecule/indication/phase from query, calls API, and generates summary.
+        Resolves molecule from query (LLM fallback for molecule/indication/phase), calls API, and generates summary.
         """
-        # 1. Parse query with LLM
-        extraction_prompt = (
-            "Extract clinical trial query parameters. "
-            "Return JSON: {{\"molecule\": \"<molecule_or_null>\", \"indication\": \"<indication_or_null>\", \"phase\": \"<phase_or_null>\"}}"
-        )
-        params = self._parse_query_with_llm(user_query, extraction_prompt)
-        molecule = params.get("molecule")
-        indication = params.get("indication")
-        phase = params.get("phase")
+        # 1. Resolve molecule locally, fall back to the LLM for unknown names
+        match = self._resolve_molecule(user_query)
+        if match:
+            molecule = match.name
+            indication = self._context_value(user_query, "Primary indication")
+            phase = None
+        else:
+            extraction_prompt = (
+                "Extract clinical trial query parameters. "
+                "Return JSON: {{\"molecule\": \"<molecule_or_null>\", \"indication\": \"<indication_or_null>\", \"phase\": \"<phase_or_null>\"}}"
+            )
+            params = self._parse_query_with_llm(user_query, extraction_prompt)
+            molecule = params.get("molecule")
+            indication = params.get("indication")
+            phase = params.get("phase")
 
         # 2. Call API
         api_params = {}
@@ -11,17 +11,23 @@ class EXIMAgent(BaseAgent):
 
     def run(self, user_query: str) -> Dict[str, Any]:
         """
-        Uses LLM to extract product/country/year from query, calls API, and generates summary.
+        Resolves product from query (LLM fallback for product/country/year), calls API, and generates summary.
         """
-        # 1. Parse query with LLM
-        extraction_prompt = (
-            "Extract EXIM query parameters. "
-            "Return JSON: {{\"product\": \"<product_name>\", \"country\": \"<country_or_null>\", \"year\": <year_as_int_or_2024>}}"
-        )
-        params = self._parse_query_with_llm(user_query, extraction_prompt)
-        product = params.get("product", "").strip()
-        country = params.get("country")
-        year = params.get("year", 2024)
+        # 1. Resolve product locally, fall back to the LLM for unknown names
+        match = self._resolve_molecule(user_query)
+        if match:
+            product = f"{match.name} API"
+            country = None
+            year = 2024
+        else:
+            extraction_prompt = (
+                "Extract EXIM query parameters. "
+                "Return JSON: {{\"product\": \"<product_name>\", \"country\": \"<country_or_null>\", \"year\": <year_as_int_or_2024>}}"
+            )
+            params = self._parse_query_with_llm(user_query, extraction_prompt)
+            product = params.get("product", "").strip()
+            country = params.get("country")
+            year = params.get("year", 2024)
 
         if not product:
             return {
@@ -10,15 +10,19 @@ class IQVIAAgent(BaseAgent):
 
     def run(self, user_query: str) -> Dict[str, Any]:
         """
-        Uses LLM to extract molecule from query, calls API, and generates summary.
+        Resolves molecule from query (LLM fallback), calls API, and generates summary.
         """
-        # 1. Parse query with LLM
-        extraction_prompt = (
-            "Extract the molecule name from the query. "
-            "Return JSON: {{\"molecule\": \"<molecule_name>\"}}"
-        )
-        params = self._parse_query_with_llm(user_query, extraction_prompt)
-        molecule = params.get("molecule", "").strip()
+        # 1. Resolve molecule locally, fall back to the LLM for unknown names
+        match = self._resolve_molecule(user_query)
+        if match:
+            molecule = match.name
+        else:
+            extraction_prompt = (
+                "Extract the molecule name from the query. "
+                "Return JSON: {{\"molecule\": \"<molecule_name>\"}}"
+            )
+            params = self._parse_query_with_llm(user_query, extraction_prompt)
+            molecule = params.get("molecule", "").strip()
         
         if not molecule:
             return {
@@ -10,16 +10,21 @@ class PatentAgent(BaseAgent):
 
     def run(self, user_query: str) -> Dict[str, Any]:
         """
-        Uses LLM to extract molecule/indication from query, calls API, and generates summary.
+        Resolves molecule from query (LLM fallback for molecule/indication), calls API, and generates summary.
         """
-        # 1. Parse query with LLM
-        extraction_prompt = (
-            "Extract patent query parameters. "
-            "Return JSON: {{\"molecule\": \"<molecule_name>\", \"indication\": \"<indication_or_null>\"}}"
-        )
-        params = self._parse_query_with_llm(user_query, extraction_prompt)
-        molecule = params.get("molecule", "").strip()
-        indication = params.get("indication")
+        # 1. Resolve molecule locally, fall back to the LLM for unknown names
+        match = self._resolve_molecule(user_query)
+        if match:
+            molecule = match.name
+            indication = self._context_value(user_query, "Primary indication")
+        else:
+            extraction_prompt = (
+                "Extract patent query parameters. "
+                "Return JSON: {{\"molecule\": \"<molecule_name>\", \"indication\": \"<indication_or_null>\"}}"
+            )
+            params = self._parse_query_with_llm(user_query, extraction_prompt)
+            molecule = params.get("molecule", "").strip()
+            indication = params.get("indication")
 
         if not molecule:
             return {
@@ -27,6 +27,9 @@ class ReportAgent(BaseAgent):
             "demographics": demographics,
             "include_sections": include_sections or [],
             "detailed_agent_responses": [],   # ✅ FIX
+            # HTML is ready as soon as the request returns; the PDF is only
+            # rendered if someone downloads it
+            "format": "html",
         }
 
         for result in worker_results:
@@ -38,14 +41,16 @@ class ReportAgent(BaseAgent):
 
         url = f"{self.base_url}/api/generate-report"
 
+        # Returns html_url (the report page) and download_url (the PDF, which
+        # renders on first download and answers 202 until it exists).
         response = requests.post(
             url,
             json=report_data,
-            timeout=60
+            timeout=15
         )
         response.raise_for_status()
 
         return {
             "agent": self.name,
             "raw": response.json()
-        }
\ No newline at end of file
+        }
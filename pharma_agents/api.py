@@ -2,11 +2,16 @@
 
 # api.py
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from master_agent import MasterAgent
+from llm_client import stream_tokens
+from admission import AdmissionController, AdmissionRejected, client_key
 
 load_dotenv()
 
@@ -24,16 +29,73 @@ app.add_middleware(
 # Create ONE master agent instance
 master_agent = MasterAgent()
 
+# Bounded in-flight runs, per-client rate and LLM token budget (see admission.py)
+admission = AdmissionController()
+
 class QueryRequest(BaseModel):
     user_query: str
 
+async def _admit(request: Request) -> float:
+    """Run slot for this request, or 429 / 503 with Retry-After"""
+    try:
+        return await admission.acquire(client_key(request.headers, request.client.host if request.client else None))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.body(), headers=e.headers())
+
 @app.post("/run")
-def run_agent(req: QueryRequest):
+async def run_agent(req: QueryRequest, request: Request):
     """
     This replaces main.py for hosting
     """
-    result = master_agent.run(req.user_query)
-    return result
+    started = await _admit(request)
+    try:
+        return await asyncio.to_thread(master_agent.run, req.user_query)
+    finally:
+        admission.release(started)
+
+@app.post("/run/stream")
+async def run_agent_stream(req: QueryRequest, request: Request):
+    """
+    Same as /run, streamed as NDJSON: one {"type": "token", "source", "text"}
+    line per LLM token (agent summaries, then the final answer) as it is
+    generated, then {"type": "result", "result": ...} or {"type": "error"}.
+    """
+    started = await _admit(request)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def sink(source: str, token: str) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, {"type": "token", "source": source, "text": token})
+
+    def run():
+        try:
+            with stream_tokens(sink):
+                return master_agent.run(req.user_query)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    task = asyncio.create_task(asyncio.to_thread(run))
+    # The slot is held by the run, not the response (which may never be read)
+    task.add_done_callback(lambda _: admission.release(started))
+
+    async def lines():
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield json.dumps(item) + "\n"
+        try:
+            yield json.dumps({"type": "result", "result": await task}, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/admission/stats")
+def admission_stats():
+    """Runs accepted / queued / rejected (by reason), in flight and waiting"""
+    return admission.stats()
 
 @app.get("/health")
 def health():
@@ -0,0 +1,359 @@
+# entity_resolver.py
+# Local molecule / brand / salt resolver so entity lookup doesn't need an LLM round-trip
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class EntityMatch:
+    canonical_id: str   # stable id, e.g. "imatinib"
+    name: str           # display name, e.g. "Imatinib"
+    alias: str          # the alias that matched, e.g. "gleevec"
+    kind: str           # "molecule" | "synonym" | "brand" | "salt" ("unlisted": named, not in the catalog)
+    score: float        # 1.0 = exact alias match
+
+
+# ============================================================================
+# Catalog
+# ============================================================================
+# canonical_id -> display name + aliases grouped by kind
+MOLECULE_CATALOG: Dict[str, Dict[str, List[str]]] = {
+    "imatinib": {
+        "name": ["Imatinib"],
+        "synonym": ["STI-571", "STI571", "CGP-57148B"],
+        "brand": ["Gleevec", "Glivec", "Imkeldi"],
+        "salt": ["imatinib mesylate", "imatinib mesilate"],
+    },
+    "metformin": {
+        "name": ["Metformin"],
+        "synonym": ["dimethylbiguanide"],
+        "brand": ["Glucophage", "Fortamet", "Glumetza", "Riomet"],
+        "salt": ["metformin hydrochloride", "metformin hcl"],
+    },
+    "semaglutide": {
+        "name": ["Semaglutide"],
+        "synonym": ["NN9535"],
+        "brand": ["Ozempic", "Wegovy", "Rybelsus"],
+        "salt": [],
+    },
+    "paracetamol": {
+        "name": ["Paracetamol"],
+        "synonym": ["acetaminophen", "APAP"],
+        "brand": ["Tylenol", "Panadol", "Calpol"],
+        "salt": [],
+    },
+    "tirzepatide": {
+        "name": ["Tirzepatide"],
+        "synonym": ["LY3298176"],
+        "brand": ["Mounjaro", "Zepbound"],
+        "salt": [],
+    },
+    "liraglutide": {
+        "name": ["Liraglutide"],
+        "synonym": [],
+        "brand": ["Victoza", "Saxenda"],
+        "salt": [],
+    },
+    "orlistat": {
+        "name": ["Orlistat"],
+        "synonym": ["tetrahydrolipstatin"],
+        "brand": ["Xenical", "Alli"],
+        "salt": [],
+    },
+    "dasatinib": {
+        "name": ["Dasatinib"],
+        "synonym": ["BMS-354825"],
+        "brand": ["Sprycel"],
+        "salt": ["dasatinib monohydrate"],
+    },
+    "nilotinib": {
+        "name": ["Nilotinib"],
+        "synonym": ["AMN107"],
+        "brand": ["Tasigna"],
+        "salt": ["nilotinib hydrochloride"],
+    },
+    "bosutinib": {
+        "name": ["Bosutinib"],
+        "synonym": ["SKI-606"],
+        "brand": ["Bosulif"],
+        "salt": ["bosutinib monohydrate"],
+    },
+}
+
+# Trailing words that don't change which molecule is meant ("Imatinib API")
+IGNORED_SUFFIXES = {
+    "api", "apis", "tablet", "tablets", "capsule", "capsules", "injection",
+    "generic", "generics", "formulation", "drug",
+    "mesylate", "mesilate", "hydrochloride", "hcl", "sodium", "potassium",
+    "monohydrate", "maleate", "tartrate", "citrate",
+}
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace to single spaces"""
+    return _NORMALIZE_RE.sub(" ", text.lower()).strip()
+
+
+def _strip_suffixes(normalized: str) -> str:
+    words = normalized.split()
+    while len(words) > 1 and words[-1] in IGNORED_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def max_typos(length: int) -> int:
+    """Edits a fuzzy match may be away from the alias: none for short words, 1, then 2 from 10 characters"""
+    if length < 5:
+        return 0
+    return 1 if length < 10 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance counting an adjacent swap as one edit; anything over `limit` is `limit + 1`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _ngrams(normalized: str, n: int = 3) -> List[str]:
+    padded = f"  {normalized} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+# ============================================================================
+# Resolver
+# ============================================================================
+
+class _TrieNode:
+    __slots__ = ("children", "alias_ids")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.alias_ids: List[int] = []
+
+
+class EntityResolver:
+    """
+    Resolves free-form molecule names to canonical ids.
+
+    - A character trie over normalized aliases gives exact and prefix lookups
+      and lets `extract` scan a whole query for multi-word aliases.
+    - A character trigram inverted index gives typo-tolerant fuzzy matching
+      (Dice coefficient over trigram sets). A candidate must also be within
+      `max_typos` edits of the alias: names of other drugs share most
+      trigrams with catalog ones (ponatinib / imatinib, erlotinib /
+      nilotinib) and must not resolve to them.
+    """
+
+    def __init__(self, catalog: Dict[str, Dict[str, List[str]]], min_score: float = 0.6) -> None:
+        self.min_score = min_score
+        # alias_id -> (normalized alias, canonical_id, kind)
+        self._aliases: List[Tuple[str, str, str]] = []
+        self._names: Dict[str, str] = {}
+        self._root = _TrieNode()
+        self._gram_index: Dict[str, List[int]] = defaultdict(list)
+        self._gram_counts: List[int] = []
+        # Query words repeat a lot ("evaluate", "opportunity"), so memoize per token
+        self._token_match = lru_cache(maxsize=8192)(self._best_token_match)
+
+        for canonical_id, entry in catalog.items():
+            self._names[canonical_id] = entry["name"][0]
+            for kind in ("name", "synonym", "brand", "salt"):
+                for alias in entry.get(kind, []):
+                    self._add_alias(alias, canonical_id, "molecule" if kind == "name" else kind)
+
+    def _add_alias(self, alias: str, canonical_id: str, kind: str) -> None:
+        normalized = normalize(alias)
+        if not normalized:
+            return
+        alias_id = len(self._aliases)
+        self._aliases.append((normalized, canonical_id, kind))
+
+        node = self._root
+        for ch in normalized:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.alias_ids.append(alias_id)
+
+        grams = set(_ngrams(normalized))
+        for gram in grams:
+            self._gram_index[gram].append(alias_id)
+        self._gram_counts.append(len(grams))
+
+    def _match(self, alias_id: int, score: float) -> EntityMatch:
+        alias, canonical_id, kind = self._aliases[alias_id]
+        return EntityMatch(canonical_id, self._names[canonical_id], alias, kind, round(score, 3))
+
+    def _find_node(self, normalized: str) -> Optional[_TrieNode]:
+        node = self._root
+        for ch in normalized:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _exact(self, normalized: str) -> Optional[EntityMatch]:
+        node = self._find_node(normalized)
+        if node is not None and node.alias_ids:
+            return self._match(node.alias_ids[0], 1.0)
+        return None
+
+    def _prefix(self, normalized: str) -> Optional[EntityMatch]:
+        """Unambiguous completion of a partial name, e.g. 'semaglu'"""
+        if len(normalized) < 4:
+            return None
+        node = self._find_node(normalized)
+        if node is None:
+            return None
+        stack, found = [node], []
+        while stack:
+            current = stack.pop()
+            found.extend(current.alias_ids)
+            stack.extend(current.children.values())
+        canonical_ids = {self._aliases[a][1] for a in found}
+        if len(canonical_ids) != 1:
+            return None
+        best = min(found, key=lambda a: len(self._aliases[a][0]))
+        return self._match(best, len(normalized) / len(self._aliases[best][0]))
+
+    def fuzzy(self, text: str, limit: int = 5, min_score: Optional[float] = None) -> List[EntityMatch]:
+        """Top trigram matches for `text` that are a typo or two off an alias, best first, one per canonical id"""
+        normalized = _strip_suffixes(normalize(text))
+        if not normalized:
+            return []
+        threshold = self.min_score if min_score is None else min_score
+
+        query_grams = set(_ngrams(normalized))
+        shared: Counter = Counter()
+        for gram in query_grams:
+            for alias_id in self._gram_index.get(gram, ()):
+                shared[alias_id] += 1
+
+        best_per_id: Dict[str, EntityMatch] = {}
+        for alias_id, overlap in shared.items():
+            score = 2.0 * overlap / (len(query_grams) + self._gram_counts[alias_id])
+            if score < threshold:
+                continue
+            alias, canonical_id, _ = self._aliases[alias_id]
+            typos = max_typos(min(len(normalized), len(alias)))
+            if edit_distance(normalized, alias, typos) > typos:
+                continue
+            current = best_per_id.get(canonical_id)
+            if current is None or score > current.score:
+                best_per_id[canonical_id] = self._match(alias_id, score)
+
+        return sorted(best_per_id.values(), key=lambda m: m.score, reverse=True)[:limit]
+
+    def _best_token_match(self, token: str, min_score: float) -> Optional[EntityMatch]:
+        candidates = self.fuzzy(token, limit=1, min_score=min_score)
+        return candidates[0] if candidates else None
+
+    def resolve(self, text: str) -> Optional[EntityMatch]:
+        """Best single match for a molecule name, brand, salt or typo (None if nothing close)"""
+        if not text:
+            return None
+        normalized = normalize(text)
+        if not normalized:
+            return None
+
+        match = self._exact(normalized)
+        if match:
+            return match
+
+        stripped = _strip_suffixes(normalized)
+        if stripped != normalized:
+            match = self._exact(stripped)
+            if match:
+                return match
+
+        match = self._prefix(stripped)
+        if match:
+            return match
+
+        candidates = self.fuzzy(stripped, limit=1)
+        return candidates[0] if candidates else None
+
+    def extract(self, text: str, min_fuzzy_score: float = 0.6) -> List[EntityMatch]:
+        """
+        Find molecules mentioned anywhere in free text, ordered by how often
+        they're mentioned (ties keep first appearance).
+        """
+        normalized = normalize(text)
+        if not normalized:
+            return []
+
+        found: List[EntityMatch] = []
+        tokens = normalized.split(" ")
+        starts, offset = [], 0
+        for token in tokens:
+            starts.append(offset)
+            offset += len(token) + 1
+
+        i = 0
+        while i < len(tokens):
+            # Longest alias starting at this token that ends on a token boundary
+            node, best_id, best_end = self._root, None, 0
+            for pos in range(starts[i], len(normalized)):
+                node = node.children.get(normalized[pos])
+                if node is None:
+                    break
+                boundary = pos + 1 == len(normalized) or normalized[pos + 1] == " "
+                if node.alias_ids and boundary:
+                    best_id, best_end = node.alias_ids[0], pos + 1
+            if best_id is not None:
+                found.append(self._match(best_id, 1.0))
+                while i < len(tokens) and starts[i] < best_end:
+                    i += 1
+                continue
+
+            token = tokens[i]
+            if len(token) >= 5 and token not in IGNORED_SUFFIXES:
+                match = self._token_match(token, min_fuzzy_score)
+                if match:
+                    found.append(match)
+            i += 1
+
+        counts = Counter(m.canonical_id for m in found)
+        first: Dict[str, EntityMatch] = {}
+        for m in found:
+            first.setdefault(m.canonical_id, m)
+        # sorted() is stable, so equal counts stay in order of appearance
+        return sorted(first.values(), key=lambda m: -counts[m.canonical_id])
+
+
+molecule_resolver = EntityResolver(MOLECULE_CATALOG)
+
+
+@lru_cache(maxsize=4096)
+def resolve_molecule(text: str) -> Optional[EntityMatch]:
+    """Cached `molecule_resolver.resolve` for hot request paths"""
+    return molecule_resolver.resolve(text)
+
+
+def canonical_molecule_id(text: Optional[str]) -> Optional[str]:
+    """Canonical id for `text`, or its normalized form if nothing matches"""
+    if not text:
+        return None
+    match = resolve_molecule(text)
+    return match.canonical_id if match else normalize(text)
+
+
+@lru_cache(maxsize=4096)
+def mentioned_molecules(text: str) -> Tuple[str, ...]:
+    """Canonical ids of every molecule mentioned in free text"""
+    return tuple(m.canonical_id for m in molecule_resolver.extract(text))
@@ -1,35 +1,83 @@
 # llm_client.py
 import os
-from typing import Optional
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Token streaming: while a sink is set (see stream_tokens), chat() calls made
+# under a token_source label stream the completion and hand every token to
+# the sink as it arrives. Unlabelled calls (JSON extraction) stay silent.
+# Context variables follow the work into asyncio.to_thread, so callers don't
+# have to thread a callback through every agent.
+_token_sink: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar("token_sink", default=None)
+_token_source: ContextVar[Optional[str]] = ContextVar("token_source", default=None)
+
+
+@contextmanager
+def stream_tokens(sink: Callable[[str, str], None]):
+    """Send `sink(source, token)` for every token chat() generates in this context"""
+    reset = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(reset)
+
+
+@contextmanager
+def token_source(name: str):
+    """Label the tokens generated in this context (agent name, "final_answer", ...)"""
+    reset = _token_source.set(name)
+    try:
+        yield
+    finally:
+        _token_source.reset(reset)
+
 
 class GroqLLM:
     """Wrapper for Groq LLM using LangChain"""
-    
+
     def __init__(self, model_name: str = "llama-3.1-8b-instant", temperature: float = 0.7):
+        # langchain_groq pulls in most of LangChain; load it with the first client
+        from langchain_groq import ChatGroq
+
         self.llm = ChatGroq(
             model_name=model_name,
             temperature=temperature,
             groq_api_key=os.getenv("GROQ_API_KEY")
         )
         self.model_name = model_name
-    
+
     def chat(self, system_prompt: str, user_prompt: str) -> str:
-        """Simple chat interface with system and user prompts"""
+        """Simple chat interface with system and user prompts (streams when a token sink is set)"""
+        sink, source = _token_sink.get(), _token_source.get()
+        if sink is not None and source is not None:
+            tokens = []
+            for token in self.stream(system_prompt, user_prompt):
+                tokens.append(token)
+                sink(source, token)
+            return "".join(tokens)
+
         messages = [
             ("system", system_prompt),
             ("human", user_prompt)
         ]
         response = self.llm.invoke(messages)
         return response.content
-    
+
+    def stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """Yield the completion token by token as the model generates it"""
+        messages = [
+            ("system", system_prompt),
+            ("human", user_prompt)
+        ]
+        for chunk in self.llm.stream(messages):
+            if chunk.content:
+                yield chunk.content
+
     def invoke(self, messages: list) -> str:
         """Invoke with message list format"""
         response = self.llm.invoke(messages)
         return response.content
-
@@ -34,6 +34,8 @@ def main():
         print("\n" + "="*70)
         print("📥 DOWNLOADABLE REPORT LINK")
         print("="*70)
+        if "html_link" in report_meta:
+            print(f"\n🌐 View: {report_meta['html_link']}")
         print(f"\n🔗 {full_download_url}\n")
         print(f"Report ID: {report_meta.get('report_id', 'N/A')}")
         print(f"Report Type: {report_meta.get('report_type', 'N/A')}")
@@ -6,7 +6,7 @@ from langgraph.graph import StateGraph, END
 from langchain.prompts import ChatPromptTemplate
 
 from config import settings
-from llm_client import GroqLLM
+from llm_client import GroqLLM, token_source
 from agents.iqvia_agent import IQVIAAgent
 from agents.exim_agent import EXIMAgent
 from agents.patent_agent import PatentAgent
@@ -158,7 +158,7 @@ class MasterAgent:
         return state
 
     def _generate_report(self, state: AgentState) -> AgentState:
-        """Generate PDF report with all data"""
+        """Generate the HTML report (PDF on download) with all data"""
         plan = state["plan"]
         worker_results = state["worker_results"]
         user_query = state["user_query"]
@@ -233,7 +233,8 @@ Worker agent summaries:
 Write a concise executive summary and actionable recommendations for the portfolio team.
 """
 
-        final_answer = self.llm.chat(system_prompt, user_prompt)
+        with token_source("final_answer"):
+            final_answer = self.llm.chat(system_prompt, user_prompt)
         state["final_answer"] = final_answer
         return state
 
@@ -367,6 +368,12 @@ Write a concise executive summary and actionable recommendations for the portfol
             report_meta["download_url"] = download_url
             report_meta["download_link"] = full_download_link
 
+        html_url = report_meta.get("html_url")
+        full_html_link = None
+        if html_url:
+            full_html_link = f"{api_base_url}{html_url}" if html_url.startswith("/") else html_url
+            report_meta["html_link"] = full_html_link
+
         final_state["report"] = report_meta
 
         # Shape final JSON response
@@ -382,5 +389,7 @@ Write a concise executive summary and actionable recommendations for the portfol
         # Also expose the absolute download link at the top level for convenience
         if full_download_link:
             response["download_link"] = full_download_link
+        if full_html_link:
+            response["html_link"] = full_html_link
 
         return response
@@ -0,0 +1,99 @@
+# portfolio.py
+# Comparative metrics and ranking for portfolio reports (many molecule / indication candidates)
+import os
+from typing import Any, Dict, List, Optional
+
+from tabular_export import iter_rows, TABLES
+
+PORTFOLIO_MAX_CANDIDATES = int(os.getenv("PORTFOLIO_MAX_CANDIDATES", "100"))
+
+# Score weights (sum to 100). A triage heuristic for ordering the review,
+# not an investment recommendation.
+SCORE_WEIGHTS = {
+    "market": 35,       # 2024 sales across reported markets
+    "growth": 25,       # sales-weighted 5y CAGR
+    "unmet_need": 15,   # IQVIA unmet-need flag
+    "fto": 15,          # freedom to operate: clear 1, unknown 0.5, blocked 0
+    "trials": 10,       # active clinical trials
+}
+
+
+def _column(table: str, name: str) -> int:
+    return [column for column, _ in TABLES[table]].index(name)
+
+
+def candidate_metrics(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Comparable numbers for one candidate. `candidate` has the report_data
+    shape (`worker_results`, optional `molecule`, `indication`, `session_id`).
+    """
+    source = {"worker_results": candidate.get("worker_results") or []}
+
+    sales_col, cagr_col, unmet_col = (_column("markets", c) for c in ("sales_2024_musd", "cagr_5y", "unmet_need"))
+    market_musd, weighted_cagr, unmet_need = 0.0, 0.0, False
+    for row in iter_rows("markets", [source]):
+        sales = row[sales_col] or 0.0
+        market_musd += sales
+        weighted_cagr += sales * (row[cagr_col] or 0.0)
+        unmet_need = unmet_need or bool(row[unmet_col])
+
+    fto_col = _column("patents", "fto_flag")
+    fto_flags = [row[fto_col] for row in iter_rows("patents", [source]) if row[fto_col]]
+    fto = fto_flags[0] if fto_flags else None
+
+    return {
+        "molecule": candidate.get("molecule"),
+        "indication": candidate.get("indication"),
+        "session_id": candidate.get("session_id"),
+        "market_musd": round(market_musd, 1),
+        "cagr_5y": round(weighted_cagr / market_musd, 2) if market_musd else None,
+        "unmet_need": unmet_need,
+        "fto": fto,
+        "active_trials": sum(1 for _ in iter_rows("trials", [source])),
+    }
+
+
+def _fto_score(fto: Optional[str]) -> float:
+    text = (fto or "").lower()
+    if text.startswith("clear"):
+        return 1.0
+    if text.startswith("blocked"):
+        return 0.0
+    return 0.5
+
+
+def _normalized(values: List[float]) -> List[float]:
+    low, high = min(values), max(values)
+    if high == low:
+        return [1.0 if high else 0.0] * len(values)
+    return [(v - low) / (high - low) for v in values]
+
+
+def rank_candidates(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Metrics plus a 0-100 score per candidate, best first. Market size,
+    growth and trial counts are min-max normalized across the portfolio,
+    so scores only compare candidates within the same report.
+    Each row keeps the candidate's position in `candidates` as `index`.
+    """
+    rows = [candidate_metrics(candidate) for candidate in candidates]
+    if not rows:
+        return []
+    market = _normalized([row["market_musd"] for row in rows])
+    growth = _normalized([row["cagr_5y"] or 0.0 for row in rows])
+    trials = _normalized([float(row["active_trials"]) for row in rows])
+
+    for i, row in enumerate(rows):
+        row["index"] = i
+        row["score"] = round(
+            SCORE_WEIGHTS["market"] * market[i]
+            + SCORE_WEIGHTS["growth"] * growth[i]
+            + SCORE_WEIGHTS["unmet_need"] * row["unmet_need"]
+            + SCORE_WEIGHTS["fto"] * _fto_score(row["fto"])
+            + SCORE_WEIGHTS["trials"] * trials[i],
+            1,
+        )
+    rows.sort(key=lambda row: (-row["score"], -row["market_musd"]))
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
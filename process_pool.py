@@ -0,0 +1,42 @@
+# process_pool.py
+# Spawn-based process pool that can be killed outright (shared by report jobs and portfolio sections)
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import SpawnContext, SpawnProcess
+from typing import List, Optional
+
+
+class _OwnedSpawnContext(SpawnContext):
+    """Spawn context that remembers every worker process it starts"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self.processes: List[SpawnProcess] = []
+
+    def Process(self, *args, **kwargs) -> SpawnProcess:
+        process = SpawnProcess(*args, **kwargs)
+        with self._lock:
+            self.processes = [p for p in self.processes if p.exitcode is None] + [process]
+        return process
+
+
+class SpawnPool(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor on the spawn start method (never forks a process that
+    has live threads) that keeps its own handles on its workers, so a pool
+    with a hung task can be torn down without waiting for it.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._owned_context = _OwnedSpawnContext()
+        super().__init__(max_workers=max_workers, mp_context=self._owned_context)
+
+    def terminate(self) -> None:
+        """Cancel queued tasks and kill every worker, running tasks included"""
+        self.shutdown(wait=False, cancel_futures=True)
+        with self._owned_context._lock:
+            processes = list(self._owned_context.processes)
+        for process in processes:
+            if process.pid is not None and process.exitcode is None:
+                process.terminate()
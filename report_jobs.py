@@ -0,0 +1,286 @@
+# report_jobs.py
+# Background PDF rendering jobs - keeps CPU-bound Matplotlib/ReportLab work off the event loop
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from process_pool import SpawnPool
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_MAX_PENDING = int(os.getenv("REPORT_MAX_PENDING", "16"))
+REPORT_JOB_TIMEOUT_S = float(os.getenv("REPORT_JOB_TIMEOUT_S", "120"))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _discard_result(future: "asyncio.Future") -> None:
+    """Nobody awaits a timed-out render any more; keep asyncio from logging its outcome"""
+    if not future.cancelled():
+        future.exception()
+
+
+class ReportQueueFull(Exception):
+    """Raised when too many report jobs are already waiting for a worker"""
+
+
+@dataclass
+class ReportJob:
+    job_id: str
+    report_id: str
+    topic: str
+    status: str = "queued"      # queued -> running -> completed | failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    render_ms: Optional[float] = None
+    error: Optional[str] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        timing: Dict[str, Optional[float]] = {"queue_ms": None, "render_ms": self.render_ms, "total_ms": None}
+        if self.started_at:
+            timing["queue_ms"] = round((self.started_at - self.submitted_at) * 1000, 1)
+        if self.finished_at:
+            timing["total_ms"] = round((self.finished_at - self.submitted_at) * 1000, 1)
+        return {
+            "job_id": self.job_id,
+            "report_id": self.report_id,
+            "topic": self.topic,
+            "status": self.status,
+            "error": self.error,
+            "timing": timing,
+            **self.result,
+        }
+
+
+class ReportJobManager:
+    """
+    Runs report renders in a process pool behind a small job API.
+
+    - `submit` returns immediately; at most `max_pending` jobs may wait for
+      a worker, beyond that `ReportQueueFull` is raised.
+    - Each job records queue wait, render and total time.
+    - Listeners (e.g. a WebSocket) can subscribe to a job's status changes.
+    - A render that times out can't be interrupted, so its pool is retired:
+      new jobs get a fresh pool, and the old one's processes are killed once
+      its other renders are done (or past their own timeouts).
+    """
+
+    def __init__(
+        self,
+        render_fn: Callable[..., Dict[str, Any]],
+        max_workers: int = REPORT_WORKERS,
+        max_pending: int = REPORT_MAX_PENDING,
+        timeout_s: float = REPORT_JOB_TIMEOUT_S,
+        on_complete: Optional[Callable[[ReportJob], None]] = None,
+        keep_finished: int = 500,
+    ) -> None:
+        self.render_fn = render_fn
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout_s = timeout_s
+        self.on_complete = on_complete
+        self.keep_finished = keep_finished
+
+        self._pool: Optional[SpawnPool] = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._listeners: Dict[str, List[asyncio.Queue]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Renders in flight per pool, with their deadlines (for retiring a pool)
+        self._inflight: Dict[SpawnPool, Dict[Future, float]] = {}
+        self._retiring: set = set()
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0, "pools_recycled": 0}
+
+    def _get_pool(self) -> SpawnPool:
+        # Created lazily; spawn avoids forking a process that has live threads
+        if self._pool is None:
+            self._pool = SpawnPool(max_workers=self.max_workers)
+        return self._pool
+
+    def prestart(self, warmup_fn: Callable[[], Any]) -> None:
+        """
+        Start the worker processes now and run `warmup_fn` in each, so the
+        first report doesn't pay for process start-up and library imports.
+        """
+        pool = self._get_pool()
+        for _ in range(self.max_workers):
+            pool.submit(warmup_fn)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == "queued")
+
+    @property
+    def running(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == "running")
+
+    def submit(
+        self,
+        report_id: str,
+        topic: str,
+        *render_args: Any,
+        render_fn: Optional[Callable[..., Dict[str, Any]]] = None,
+        timeout_s: Optional[float] = None,
+    ) -> ReportJob:
+        """
+        Queue a render; must be called from the event loop. `render_fn` and
+        `timeout_s` override the manager's defaults for this job.
+        """
+        if self.queued >= self.max_pending:
+            self._counters["rejected"] += 1
+            raise ReportQueueFull(f"{self.queued} report jobs already queued")
+
+        job = ReportJob(job_id=uuid.uuid4().hex, report_id=report_id, topic=topic)
+        self._jobs[job.job_id] = job
+        self._counters["submitted"] += 1
+        self._tasks[job.job_id] = asyncio.create_task(
+            self._run(job, render_args, render_fn or self.render_fn, self.timeout_s if timeout_s is None else timeout_s)
+        )
+        self._trim()
+        return job
+
+    async def _run(self, job: ReportJob, render_args: tuple, render_fn: Callable[..., Dict[str, Any]], timeout_s: float) -> None:
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                self._notify(job)
+                pool = self._get_pool()
+                future = pool.submit(render_fn, *render_args)
+                inflight = self._inflight.setdefault(pool, {})
+                inflight[future] = time.time() + timeout_s
+                future.add_done_callback(lambda f: inflight.pop(f, None))   # from the pool's thread
+                waiter = asyncio.wrap_future(future)
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout_s)
+                except asyncio.TimeoutError:
+                    # The worker can't be interrupted: retire its pool so the slot really frees up
+                    waiter.add_done_callback(_discard_result)
+                    self._retire(pool)
+                    raise
+
+            job.render_ms = result.pop("render_ms", None)
+            job.result = result
+            job.status = "completed"
+            self._counters["completed"] += 1
+        except BrokenProcessPool as e:
+            # A worker died (OOM, segfault); start a fresh pool for later jobs
+            job.status = "failed"
+            job.error = f"Report worker crashed: {e}"
+            self._counters["failed"] += 1
+            self.shutdown()
+        except asyncio.TimeoutError:
+            job.status = "failed"
+            job.error = f"Report rendering timed out after {timeout_s:.0f}s"
+            self._counters["failed"] += 1
+            self._counters["timed_out"] += 1
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self._counters["failed"] += 1
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.job_id, None)
+
+        if self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                print(f"[REPORT JOBS] on_complete failed for {job.job_id}: {e}")
+        self._notify(job)
+
+    def _retire(self, pool: SpawnPool) -> None:
+        """Send new jobs to a fresh pool; kill `pool`'s processes once its other renders are over"""
+        if pool in self._retiring:
+            return
+        if self._pool is pool:
+            self._pool = None
+        self._retiring.add(pool)
+        self._counters["pools_recycled"] += 1
+        asyncio.get_running_loop().create_task(self._reap(pool))
+
+    async def _reap(self, pool: SpawnPool) -> None:
+        inflight = self._inflight.get(pool, {})
+        others = [f for f, deadline in list(inflight.items()) if not f.done() and deadline > time.time()]
+        if others:
+            deadline = max(inflight.get(f, 0.0) for f in others)
+            waiters = [asyncio.wrap_future(f) for f in others]
+            for waiter in waiters:
+                waiter.add_done_callback(_discard_result)
+            await asyncio.wait(waiters, timeout=max(0.0, deadline - time.time()))
+        # shutdown() alone would wait for the hung render
+        pool.terminate()
+        self._inflight.pop(pool, None)
+        self._retiring.discard(pool)
+        print("[REPORT JOBS] recycled the worker pool of a timed-out render")
+
+    def _notify(self, job: ReportJob) -> None:
+        for queue in self._listeners.get(job.job_id, []):
+            queue.put_nowait(job.to_dict())
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond `keep_finished`"""
+        finished = [jid for jid, j in self._jobs.items() if j.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            self._jobs.pop(job_id, None)
+            self._listeners.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    def find_by_report(self, report_id: str) -> Optional[ReportJob]:
+        """Most recent job rendering `report_id`, if it is still remembered"""
+        for job in reversed(self._jobs.values()):
+            if job.report_id == report_id:
+                return job
+        return None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[ReportJob]:
+        """Wait up to `timeout` seconds for a job to finish and return it"""
+        job = self._jobs.get(job_id)
+        task = self._tasks.get(job_id)
+        if job and task and not job.done:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        listeners = self._listeners.get(job_id, [])
+        if queue in listeners:
+            listeners.remove(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        finished = [j for j in self._jobs.values() if j.status == "completed" and j.render_ms is not None]
+        render_times = sorted(j.render_ms for j in finished)
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "queued": self.queued,
+            "running": self.running,
+            **self._counters,
+            "avg_render_ms": round(sum(render_times) / len(render_times), 1) if render_times else None,
+            "p95_render_ms": render_times[int(len(render_times) * 0.95) - 1] if len(render_times) >= 20 else None,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,97 @@
+# report_sections.py
+# Report sections rendered once per content hash as PDF fragments, merged into the final PDF
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from disk_cache import DiskLRUCache
+
+# pypdf is optional - without it reports are built as one document every time.
+# Only its presence is checked here; it is imported when fragments are merged.
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+
+# Every cached section starts on a fresh page, so with the cache on each agent
+# section of a report begins a new page; "0" lays the report out as one
+# flowing document instead (and rebuilds all of it every time)
+REPORT_SECTION_CACHE = os.getenv("REPORT_SECTION_CACHE", "1") not in ("0", "false", "no")
+REPORT_SECTION_CACHE_MB = int(os.getenv("REPORT_SECTION_CACHE_MB", "512"))
+
+
+def style_fingerprint(styles: "StyleSheet1") -> str:
+    """Hash of every paragraph style attribute, so restyling invalidates cached sections"""
+    described = []
+    for name in sorted(styles.byName):
+        style = styles.byName[name]
+        attrs = {
+            key: (getattr(value, "name", None) if key == "parent" else repr(value))
+            for key, value in vars(style).items()
+        }
+        described.append([name, attrs])
+    encoded = json.dumps(described, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def section_key(kind: str, payload: Dict[str, Any], fingerprint: str) -> str:
+    """Content hash of everything a section's pages depend on"""
+    encoded = json.dumps(
+        {"kind": kind, "payload": payload, "styles": fingerprint},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def render_fragment(story: List[Any], doc_options: Dict[str, Any], path: Path) -> Path:
+    """Lay out `story` as a standalone PDF at `path` (removed again if the build fails)"""
+    from reportlab.platypus import SimpleDocTemplate
+
+    try:
+        SimpleDocTemplate(str(path), **doc_options).build(story)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+class SectionCache(DiskLRUCache):
+    """
+    One PDF per rendered section (`<sha256>.pdf`). A section that starts on
+    a fresh page lays out the same whatever surrounds it, so an unchanged
+    section's pages can be copied into a new report as they are.
+    """
+
+    suffix = ".pdf"
+
+    def __init__(self, directory: Path, max_bytes: int = REPORT_SECTION_CACHE_MB * 1024 * 1024) -> None:
+        super().__init__(directory, max_bytes)
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self._lookup(key)
+        self._count(hit=path is not None)
+        return path
+
+    def render(self, key: str, story: List[Any], doc_options: Dict[str, Any]) -> Path:
+        """Lay out `story` as a standalone PDF fragment and cache it"""
+        return self._commit(key, render_fragment(story, doc_options, self._temp_path(key)))
+
+
+def merge_fragments(fragments: Sequence[Path], output_path: Path, dedupe: bool = False) -> int:
+    """
+    Concatenate fragment PDFs into `output_path`; returns the page count.
+    `dedupe` stores identical objects (e.g. the same chart image used by
+    several fragments) once - worth it when many fragments share charts.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for fragment in fragments:
+        writer.append(str(fragment))
+    if dedupe and hasattr(writer, "compress_identical_objects"):
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return len(writer.pages)
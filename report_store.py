@@ -0,0 +1,337 @@
+# report_store.py
+# Durable SQLite index of generated reports, plus retention / disk-quota garbage collection
+import base64
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+REPORT_DB_PATH = os.getenv("REPORT_DB_PATH", "reports/report_index.db")
+REPORT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "30"))
+REPORT_DISK_QUOTA_MB = int(os.getenv("REPORT_DISK_QUOTA_MB", "2048"))
+REPORT_GC_INTERVAL_S = float(os.getenv("REPORT_GC_INTERVAL_S", "3600"))
+
+# Files younger than this are never treated as orphans (they may still be rendering)
+ORPHAN_GRACE_S = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id     TEXT PRIMARY KEY,
+    topic         TEXT NOT NULL DEFAULT '',
+    molecule      TEXT,
+    indication    TEXT,
+    session_id    TEXT,
+    status        TEXT NOT NULL DEFAULT 'queued',
+    path          TEXT NOT NULL,
+    size_bytes    INTEGER,
+    page_count    INTEGER,
+    render_ms     REAL,
+    chart_backend TEXT,
+    error         TEXT,
+    created_at    REAL NOT NULL,
+    completed_at  REAL,
+    report_format TEXT NOT NULL DEFAULT 'pdf',
+    report_data   BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_reports_created_id ON reports (created_at DESC, report_id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_molecule_created_id ON reports (molecule, created_at DESC, report_id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_indication_created_id
+    ON reports (indication COLLATE NOCASE, created_at DESC, report_id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_session ON reports (session_id);
+"""
+
+# Replaced by the (..., created_at, report_id) indexes above, which also serve cursor pages
+OBSOLETE_INDEXES = ("idx_reports_molecule_created", "idx_reports_created")
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = {
+    "report_format": "ALTER TABLE reports ADD COLUMN report_format TEXT NOT NULL DEFAULT 'pdf'",
+    "report_data": "ALTER TABLE reports ADD COLUMN report_data BLOB",
+}
+
+UPDATABLE_COLUMNS = (
+    "topic", "molecule", "indication", "session_id", "status", "path", "size_bytes",
+    "page_count", "render_ms", "chart_backend", "error", "completed_at", "report_format",
+)
+
+# Everything except the (possibly large) stored report_data
+RECORD_COLUMNS = (
+    "report_id, topic, molecule, indication, session_id, status, path, size_bytes, page_count, "
+    "render_ms, chart_backend, error, created_at, completed_at, report_format"
+)
+
+
+def new_report_id() -> str:
+    """Sortable by time, unique even for reports created in the same second"""
+    return f"report_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+
+def encode_cursor(record: Dict[str, Any]) -> str:
+    """Opaque position after `record` in the newest-first listing"""
+    raw = f"{record['created_at']!r}|{record['report_id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """(created_at, report_id); raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, report_id = raw.split("|", 1)
+        return float(created_at), report_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Malformed cursor") from e
+
+
+def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    record = dict(row)
+    record["timestamp"] = datetime.fromtimestamp(record["created_at"]).isoformat()
+    return record
+
+
+class ReportStore:
+    """
+    Report metadata (topic, molecule, session, size, page count, render time)
+    in a small SQLite database next to the PDFs, so reports survive restarts.
+
+    `get` / `in` keep the old dict-style lookups working for the download route.
+    """
+
+    def __init__(self, db_path: str = REPORT_DB_PATH) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(reports)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in existing:
+                self._conn.execute(statement)
+        for index in OBSOLETE_INDEXES:
+            self._conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+    def add(
+        self,
+        report_id: str,
+        path: str,
+        topic: str = "",
+        molecule: Optional[str] = None,
+        indication: Optional[str] = None,
+        session_id: Optional[str] = None,
+        chart_backend: Optional[str] = None,
+        status: str = "queued",
+        created_at: Optional[float] = None,
+        report_format: str = "pdf",
+        report_data: Optional[bytes] = None,
+    ) -> None:
+        """`report_data` (serialized request body) lets the PDF be rendered later, on demand"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports "
+                "(report_id, topic, molecule, indication, session_id, status, path, chart_backend, created_at, "
+                "report_format, report_data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (report_id, topic, molecule, indication, session_id, status, path, chart_backend,
+                 created_at if created_at is not None else time.time(), report_format, report_data),
+            )
+
+    def update(self, report_id: str, **fields: Any) -> None:
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown report fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE reports SET {assignments} WHERE report_id = ?",
+                (*fields.values(), report_id),
+            )
+
+    def mark_completed(self, report_id: str, render_ms: Optional[float], page_count: Optional[int]) -> None:
+        record = self.get(report_id)
+        size = None
+        if record:
+            try:
+                size = os.path.getsize(record["path"])
+            except OSError:
+                pass
+        self.update(report_id, status="completed", render_ms=render_ms, page_count=page_count,
+                    size_bytes=size, completed_at=time.time())
+
+    def mark_failed(self, report_id: str, error: Optional[str]) -> None:
+        self.update(report_id, status="failed", error=error, completed_at=time.time())
+
+    def get(self, report_id: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM reports WHERE report_id = ?", (report_id,)
+            ).fetchone()
+        return _to_dict(row) if row else default
+
+    def get_report_data(self, report_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT report_data FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+        return row["report_data"] if row else None
+
+    def __contains__(self, report_id: object) -> bool:
+        return isinstance(report_id, str) and self.get(report_id) is not None
+
+    def delete(self, report_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM reports WHERE report_id = ?", (report_id,))
+
+    def list(
+        self,
+        molecule: Optional[str] = None,
+        session_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        status: Optional[str] = "completed",
+        limit: int = 50,
+        offset: int = 0,
+        indication: Optional[str] = None,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest first; every filter maps onto an index. `after` is a decoded
+        cursor: the page starts right after that (created_at, report_id), so
+        deep pages cost the same as the first one (unlike `offset`).
+        """
+        clauses, params = [], []
+        if molecule:
+            clauses.append("molecule = ?")
+            params.append(molecule)
+        if indication:
+            clauses.append("indication = ? COLLATE NOCASE")
+            params.append(indication)
+        if session_id:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if after is not None:
+            clauses.append("(created_at, report_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM reports {where} "
+                "ORDER BY created_at DESC, report_id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [_to_dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n, COALESCE(SUM(size_bytes), 0) AS bytes FROM reports GROUP BY status"
+            ).fetchall()
+        return {row["status"]: {"count": row["n"], "bytes": row["bytes"]} for row in rows}
+
+    # ------------------------------------------------------------------
+    # Retention / garbage collection
+    # ------------------------------------------------------------------
+    def _remove(self, record: Dict[str, Any]) -> int:
+        freed = 0
+        try:
+            freed = os.path.getsize(record["path"])
+            os.remove(record["path"])
+        except FileNotFoundError:
+            pass
+        self.delete(record["report_id"])
+        return freed
+
+    def adopt_files(self, report_dir: Path) -> int:
+        """Index PDFs written before the index existed, so retention covers them"""
+        adopted = 0
+        for path in Path(report_dir).glob("*.pdf"):
+            if path.stem in self:
+                continue
+            st = path.stat()
+            self.add(path.stem, str(path), status="completed", created_at=st.st_mtime)
+            self.update(path.stem, size_bytes=st.st_size, completed_at=st.st_mtime)
+            adopted += 1
+        return adopted
+
+    def collect_garbage(
+        self,
+        report_dir: Path,
+        chart_dir: Optional[Path] = None,
+        retention_days: float = REPORT_RETENTION_DAYS,
+        quota_bytes: int = REPORT_DISK_QUOTA_MB * 1024 * 1024,
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        1. Delete reports (file + row) older than `retention_days`.
+        2. Delete the oldest reports until the PDFs fit in `quota_bytes`.
+        3. Delete orphaned chart PNGs: stale temp renders and legacy
+           per-report charts whose report is gone. Content-hashed cache
+           entries are left to ChartCache's own LRU limit.
+        """
+        now = now if now is not None else time.time()
+        result = {"adopted": self.adopt_files(report_dir), "expired": 0, "over_quota": 0,
+                  "orphan_charts": 0, "bytes_freed": 0}
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM reports WHERE created_at < ? AND status != 'queued'",
+                (now - retention_days * 86400,),
+            ).fetchall()
+        for record in map(_to_dict, rows):
+            result["bytes_freed"] += self._remove(record)
+            result["expired"] += 1
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM reports WHERE status = 'completed' ORDER BY created_at ASC"
+            ).fetchall()
+        records = [_to_dict(row) for row in rows]
+        total = sum(r["size_bytes"] or 0 for r in records)
+        for record in records:
+            if total <= quota_bytes:
+                break
+            total -= record["size_bytes"] or 0
+            result["bytes_freed"] += self._remove(record)
+            result["over_quota"] += 1
+
+        if chart_dir is not None and Path(chart_dir).exists():
+            for path in Path(chart_dir).glob("*.png"):
+                is_temp = path.name.endswith(".tmp.png")
+                if not is_temp and len(path.stem) == 64:
+                    continue  # chart cache entry
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if now - st.st_mtime < ORPHAN_GRACE_S:
+                    continue
+                if not is_temp:
+                    # Legacy charts are named "<report_id>_<chart_id>.png"
+                    parts = path.stem.split("_")
+                    if any("_".join(parts[:i]) in self for i in range(2, len(parts))):
+                        continue
+                path.unlink(missing_ok=True)
+                result["orphan_charts"] += 1
+                result["bytes_freed"] += st.st_size
+
+        return result
@@ -0,0 +1,631 @@
+# session_events.py
+# Append-only, sequence-numbered event log per session, for replay to late or reconnecting clients.
+# In-process, or shared by every worker process through SQLite or Redis (pub/sub).
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from http_encoding import dumps, loads
+from json_patch import diff
+from session_store import REDIS_AVAILABLE, REDIS_URL, SESSION_STORE, SESSION_TTL_S, watch_error
+
+if REDIS_AVAILABLE:
+    import redis
+
+EVENT_LOG_SIZE = int(os.getenv("EVENT_LOG_SIZE", "1000"))           # events kept per session (incl. token batches)
+EVENT_LOG_SESSIONS = int(os.getenv("EVENT_LOG_SESSIONS", "1000"))   # sessions with a log, LRU (memory backend)
+EVENT_REPLAY_MAX = int(os.getenv("EVENT_REPLAY_MAX", "200"))        # larger gaps get a snapshot instead
+EVENT_BUS = os.getenv("EVENT_BUS", SESSION_STORE)                   # memory | sqlite | redis
+EVENT_DB_PATH = os.getenv("EVENT_DB_PATH", "reports/session_events.db")
+EVENT_POLL_S = float(os.getenv("EVENT_POLL_S", "0.05"))             # SQLite backend: how often other workers' events are picked up
+EVENT_CHANNEL = "pharmaverse:session-events"
+
+# Identifies this process on the shared bus, so it skips its own events
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+
+class SessionEvents:
+    """
+    Every broadcast gets the next `seq` of its session (1, 2, ...). A client
+    that saw up to `last_seq` asks `since(session_id, last_seq)` for what it
+    missed; None means the gap can't be replayed (trimmed, too large, or the
+    server restarted) and the client should start from a snapshot.
+
+    When `append` is given the session's current (compact) `state`, the
+    event also carries `patch`: the JSON Patch from the state at the
+    previous seq. It is computed once per event, so any number of streams,
+    and resumes from any logged seq, just replay it.
+
+    Every event - appended here or, with a shared backend, by another worker
+    - is handed to the `subscribe` listeners on the event loop passed to
+    `start`. This class keeps the log in process memory; SQLiteSessionEvents
+    and RedisSessionEvents share it between processes.
+
+    On the event loop use `append_async`: the state and the shared log's
+    write are produced on a writer thread, so they never block the loop.
+    """
+
+    backend = "memory"
+    shared = False
+
+    def __init__(
+        self,
+        max_events: int = EVENT_LOG_SIZE,
+        max_sessions: int = EVENT_LOG_SESSIONS,
+        replay_max: int = EVENT_REPLAY_MAX,
+    ) -> None:
+        self.max_events = max_events
+        self.max_sessions = max_sessions
+        self.replay_max = replay_max
+        self._logs: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._seq: Dict[str, int] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}   # state as of the session's last seq
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._listeners: List[Listener] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[ThreadPoolExecutor] = None   # append_async's, one thread so writes keep call order
+        # Shared backends: the state this worker last wrote, by seq, so the next patch needn't decode the head's
+        self._written: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"appended": 0, "received": 0, "replayed": 0, "snapshots": 0}
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+    def subscribe(self, listener: Listener) -> None:
+        """Call `listener(session_id, event)` on the event loop for every event"""
+        self._listeners.append(listener)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Begin receiving other workers' events (shared backends)"""
+        self._loop = loop
+
+    def stop(self) -> None:
+        """Finish the queued appends"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+    def _deliver(self, session_id: str, event: Dict[str, Any]) -> None:
+        for waiter in self._waiters.pop(session_id, []):
+            if not waiter.done():
+                waiter.set_result(event["seq"])
+        for listener in self._listeners:
+            listener(session_id, event)
+
+    def _receive(self, session_id: str, event: Dict[str, Any]) -> None:
+        """Another worker's event, from a listener thread"""
+        self.stats["received"] += 1
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, session_id, event)
+
+    def append(
+        self, session_id: str, message: Dict[str, Any], state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        The message as logged, with `seq`, `ts` and (given `state`) `patch`
+        added. Call from the event loop; listeners run before this returns.
+        """
+        event = self._record(session_id, message, state)
+        self.stats["appended"] += 1
+        self._deliver(session_id, event)
+        return event
+
+    def append_async(
+        self,
+        session_id: str,
+        message: Dict[str, Any],
+        state_fn: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+    ) -> "asyncio.Future[Dict[str, Any]]":
+        """
+        `append` without blocking the event loop. `state_fn()` (it may read the
+        session store; None means no patch) and a shared backend's write run
+        on the writer thread, in call order; listeners run on the loop once
+        the returned future is done. Call from the event loop; awaiting the
+        future is optional.
+        """
+        loop = asyncio.get_running_loop()
+        appended = loop.create_future()
+
+        def write():
+            state = state_fn() if state_fn is not None else None
+            return self._record(session_id, message, state) if self.shared else state
+
+        def deliver(written: asyncio.Future) -> None:
+            try:
+                # The in-process log is only touched on the loop
+                event = written.result() if self.shared else self._record(session_id, message, written.result())
+            except Exception as e:
+                appended.set_exception(e)
+                return
+            self.stats["appended"] += 1
+            self._deliver(session_id, event)
+            appended.set_result(event)
+
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-events")
+        asyncio.wrap_future(self._writer.submit(write), loop=loop).add_done_callback(deliver)
+        return appended
+
+    # ------------------------------------------------------------------
+    # Log (overridden by the shared backends)
+    # ------------------------------------------------------------------
+    def _record(
+        self, session_id: str, message: Dict[str, Any], state: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        seq = self._seq.get(session_id, 0) + 1
+        self._seq[session_id] = seq
+        event = {**message, "seq": seq, "ts": time.time()}
+        if state is not None:
+            event["patch"] = diff(self._states.get(session_id, {}), state)
+            self._states[session_id] = state
+        log = self._logs.get(session_id)
+        if log is None:
+            log = self._logs[session_id] = deque(maxlen=self.max_events)
+            while len(self._logs) > self.max_sessions:
+                oldest, _ = self._logs.popitem(last=False)
+                self._seq.pop(oldest, None)
+                self._states.pop(oldest, None)
+        else:
+            self._logs.move_to_end(session_id)
+        log.append(event)
+        return event
+
+    def _previous_state(self, session_id: str, seq: int, stored_state: Optional[bytes]) -> Dict[str, Any]:
+        """State as of `seq`: this worker's copy if it wrote that seq, else the shared head's"""
+        written = self._written.get(session_id)
+        if written is not None and written[0] == seq:
+            return written[1]
+        return loads(stored_state) if stored_state else {}
+
+    def _wrote(self, session_id: str, seq: int, state: Optional[Dict[str, Any]]) -> None:
+        if state is None:
+            written = self._written.get(session_id)
+            if written is None or written[0] != seq - 1:
+                return
+            state = written[1]
+        self._written[session_id] = (seq, state)
+        self._written.move_to_end(session_id)
+        while len(self._written) > self.max_sessions:
+            self._written.popitem(last=False)
+
+    def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """State as of last_seq(session_id), if one was recorded"""
+        return self._states.get(session_id)
+
+    def base_state(self, session_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """The recorded state, or `state` recorded as the base for the next patch"""
+        return self._states.setdefault(session_id, state)
+
+    async def wait(self, session_id: str, after_seq: int, timeout: float) -> bool:
+        """Until the session has an event after `after_seq`; False on timeout"""
+        if self.last_seq(session_id) > after_seq:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(session_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters.get(session_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[session_id]
+
+    def last_seq(self, session_id: str) -> int:
+        return self._seq.get(session_id, 0)
+
+    def since(self, session_id: str, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Events after `last_seq`, or None if they can't all be replayed"""
+        current = self.last_seq(session_id)
+        if last_seq == current:
+            return []
+        log = self._logs.get(session_id)
+        missed = current - last_seq
+        if not log or last_seq > current or missed > self.replay_max or log[0]["seq"] > last_seq + 1:
+            self.stats["snapshots"] += 1
+            return None
+        events = list(log)[-missed:]
+        self.stats["replayed"] += len(events)
+        return events
+
+    def forget(self, session_id: str) -> None:
+        self._logs.pop(session_id, None)
+        self._seq.pop(session_id, None)
+        self._states.pop(session_id, None)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "sessions": len(self._logs),
+            "events": sum(len(log) for log in self._logs.values()),
+            "max_events": self.max_events,
+            "replay_max": self.replay_max,
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            **self.stats,
+        }
+
+
+# ============================================================================
+# Shared backends
+# ============================================================================
+
+EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id  TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    origin      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    event       BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_session_events_session_seq ON session_events(session_id, seq);
+CREATE TABLE IF NOT EXISTS session_event_heads (
+    session_id  TEXT PRIMARY KEY,
+    seq         INTEGER NOT NULL,
+    state       BLOB,
+    updated_at  REAL NOT NULL
+);
+"""
+
+
+class SQLiteSessionEvents(SessionEvents):
+    """
+    Log shared by the worker processes on one host. Seqs are assigned in a
+    write transaction, so they stay gapless whichever worker appends; each
+    worker polls for rows it didn't write every `poll_s` and delivers them
+    to its own listeners. Sessions idle for `ttl_s` are swept.
+    """
+
+    backend = "sqlite"
+    shared = True
+
+    def __init__(
+        self,
+        db_path: str = EVENT_DB_PATH,
+        max_events: int = EVENT_LOG_SIZE,
+        replay_max: int = EVENT_REPLAY_MAX,
+        ttl_s: float = SESSION_TTL_S,
+        poll_s: float = EVENT_POLL_S,
+        sweep_interval_s: float = 60,
+        worker_id: str = WORKER_ID,
+    ) -> None:
+        super().__init__(max_events=max_events, replay_max=replay_max)
+        self.worker_id = worker_id
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.poll_s = poll_s
+        self.sweep_interval_s = sweep_interval_s
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(EVENT_SCHEMA)
+        self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM session_events").fetchone()[0]
+        self._last_sweep = 0.0
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    def _record(
+        self, session_id: str, message: Dict[str, Any], state: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                head = self._conn.execute(
+                    "SELECT seq, state FROM session_event_heads WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                seq = (head[0] if head else 0) + 1
+                stored_state = head[1] if head else None
+                event = {**message, "seq": seq, "ts": now}
+                if state is not None:
+                    event["patch"] = diff(self._previous_state(session_id, seq - 1, stored_state), state)
+                    stored_state = dumps(state)
+                self._conn.execute(
+                    "INSERT INTO session_events (session_id, seq, origin, created_at, event) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, seq, self.worker_id, now, dumps(event)),
+                )
+                self._conn.execute(
+                    "INSERT INTO session_event_heads (session_id, seq, state, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET seq = excluded.seq, state = excluded.state, "
+                    "updated_at = excluded.updated_at",
+                    (session_id, seq, stored_state, now),
+                )
+                if seq > self.max_events:
+                    # Rows stay a few poll intervals past the cap, so other workers see bursts larger than it
+                    self._conn.execute(
+                        "DELETE FROM session_events WHERE session_id = ? AND seq <= ? AND created_at < ?",
+                        (session_id, seq - self.max_events, now - max(1.0, 20 * self.poll_s)),
+                    )
+                if now - self._last_sweep > self.sweep_interval_s:
+                    self._sweep(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._wrote(session_id, seq, state)
+        return event
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        cutoff = now - self.ttl_s
+        self._conn.execute(
+            "DELETE FROM session_events WHERE session_id IN "
+            "(SELECT session_id FROM session_event_heads WHERE updated_at < ?)", (cutoff,)
+        )
+        self._conn.execute("DELETE FROM session_event_heads WHERE updated_at < ?", (cutoff,))
+
+    # ------------------------------------------------------------------
+    # Other workers' events
+    # ------------------------------------------------------------------
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().start(loop)
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll, name="session-events-poll", daemon=True)
+            self._poller.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        super().stop()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            try:
+                with self._lock:
+                    rows = self._conn.execute(
+                        "SELECT id, session_id, origin, event FROM session_events WHERE id > ? ORDER BY id",
+                        (self._last_id,),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                print(f"[EVENTS] poll failed: {e}")
+                continue
+            for row_id, session_id, origin, event in rows:
+                self._last_id = row_id
+                if origin != self.worker_id:
+                    self._receive(session_id, loads(event))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _head(self, session_id: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, state FROM session_event_heads WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
+    def last_seq(self, session_id: str) -> int:
+        head = self._head(session_id)
+        return head[0] if head else 0
+
+    def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        head = self._head(session_id)
+        return loads(head[1]) if head and head[1] else None
+
+    def base_state(self, session_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO session_event_heads (session_id, seq, state, updated_at) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state WHERE state IS NULL",
+                (session_id, dumps(state), time.time()),
+            )
+        return self.state(session_id) or state
+
+    def since(self, session_id: str, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        current = self.last_seq(session_id)
+        if last_seq == current:
+            return []
+        if last_seq > current or current - last_seq > self.replay_max:
+            self.stats["snapshots"] += 1
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, event FROM session_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, last_seq),
+            ).fetchall()
+        if not rows or rows[0][0] != last_seq + 1:
+            self.stats["snapshots"] += 1
+            return None
+        self.stats["replayed"] += len(rows)
+        return [loads(event) for _, event in rows]
+
+    def forget(self, session_id: str) -> None:
+        self._written.pop(session_id, None)
+        with self._lock:
+            self._conn.execute("DELETE FROM session_events WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM session_event_heads WHERE session_id = ?", (session_id,))
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions, = self._conn.execute("SELECT COUNT(*) FROM session_event_heads").fetchone()
+            events, = self._conn.execute("SELECT COUNT(*) FROM session_events").fetchone()
+        return {
+            "backend": self.backend,
+            "worker": self.worker_id,
+            "sessions": sessions,
+            "events": events,
+            "max_events": self.max_events,
+            "replay_max": self.replay_max,
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            **self.stats,
+        }
+
+
+class RedisSessionEvents(SessionEvents):
+    """
+    Log in Redis: per session a head hash (seq, state) and a capped list of
+    events, both expiring after `ttl_s` idle. Appends run as a WATCH / MULTI
+    transaction on the head and PUBLISH the event on EVENT_CHANNEL; each
+    worker's listener thread delivers the events of other workers.
+
+    `client` can be any redis-py compatible client (e.g. fakeredis).
+    """
+
+    backend = "redis"
+    shared = True
+
+    def __init__(
+        self,
+        client: Any = None,
+        max_events: int = EVENT_LOG_SIZE,
+        replay_max: int = EVENT_REPLAY_MAX,
+        ttl_s: float = SESSION_TTL_S,
+        prefix: str = "pharmaverse:events:",
+        channel: str = EVENT_CHANNEL,
+        worker_id: str = WORKER_ID,
+    ) -> None:
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("The redis event bus requires the redis package")
+            client = redis.Redis.from_url(REDIS_URL)
+        super().__init__(max_events=max_events, replay_max=replay_max)
+        self.worker_id = worker_id
+        self.client = client
+        self.ttl_s = int(ttl_s)
+        self.prefix = prefix
+        self.channel = channel
+        self._watch_error = watch_error(client)
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+
+    def _head_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:head"
+
+    def _log_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:log"
+
+    def _record(
+        self, session_id: str, message: Dict[str, Any], state: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        head, log = self._head_key(session_id), self._log_key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(head)
+                    seq, stored_state = pipe.hmget(head, "seq", "state")
+                    event = {**message, "seq": int(seq or 0) + 1, "ts": time.time()}
+                    fields: Dict[str, Any] = {"seq": event["seq"]}
+                    if state is not None:
+                        event["patch"] = diff(self._previous_state(session_id, event["seq"] - 1, stored_state), state)
+                        fields["state"] = dumps(state)
+                    encoded = dumps(event)
+                    pipe.multi()
+                    pipe.hset(head, mapping=fields)
+                    pipe.rpush(log, encoded)
+                    pipe.ltrim(log, -self.max_events, -1)
+                    pipe.expire(head, self.ttl_s)
+                    pipe.expire(log, self.ttl_s)
+                    pipe.publish(self.channel, dumps({"origin": self.worker_id, "session_id": session_id}) + b"\n" + encoded)
+                    pipe.execute()
+                    self._wrote(session_id, event["seq"], state)
+                    return event
+                except self._watch_error:
+                    continue
+
+    # ------------------------------------------------------------------
+    # Other workers' events
+    # ------------------------------------------------------------------
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().start(loop)
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="session-events-pubsub", daemon=True)
+            self._listener.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        super().stop()
+
+    def _listen(self) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        try:
+            while not self._stop.is_set():
+                try:
+                    message = pubsub.get_message(timeout=1.0)
+                except Exception as e:
+                    print(f"[EVENTS] pub/sub error: {e}")
+                    self._stop.wait(1.0)
+                    continue
+                if not message or message.get("type") != "message":
+                    continue
+                envelope, encoded = message["data"].split(b"\n", 1)
+                envelope = loads(envelope)
+                if envelope["origin"] != self.worker_id:
+                    self._receive(envelope["session_id"], loads(encoded))
+        finally:
+            pubsub.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def last_seq(self, session_id: str) -> int:
+        return int(self.client.hget(self._head_key(session_id), "seq") or 0)
+
+    def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        stored = self.client.hget(self._head_key(session_id), "state")
+        return loads(stored) if stored else None
+
+    def base_state(self, session_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        head = self._head_key(session_id)
+        if self.client.hsetnx(head, "state", dumps(state)):
+            self.client.expire(head, self.ttl_s)
+        return self.state(session_id) or state
+
+    def since(self, session_id: str, last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        current = self.last_seq(session_id)
+        if last_seq == current:
+            return []
+        missed = current - last_seq
+        if last_seq > current or missed > self.replay_max:
+            self.stats["snapshots"] += 1
+            return None
+        log = self._log_key(session_id)
+        first = self.client.lindex(log, 0)
+        start = last_seq + 1 - loads(first)["seq"] if first else -1
+        events = [loads(encoded) for encoded in self.client.lrange(log, start, -1)] if start >= 0 else []
+        if not events or events[0]["seq"] != last_seq + 1:
+            self.stats["snapshots"] += 1
+            return None
+        self.stats["replayed"] += len(events)
+        return events
+
+    def forget(self, session_id: str) -> None:
+        self._written.pop(session_id, None)
+        self.client.delete(self._head_key(session_id), self._log_key(session_id))
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "worker": self.worker_id,
+            "max_events": self.max_events,
+            "replay_max": self.replay_max,
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            **self.stats,
+        }
+
+
+def create_session_events(backend: str = EVENT_BUS) -> SessionEvents:
+    """Event log for EVENT_BUS (defaults to SESSION_STORE); falls back to memory when Redis can't be reached"""
+    if backend == "sqlite":
+        return SQLiteSessionEvents()
+    if backend == "redis":
+        try:
+            events = RedisSessionEvents()
+            events.client.ping()
+            return events
+        except Exception as e:
+            print(f"[EVENTS] Redis unavailable ({e}); using the in-process event log")
+    return SessionEvents()
@@ -0,0 +1,190 @@
+# session_retrieval.py
+# Per-session BM25 index over agent summaries and raw results, for grounded follow-up chat
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_MAX_CHUNKS = int(os.getenv("RETRIEVAL_MAX_CHUNKS", "400"))       # per agent
+RETRIEVAL_CACHE_SESSIONS = int(os.getenv("RETRIEVAL_CACHE_SESSIONS", "256"))
+RETRIEVAL_MIN_RELATIVE = float(os.getenv("RETRIEVAL_MIN_RELATIVE", "0.25"))  # drop hits scoring under this x the best
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Chunk sizes: summary sentences per chunk (overlapping by one), characters per raw-data chunk
+SENTENCES_PER_CHUNK = 3
+MAX_CHUNK_CHARS = 600
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me of on or "
+    "our should that the their there these this to was what when where which who why will with "
+    "you your about any tell give show".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens without stopwords; a trailing plural 's' is dropped (patents -> patent)"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+# ============================================================================
+# Chunking
+# ============================================================================
+
+def _summary_chunks(summary: str) -> Iterator[str]:
+    sentences = [s.strip() for s in SENTENCE_RE.split(summary) if s.strip()]
+    step = max(SENTENCES_PER_CHUNK - 1, 1)
+    for start in range(0, max(len(sentences) - 1, 1), step):
+        yield " ".join(sentences[start:start + SENTENCES_PER_CHUNK])
+
+
+def _label(key: str) -> str:
+    return key.replace("_", " ")
+
+
+def _json_chunks(value: Any, path: str) -> Iterator[str]:
+    """One chunk per object: its scalar fields as 'key: value' pairs, nested objects recursed"""
+    if isinstance(value, dict):
+        scalars = [f"{_label(k)}: {v}" for k, v in value.items() if not isinstance(v, (dict, list)) and v not in (None, "")]
+        if scalars:
+            text = f"{path}: " + "; ".join(scalars) if path else "; ".join(scalars)
+            yield text[:MAX_CHUNK_CHARS]
+        for k, v in value.items():
+            if isinstance(v, (dict, list)):
+                yield from _json_chunks(v, f"{path} > {_label(k)}" if path else _label(k))
+    elif isinstance(value, list):
+        if value and all(not isinstance(v, (dict, list)) for v in value):
+            yield f"{path}: {', '.join(str(v) for v in value)}"[:MAX_CHUNK_CHARS]
+            return
+        for item in value:
+            yield from _json_chunks(item, path)
+
+
+def session_chunks(agent_results: Dict[str, Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Retrievable passages from every agent's summary and raw payload"""
+    chunks = []
+    for agent, result in agent_results.items():
+        name = result.get("agent") or agent
+        produced = 0
+        for kind, texts in (
+            ("summary", _summary_chunks(result.get("summary") or "")),
+            ("data", _json_chunks(result.get("raw") or {}, "")),
+        ):
+            for text in texts:
+                if produced >= RETRIEVAL_MAX_CHUNKS:
+                    break
+                chunks.append({"agent": agent, "kind": kind, "text": text, "label": f"{name} {agent} {kind}"})
+                produced += 1
+    return chunks
+
+
+# ============================================================================
+# BM25 index
+# ============================================================================
+
+class RetrievalIndex:
+    """
+    BM25 over a session's chunks. Postings are stored column-wise in NumPy
+    arrays (chunk ids and term frequencies per term, concatenated with
+    offsets), so a query touches only the postings of its own terms.
+    """
+
+    def __init__(self, chunks: List[Dict[str, str]]) -> None:
+        self.chunks = chunks
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for i, chunk in enumerate(chunks):
+            tokens = tokenize(f"{chunk['label']} {chunk['text']}")
+            lengths[i] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[i] = counts.get(i, 0) + 1
+
+        self.terms: Dict[str, int] = {}
+        offsets = [0]
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        for term, counts in postings.items():
+            self.terms[term] = len(offsets) - 1
+            doc_ids.extend(counts.keys())
+            tfs.extend(counts.values())
+            offsets.append(len(doc_ids))
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+
+        n = max(len(chunks), 1)
+        df = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        avg = float(lengths.mean()) if len(chunks) else 1.0
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(avg, 1.0))
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[float, Dict[str, str]]]:
+        """Top `k` chunks by BM25 score, best first (weak matches, see RETRIEVAL_MIN_RELATIVE, are left out)"""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.terms.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            ids, tf = self.doc_ids[start:end], self.tfs[start:end]
+            scores[ids] += self.idf[t] * tf * (BM25_K1 + 1) / (tf + self.length_norm[ids])
+        best = scores.max(initial=0.0)
+        if best <= 0:
+            return []
+        hits = np.flatnonzero(scores >= best * RETRIEVAL_MIN_RELATIVE)
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        return [(float(scores[i]), self.chunks[i]) for i in top]
+
+
+def build_index(agent_results: Dict[str, Dict[str, Any]]) -> RetrievalIndex:
+    return RetrievalIndex(session_chunks(agent_results))
+
+
+class RetrievalCache:
+    """Built indexes for the most recently used sessions"""
+
+    def __init__(self, max_sessions: int = RETRIEVAL_CACHE_SESSIONS) -> None:
+        self.max_sessions = max_sessions
+        self._indexes: "OrderedDict[str, RetrievalIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"builds": 0, "hits": 0}
+
+    def build(self, session_id: str, agent_results: Dict[str, Dict[str, Any]]) -> RetrievalIndex:
+        index = build_index(agent_results)
+        with self._lock:
+            self._indexes[session_id] = index
+            self._indexes.move_to_end(session_id)
+            while len(self._indexes) > self.max_sessions:
+                self._indexes.popitem(last=False)
+            self.stats["builds"] += 1
+        return index
+
+    def get(self, session_id: str) -> Optional[RetrievalIndex]:
+        with self._lock:
+            index = self._indexes.get(session_id)
+            if index is not None:
+                self._indexes.move_to_end(session_id)
+                self.stats["hits"] += 1
+            return index
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._indexes.pop(session_id, None)
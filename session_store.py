@@ -0,0 +1,903 @@
+# session_store.py
+# Analysis sessions behind one interface: in-memory LRU + TTL, SQLite or Redis
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from abc import abstractmethod
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from http_encoding import dumps, loads
+
+# Redis is optional - only import if available
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")          # memory | sqlite | redis
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", str(7 * 86400)))  # idle time before a session expires
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_MAX_MB = int(os.getenv("SESSION_MAX_MB", "256"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "reports/sessions.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_WAIT_POLL_S = float(os.getenv("SESSION_WAIT_POLL_S", "1"))  # shared stores: long-polls re-check the version this often
+SESSION_TOUCH_FLUSH_S = float(os.getenv("SESSION_TOUCH_FLUSH_S", "30"))  # SQLite: reads refresh the TTL / LRU in batches this often
+
+# Field encoding shared by the SQLite and Redis backends: every field has a
+# header entry, and dict / list fields store one entry per key / item, so
+# `set_item` and `append` write only what changed.
+VALUE, MAP, LIST = "v", "m", "l"
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat()
+
+
+def watch_error(client: Any) -> type:
+    """
+    WatchError of the library `client` comes from: redis-py's, or that of a
+    compatible client (fakeredis) when the redis package isn't installed
+    """
+    for cls in type(client).__mro__:
+        error = getattr(sys.modules.get(cls.__module__), "WatchError", None)
+        if isinstance(error, type) and issubclass(error, Exception):
+            return error
+    raise RuntimeError(f"{type(client).__name__} has no WatchError; WATCH / MULTI transactions need one")
+
+
+def _encode_field(value: Any) -> Tuple[str, List[Tuple[str, bytes]]]:
+    """(kind, [(item, encoded)]) - the header is item ''"""
+    if isinstance(value, dict):
+        return MAP, [("", b"")] + [(f"k:{key}", dumps(item)) for key, item in value.items()]
+    if isinstance(value, list):
+        return LIST, [("", b"")] + [(f"i:{index:08d}", dumps(item)) for index, item in enumerate(value)]
+    return VALUE, [("", dumps(value))]
+
+
+def _decode_fields(rows: Iterable[Tuple[str, str, str, bytes]]) -> Dict[str, Any]:
+    """Rebuild a session from (field, item, kind, encoded) rows, headers before items"""
+    session: Dict[str, Any] = {}
+    for field, item, kind, encoded in rows:
+        if item == "":
+            session[field] = loads(encoded) if kind == VALUE else ({} if kind == MAP else [])
+        elif item.startswith("k:"):
+            session.setdefault(field, {})[item[2:]] = loads(encoded)
+        else:
+            session.setdefault(field, []).append(loads(encoded))
+    return session
+
+
+def _shallow_copy(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Own the top-level dict and its dict / list fields, but not the payloads inside them"""
+    return {
+        key: dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+        for key, value in data.items()
+    }
+
+
+class SessionStore(Mapping):
+    """
+    Abstract base of the backends (Mapping is already an ABC).
+    Sessions are dicts of fields. Reads return a new top-level dict (treat
+    nested values as read-only); writes are field-level:
+
+      update(id, **fields)            replace whole fields
+      set_item(id, field, key, value) one entry of a dict field (agent_results[agent])
+      append(id, field, item)         one item of a list field (chat_history)
+
+    so a write costs the size of what changed, not the whole session. Every
+    write stamps `updated_at` and bumps `version` (1 on create), then calls
+    the `watch` callbacks with the session id; writes to an unknown session
+    raise KeyError. Sessions idle for longer than `ttl_s` expire.
+
+    `keys` given to `create` (e.g. {"molecule": canonical id}) are secondary
+    index entries: `find(name, value)` lists the matching live sessions,
+    newest first, without scanning the store.
+
+    Also a read-only Mapping (`in`, `[]`, `.get`, `.items()`), so code that
+    used the old `sessions` dict for lookups keeps working.
+    """
+
+    backend = "base"
+    shared = False   # visible to other processes (their writes don't reach `watch`)
+
+    def __init__(self) -> None:
+        self._watchers: List[Callable[[str], None]] = []
+
+    def watch(self, callback: Callable[[str], None]) -> None:
+        """Call `callback(session_id)` after every write (from the writing thread)"""
+        self._watchers.append(callback)
+
+    def _changed(self, session_id: str) -> None:
+        for callback in self._watchers:
+            callback(session_id)
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Current version, or None for an unknown session"""
+        session = self.get(session_id, fields=("version",))
+        return session.get("version") if session is not None else None
+
+    @abstractmethod
+    def create(self, session_id: str, data: Dict[str, Any], keys: Optional[Dict[str, str]] = None) -> None:
+        """Store a new session (replacing one with the same id), with secondary `keys`"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find(self, name: str, value: str, limit: Optional[int] = None) -> List[str]:
+        """Live sessions whose `name` key equals `value`, newest first"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, session_id: str, default: Any = None, fields: Optional[Sequence[str]] = None) -> Any:
+        """The session (only `fields`, if given), or `default` if it is missing or expired"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, session_id: str, **fields: Any) -> None:
+        """Replace whole fields"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_item(self, session_id: str, field: str, key: str, value: Any) -> None:
+        """Set one entry of a dict field"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def append(self, session_id: str, field: str, item: Any) -> None:
+        """Append one item to a list field"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Drop a session (no error if it is missing)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ids(self) -> List[str]:
+        """Live session ids, least recently used first"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Backend, session count and size, bounds and eviction counters"""
+        raise NotImplementedError
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __contains__(self, session_id: object) -> bool:
+        return isinstance(session_id, str) and self.get(session_id, fields=("updated_at",)) is not None
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def __len__(self) -> int:
+        return len(self.ids())
+
+
+# ============================================================================
+# In-memory: LRU + idle TTL, bounded by entry count and serialized size
+# ============================================================================
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local. Size is tracked per field as its serialized length (so
+    only the written field is re-measured). Past `max_entries` / `max_bytes`
+    the least recently used sessions are dropped. Dict / list fields are
+    replaced copy-on-write, so readers iterating an old value are unaffected.
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        ttl_s: float = SESSION_TTL_S,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_MB * 1024 * 1024,
+    ) -> None:
+        super().__init__()
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, Dict[str, int]] = {}   # session -> field -> bytes
+        self._touched: Dict[str, float] = {}
+        self._keys: Dict[Tuple[str, str], "OrderedDict[str, None]"] = {}   # (name, value) -> ids, oldest first
+        self._session_keys: Dict[str, List[Tuple[str, str]]] = {}
+        self._bytes = 0
+        self._stats = {"evictions": 0, "expired": 0}
+
+    def _remove(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._touched.pop(session_id, None)
+        self._bytes -= sum(self._sizes.pop(session_id, {}).values())
+        for key in self._session_keys.pop(session_id, []):
+            ids = self._keys.get(key)
+            if ids is not None:
+                ids.pop(session_id, None)
+                if not ids:
+                    del self._keys[key]
+
+    def _sweep(self, now: float) -> None:
+        # LRU order is last-touch order, so expired sessions sit at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._touched[oldest] <= self.ttl_s:
+                break
+            self._remove(oldest)
+            self._stats["expired"] += 1
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._sessions)))
+            self._stats["evictions"] += 1
+
+    def _live(self, session_id: str, now: float) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if now - self._touched[session_id] > self.ttl_s:
+            self._remove(session_id)
+            self._stats["expired"] += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        self._touched[session_id] = now
+        return session
+
+    def _set_size(self, session_id: str, field: str, size: int) -> None:
+        sizes = self._sizes[session_id]
+        self._bytes += size - sizes.get(field, 0)
+        sizes[field] = size
+
+    def _writable(self, session_id: str) -> Dict[str, Any]:
+        now = time.time()
+        session = self._live(session_id, now)
+        if session is None:
+            raise KeyError(session_id)
+        session["updated_at"] = _now_iso()
+        session["version"] = session.get("version", 0) + 1
+        return session
+
+    def create(self, session_id: str, data: Dict[str, Any], keys: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            session = _shallow_copy({**data, "updated_at": _now_iso(), "version": 1})
+            sizes = {field: len(dumps(value)) for field, value in session.items()}   # may raise: nothing written yet
+            self._remove(session_id)
+            self._sessions[session_id] = session
+            self._touched[session_id] = time.time()
+            self._sizes[session_id] = {}
+            for field, size in sizes.items():
+                self._set_size(session_id, field, size)
+            self._session_keys[session_id] = [(name, value) for name, value in (keys or {}).items() if value]
+            for key in self._session_keys[session_id]:
+                self._keys.setdefault(key, OrderedDict())[session_id] = None
+            self._sweep(time.time())
+        self._changed(session_id)
+
+    def find(self, name: str, value: str, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            self._sweep(time.time())
+            found = list(reversed(self._keys.get((name, value), ())))
+        return found[:limit] if limit is not None else found
+
+    def get(self, session_id: str, default: Any = None, fields: Optional[Sequence[str]] = None) -> Any:
+        with self._lock:
+            session = self._live(session_id, time.time())
+            if session is None:
+                return default
+            if fields is not None:
+                return {field: session[field] for field in fields if field in session}
+            return dict(session)
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        with self._lock:
+            fields = _shallow_copy(fields)
+            sizes = {field: len(dumps(value)) for field, value in fields.items()}
+            session = self._writable(session_id)
+            for field, value in fields.items():
+                session[field] = value
+                self._set_size(session_id, field, sizes[field])
+            self._sweep(time.time())
+        self._changed(session_id)
+
+    def set_item(self, session_id: str, field: str, key: str, value: Any) -> None:
+        with self._lock:
+            added = len(dumps(value))
+            session = self._writable(session_id)
+            current = session.get(field) if isinstance(session.get(field), dict) else {}
+            size = self._sizes[session_id].get(field, 2) + added
+            if key in current:
+                size -= len(dumps(current[key]))
+            session[field] = {**current, key: value}
+            self._set_size(session_id, field, size)
+            self._sweep(time.time())
+        self._changed(session_id)
+
+    def append(self, session_id: str, field: str, item: Any) -> None:
+        with self._lock:
+            added = len(dumps(item))
+            session = self._writable(session_id)
+            current = session.get(field) if isinstance(session.get(field), list) else []
+            session[field] = [*current, item]
+            self._set_size(session_id, field, self._sizes[session_id].get(field, 2) + added)
+            self._sweep(time.time())
+        self._changed(session_id)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._remove(session_id)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            self._sweep(time.time())
+            return list(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep(time.time())
+            return {
+                "backend": self.backend,
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                **self._stats,
+            }
+
+
+# ============================================================================
+# SQLite: durable, one row per field / map entry / list item
+# ============================================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    touched_at REAL NOT NULL,
+    bytes      INTEGER NOT NULL DEFAULT 0,
+    version    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_touched ON sessions (touched_at);
+CREATE TABLE IF NOT EXISTS session_fields (
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    field      TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    PRIMARY KEY (session_id, field, item)
+);
+CREATE TABLE IF NOT EXISTS session_keys (
+    name       TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (name, value, session_id)
+);
+CREATE INDEX IF NOT EXISTS idx_session_keys_lookup ON session_keys (name, value, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_session_keys_session ON session_keys (session_id);
+"""
+
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = {
+    "version": "ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions survive restarts and can be shared by processes on one host.
+    Expiry and the `max_entries` / `max_bytes` bounds are applied at most
+    every `sweep_interval_s`, oldest-touched first.
+
+    Reads don't write: the time of each read is kept in memory and written
+    to `touched_at` with the next write, or after `touch_flush_s`, so
+    polling readers don't queue behind writers for the database lock.
+    """
+
+    backend = "sqlite"
+    shared = True
+
+    def __init__(
+        self,
+        db_path: str = SESSION_DB_PATH,
+        ttl_s: float = SESSION_TTL_S,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_MB * 1024 * 1024,
+        sweep_interval_s: float = 30,
+        touch_flush_s: float = SESSION_TOUCH_FLUSH_S,
+    ) -> None:
+        super().__init__()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval_s = sweep_interval_s
+        # Past half the TTL a pending read could let the session expire
+        self.touch_flush_s = min(touch_flush_s, ttl_s / 2)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in existing:
+                self._conn.execute(statement)
+        self._last_sweep = 0.0
+        self._touches: Dict[str, float] = {}   # session -> last read, not yet in touched_at
+        self._last_flush = time.time()
+        self._stats = {"evictions": 0, "expired": 0}
+
+    def _flush_touches(self) -> None:
+        """Under the lock: write the read times collected since the last flush"""
+        touches, self._touches = self._touches, {}
+        self._last_flush = time.time()
+        if touches:
+            self._conn.executemany(
+                "UPDATE sessions SET touched_at = MAX(touched_at, ?) WHERE session_id = ?",
+                [(touched, session_id) for session_id, touched in touches.items()],
+            )
+
+    def _live(self, touched_at: float, session_id: str, now: float) -> bool:
+        return now - max(touched_at, self._touches.get(session_id, 0.0)) <= self.ttl_s
+
+    def _write_field(self, session_id: str, field: str, value: Any) -> None:
+        kind, entries = _encode_field(value)
+        self._conn.execute("DELETE FROM session_fields WHERE session_id = ? AND field = ?", (session_id, field))
+        self._conn.executemany(
+            "INSERT INTO session_fields (session_id, field, item, kind, value) VALUES (?, ?, ?, ?, ?)",
+            [(session_id, field, item, kind, encoded) for item, encoded in entries],
+        )
+
+    def _ensure_container(self, session_id: str, field: str, kind: str) -> None:
+        row = self._conn.execute(
+            "SELECT kind FROM session_fields WHERE session_id = ? AND field = ? AND item = ''", (session_id, field)
+        ).fetchone()
+        if row is None or row[0] != kind:
+            self._write_field(session_id, field, {} if kind == MAP else [])
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """BEGIN IMMEDIATE .. COMMIT, rolled back if the body raises (the connection is shared)"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _begin_write(self, session_id: str) -> None:
+        """Inside a transaction: raises KeyError if the session is missing or expired"""
+        row = self._conn.execute("SELECT touched_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or not self._live(row[0], session_id, time.time()):
+            raise KeyError(session_id)
+        self._write_field(session_id, "updated_at", _now_iso())
+
+    def _finish_write(self, session_id: str) -> None:
+        """Inside a transaction: touch the session, bump its version and re-measure it"""
+        self._conn.execute(
+            "UPDATE sessions SET touched_at = ?, version = version + 1, "
+            "bytes = (SELECT COALESCE(SUM(LENGTH(value)), 0) FROM session_fields WHERE session_id = ?) "
+            "WHERE session_id = ?",
+            (time.time(), session_id, session_id),
+        )
+
+    def _committed(self, session_id: str) -> None:
+        self._flush_touches()   # before the sweep, which evicts by touched_at
+        self._maybe_sweep()
+        self._changed(session_id)
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval_s:
+            return
+        self._last_sweep = now
+        expired = self._conn.execute("DELETE FROM sessions WHERE touched_at < ?", (now - self.ttl_s,)).rowcount
+        self._stats["expired"] += max(expired, 0)
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM sessions").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for session_id, size in self._conn.execute(
+            "SELECT session_id, bytes FROM sessions ORDER BY touched_at ASC"
+        ).fetchall():
+            if count <= max(self.max_entries, 1) and total <= self.max_bytes or count <= 1:
+                break
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            count, total = count - 1, total - size
+            self._stats["evictions"] += 1
+
+    def create(self, session_id: str, data: Dict[str, Any], keys: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            now = time.time()
+            with self._transaction():
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.execute("INSERT INTO sessions (session_id, touched_at) VALUES (?, ?)", (session_id, now))
+                for field, value in {**data, "updated_at": _now_iso()}.items():
+                    self._write_field(session_id, field, value)
+                self._conn.executemany(
+                    "INSERT INTO session_keys (name, value, session_id, created_at) VALUES (?, ?, ?, ?)",
+                    [(name, value, session_id, now) for name, value in (keys or {}).items() if value],
+                )
+                self._finish_write(session_id)
+            self._committed(session_id)
+
+    def find(self, name: str, value: str, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT k.session_id FROM session_keys k JOIN sessions s ON s.session_id = k.session_id "
+                "WHERE k.name = ? AND k.value = ? AND s.touched_at >= ? ORDER BY k.created_at DESC LIMIT ?",
+                (name, value, time.time() - self.ttl_s, -1 if limit is None else limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, session_id: str, default: Any = None, fields: Optional[Sequence[str]] = None) -> Any:
+        with self._lock:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT version, touched_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or not self._live(row[1], session_id, now):
+                return default
+            version = row[0]
+            self._touches[session_id] = now
+            if now - self._last_flush >= self.touch_flush_s:
+                self._flush_touches()
+            query = "SELECT field, item, kind, value FROM session_fields WHERE session_id = ?"
+            params: List[Any] = [session_id]
+            if fields is not None:
+                query += f" AND field IN ({', '.join('?' for _ in fields)})"
+                params.extend(fields)
+            rows = self._conn.execute(query + " ORDER BY field, item = '' DESC, rowid", params).fetchall()
+        session = _decode_fields(rows)
+        if fields is None or "version" in fields:
+            session["version"] = version
+        return session
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        with self._lock:
+            with self._transaction():
+                self._begin_write(session_id)
+                for field, value in fields.items():
+                    self._write_field(session_id, field, value)
+                self._finish_write(session_id)
+            self._committed(session_id)
+
+    def set_item(self, session_id: str, field: str, key: str, value: Any) -> None:
+        with self._lock:
+            with self._transaction():
+                self._begin_write(session_id)
+                self._ensure_container(session_id, field, MAP)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO session_fields (session_id, field, item, kind, value) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, field, f"k:{key}", MAP, dumps(value)),
+                )
+                self._finish_write(session_id)
+            self._committed(session_id)
+
+    def append(self, session_id: str, field: str, item: Any) -> None:
+        with self._lock:
+            with self._transaction():
+                self._begin_write(session_id)
+                self._ensure_container(session_id, field, LIST)
+                (count,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM session_fields WHERE session_id = ? AND field = ? AND item != ''",
+                    (session_id, field),
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT INTO session_fields (session_id, field, item, kind, value) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, field, f"i:{count:08d}", LIST, dumps(item)),
+                )
+                self._finish_write(session_id)
+            self._committed(session_id)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._touches.pop(session_id, None)
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE touched_at >= ? ORDER BY touched_at", (time.time() - self.ttl_s,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM sessions WHERE touched_at >= ?",
+                (time.time() - self.ttl_s,),
+            ).fetchone()
+        return {
+            "backend": self.backend,
+            "sessions": count,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            **self._stats,
+        }
+
+
+# ============================================================================
+# Redis: shared by every worker; one hash per session, TTL via EXPIRE
+# ============================================================================
+
+# Plain integer hash field (HINCRBY), outside the `<item>|<field>` encoding
+VERSION_FIELD = "#version"
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Hash fields are `<item>|<field>` with the same encoding as SQLite, the
+    kind stored as the value's first byte. Each read or write refreshes the
+    key's TTL. Memory bounds are left to the server's maxmemory policy, so
+    `max_entries` / `max_bytes` don't apply here.
+
+    `client` can be any redis-py compatible client (e.g. fakeredis for a
+    local stand-in).
+    """
+
+    backend = "redis"
+    shared = True
+
+    def __init__(self, client: Any = None, ttl_s: float = SESSION_TTL_S, prefix: str = "pharmaverse:session:") -> None:
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("The redis session store requires the redis package")
+            client = redis.Redis.from_url(REDIS_URL)
+        super().__init__()
+        self.client = client
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+        self._watch_error = watch_error(client)
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _index_key(self, name: str, value: str) -> str:
+        # Outside `prefix*`, so ids() / stats() don't pick up index entries
+        return f"{self.prefix.rstrip(':')}-index:{name}:{value}"
+
+    @staticmethod
+    def _hash_entries(field: str, value: Any) -> Dict[str, bytes]:
+        kind, entries = _encode_field(value)
+        return {f"{item}|{field}": kind.encode() + encoded for item, encoded in entries}
+
+    @staticmethod
+    def _field_names(reader: Any, key: str, field: str) -> List[bytes]:
+        return [name for name in reader.hkeys(key) if name.decode().rsplit("|", 1)[-1] == field and b"|" in name]
+
+    def _write(
+        self,
+        session_id: str,
+        plan: Callable[[Any, str], Tuple[List[bytes], Dict[str, bytes]]],
+        create_keys: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        One write as a WATCH / MULTI transaction on the session's hash,
+        retried when another worker wrote it in between (so e.g. two appends
+        never take the same index). `plan(pipe, key)` reads what it needs
+        through the watching pipe and returns (names to delete, entries to
+        set). With `create_keys` the hash is replaced and indexed instead of
+        required to exist.
+        """
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    if create_keys is None and not pipe.exists(key):
+                        raise KeyError(session_id)
+                    removed, entries = plan(pipe, key)
+                    entries = {**entries, **self._hash_entries("updated_at", _now_iso())}
+                    pipe.multi()
+                    if create_keys is not None:
+                        pipe.delete(key)
+                    removed = [name for name in removed if name.decode() not in entries]
+                    if removed:
+                        pipe.hdel(key, *removed)
+                    pipe.hset(key, mapping=entries)
+                    pipe.hincrby(key, VERSION_FIELD, 1)
+                    pipe.expire(key, int(self.ttl_s))
+                    for name, value in (create_keys or {}).items():
+                        if value:
+                            pipe.zadd(self._index_key(name, value), {session_id: time.time()})
+                            pipe.expire(self._index_key(name, value), int(self.ttl_s))
+                    pipe.execute()
+                    break
+                except self._watch_error:
+                    continue
+        self._changed(session_id)
+
+    def _container_entries(self, reader: Any, key: str, field: str, kind: str) -> Tuple[List[bytes], Dict[str, bytes]]:
+        header = reader.hget(key, f"|{field}")
+        if header is not None and header[:1] == kind.encode():
+            return [], {}
+        return self._field_names(reader, key, field), self._hash_entries(field, {} if kind == MAP else [])
+
+    def create(self, session_id: str, data: Dict[str, Any], keys: Optional[Dict[str, str]] = None) -> None:
+        entries: Dict[str, bytes] = {}
+        for field, value in data.items():
+            entries.update(self._hash_entries(field, value))
+        self._write(session_id, lambda pipe, key: ([], entries), create_keys=keys or {})
+
+    def find(self, name: str, value: str, limit: Optional[int] = None) -> List[str]:
+        """Expired sessions are pruned from the index as they are found"""
+        index = self._index_key(name, value)
+        ids = [member.decode() for member in self.client.zrevrange(index, 0, -1)]
+        pipe = self.client.pipeline()
+        for session_id in ids:
+            pipe.exists(self._key(session_id))
+        live = [session_id for session_id, exists in zip(ids, pipe.execute()) if exists]
+        gone = set(ids) - set(live)
+        if gone:
+            self.client.zrem(index, *gone)
+        return live[:limit] if limit is not None else live
+
+    def version(self, session_id: str) -> Optional[int]:
+        version = self.client.hget(self._key(session_id), VERSION_FIELD)
+        return int(version) if version is not None else None
+
+    def _read_fields(self, key: str, fields: Sequence[str]) -> Optional[Dict[bytes, bytes]]:
+        """The hash entries of `fields` (plus the version): headers by HMGET, dict / list items by HSCAN"""
+        names = [VERSION_FIELD] + [f"|{field}" for field in fields]
+        values = self.client.hmget(key, names)
+        if values[0] is None:
+            return None
+        raw = {name.encode(): value for name, value in zip(names, values) if value is not None}
+        for field in fields:
+            header = raw.get(f"|{field}".encode())
+            if header is not None and header[:1] != VALUE.encode():
+                pattern = "*|" + "".join("\\" + ch if ch in "*?[]\\" else ch for ch in field)
+                raw.update(self.client.hscan_iter(key, match=pattern))
+        return raw
+
+    def get(self, session_id: str, default: Any = None, fields: Optional[Sequence[str]] = None) -> Any:
+        key = self._key(session_id)
+        raw = self.client.hgetall(key) if fields is None else self._read_fields(key, fields)
+        if not raw:
+            return default
+        self.client.expire(key, int(self.ttl_s))
+        rows = []
+        version = int(raw.pop(VERSION_FIELD.encode(), 0))
+        for name, value in raw.items():
+            item, field = name.decode().rsplit("|", 1)
+            if fields is None or field in fields:
+                rows.append((field, item, value[:1].decode(), value[1:]))
+        rows.sort(key=lambda row: (row[0], row[1] != "", row[1]))
+        session = _decode_fields(rows)
+        if fields is None or "version" in fields:
+            session["version"] = version
+        return session
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        entries: Dict[str, bytes] = {}
+        for field, value in fields.items():
+            entries.update(self._hash_entries(field, value))
+
+        def plan(pipe: Any, key: str) -> Tuple[List[bytes], Dict[str, bytes]]:
+            return [name for field in fields for name in self._field_names(pipe, key, field)], entries
+
+        self._write(session_id, plan)
+
+    def set_item(self, session_id: str, field: str, key: str, value: Any) -> None:
+        encoded = MAP.encode() + dumps(value)
+
+        def plan(pipe: Any, name: str) -> Tuple[List[bytes], Dict[str, bytes]]:
+            removed, entries = self._container_entries(pipe, name, field, MAP)
+            entries[f"k:{key}|{field}"] = encoded
+            return removed, entries
+
+        self._write(session_id, plan)
+
+    def append(self, session_id: str, field: str, item: Any) -> None:
+        encoded = LIST.encode() + dumps(item)
+
+        def plan(pipe: Any, key: str) -> Tuple[List[bytes], Dict[str, bytes]]:
+            removed, entries = self._container_entries(pipe, key, field, LIST)
+            count = 0 if entries else len(self._field_names(pipe, key, field)) - 1
+            entries[f"i:{count:08d}|{field}"] = encoded
+            return removed, entries
+
+        self._write(session_id, plan)
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+    def ids(self) -> List[str]:
+        return [name.decode()[len(self.prefix):] for name in self.client.scan_iter(match=f"{self.prefix}*")]
+
+    def stats(self) -> Dict[str, Any]:
+        count, total = 0, 0
+        for name in self.client.scan_iter(match=f"{self.prefix}*"):
+            count += 1
+            total += sum(len(value) for value in self.client.hvals(name))
+        return {"backend": self.backend, "sessions": count, "bytes": total, "ttl_s": self.ttl_s}
+
+
+class SessionWaiters:
+    """
+    Parks coroutines until a session is written (long-polling). Wake-ups
+    come through `SessionStore.watch`, so writes from any thread count;
+    `notify` is for changes reported another way (another worker's events).
+    With a shared store, waiters also re-check the version every `poll_s`,
+    which catches other processes' writes that nobody announced.
+    """
+
+    def __init__(self, store: SessionStore, poll_s: Optional[float] = None) -> None:
+        self.store = store
+        self.poll_s = poll_s if poll_s is not None else (SESSION_WAIT_POLL_S if store.shared else None)
+        self._futures: Dict[str, List[asyncio.Future]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        store.watch(self.notify)
+
+    def notify(self, session_id: str) -> None:
+        """Wake the waiters of `session_id` to re-check its version (any thread)"""
+        if self._loop is not None and session_id in self._futures:
+            self._loop.call_soon_threadsafe(self._wake, session_id)
+
+    def _wake(self, session_id: str) -> None:
+        for future in self._futures.pop(session_id, []):
+            if not future.done():
+                future.set_result(None)
+
+    async def wait_for_change(self, session_id: str, version: Optional[int], timeout: float) -> Optional[int]:
+        """The session's version once it differs from `version`, or the same version on timeout"""
+        self._loop = asyncio.get_running_loop()
+        deadline = self._loop.time() + timeout
+        while True:
+            future = self._loop.create_future()
+            self._futures.setdefault(session_id, []).append(future)
+            # Check after registering, so a write in between isn't missed
+            if self.store.shared:
+                current = await asyncio.to_thread(self.store.version, session_id)
+            else:
+                current = self.store.version(session_id)
+            remaining = deadline - self._loop.time()
+            if current != version or remaining <= 0:
+                self._discard(session_id, future)
+                return current
+            try:
+                await asyncio.wait_for(future, min(remaining, self.poll_s) if self.poll_s else remaining)
+            except asyncio.TimeoutError:
+                self._discard(session_id, future)
+
+    def _discard(self, session_id: str, future: asyncio.Future) -> None:
+        futures = self._futures.get(session_id)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self._futures[session_id]
+
+    def waiting(self) -> int:
+        return sum(len(futures) for futures in self._futures.values())
+
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    """Store for SESSION_STORE; falls back to memory when Redis can't be reached"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        try:
+            store = RedisSessionStore()
+            store.client.ping()
+            return store
+        except Exception as e:
+            print(f"[SESSIONS] Redis unavailable ({e}); using the in-memory store")
+    return MemorySessionStore()
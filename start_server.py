@@ -1,12 +1,14 @@
 # start_server.py
 # Unified server that combines mock_api and api_integration
+import asyncio
+import os
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import both apps
-from mock_api import app as mock_app ,report_storage as mock_report_storage
-from api_integration import app as integration_app, sessions, active_websockets
+from mock_api import app as mock_app ,report_storage as mock_report_storage, WARMUP_ON_STARTUP
+from api_integration import app as integration_app, sessions, ws_fanout
 
 # Create main app - use mock_app as base since it has all the agent endpoints
 main_app = mock_app
@@ -20,51 +22,38 @@ import api_integration
 
 # Add integration routes to main app
 main_app.post("/api/orchestrate")(api_integration.orchestrate)
+main_app.get("/api/jobs/stats")(api_integration.orchestration_job_stats)
+main_app.get("/api/jobs")(api_integration.list_orchestration_jobs)
+main_app.get("/api/jobs/{job_id}")(api_integration.get_orchestration_job)
+main_app.post("/api/jobs/{job_id}/cancel")(api_integration.cancel_orchestration_job)
+main_app.get("/api/admission/stats")(api_integration.admission_stats)
+
+# Heavy libraries load on first use; WARMUP_ON_STARTUP=1 loads them in the background at boot
+@main_app.on_event("startup")
+async def warmup_agents() -> None:
+    if WARMUP_ON_STARTUP:
+        main_app.state.agent_warmup_task = asyncio.create_task(asyncio.to_thread(api_integration.warmup))
+
+# Other workers' session events (shared EVENT_BUS) are delivered on this worker's loop
+main_app.on_event("startup")(api_integration.start_shared_state)
+main_app.on_event("shutdown")(api_integration.stop_shared_state)
+
+# WebSocket route (per-connection send queues, see ws_fanout.py)
+main_app.websocket("/ws/{session_id}")(api_integration.websocket_endpoint)
 
-# WebSocket route - use the decorator syntax which is the correct way
-@main_app.websocket("/ws/{session_id}")
-async def websocket_handler(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time updates"""
-    await websocket.accept()
-    
-    # Add to active connections
-    if session_id not in active_websockets:
-        active_websockets[session_id] = []
-    active_websockets[session_id].append(websocket)
-    
-    try:
-        # Send initial session data if available
-        if session_id in sessions:
-            session = sessions[session_id]
-            await websocket.send_json({
-                "type": "session_data",
-                "data": session
-            })
-        
-        # Keep connection alive
-        while True:
-            try:
-                data = await websocket.receive_text()
-                # Echo or process any incoming messages
-                await websocket.send_json({"type": "pong", "message": "Connection active"})
-            except WebSocketDisconnect:
-                break
-                
-    except Exception as e:
-        print(f"WebSocket error: {e}")
-    finally:
-        # Remove from active connections
-        if session_id in active_websockets:
-            if websocket in active_websockets[session_id]:
-                active_websockets[session_id].remove(websocket)
 main_app.post("/api/chat")(api_integration.chat)
 main_app.get("/api/session/{session_id}")(api_integration.get_session_data)
 main_app.get("/api/session/{session_id}/status")(api_integration.get_session_status)
+main_app.get("/api/session/{session_id}/events")(api_integration.session_event_stream)
+main_app.get("/api/sessions/stats")(api_integration.session_store_stats)
+main_app.get("/api/ws/stats")(api_integration.websocket_stats)
 main_app.get("/api/dossier/{session_id}")(api_integration.get_dossier)
 # main_app.post("/api/generate-report")(api_integration.generate_report_int
 main_app.get("/api/reports")(api_integration.list_reports)
 main_app.get("/api/reports/{report_id}")(api_integration.get_report)
-main_app.get("/downloads/reports/{report_id}.pdf")(api_integration.download_pdf_report_integration)
+main_app.get("/api/export")(api_integration.export_results)
+main_app.post("/api/portfolio-report", status_code=202)(api_integration.create_portfolio_report)
+# GET /downloads/reports/{report_id}.pdf is already served by mock_app (stored file, ETag/Range)
 
 if __name__ == "__main__":
     print("="*70)
@@ -72,14 +61,27 @@ if __name__ == "__main__":
     print("="*70)
     print("Mock API endpoints: /api/iqvia, /api/exim, /api/patents, etc.")
     print("Integration endpoints:")
-    print("  POST /api/orchestrate - Launch agent orchestration")
+    print("  POST /api/orchestrate - Queue an agent orchestration")
+    print("  GET /api/jobs/{job_id} - Orchestration job status (queue position, attempts)")
+    print("  GET /api/jobs/stats - Orchestration queue depth")
+    print("  GET /api/admission/stats - Orchestrations accepted / queued / rejected (429/503)")
     print("  WS /ws/{session_id} - WebSocket for real-time updates")
+    print("  GET /api/ws/stats - WebSocket queue depth and lag")
     print("  POST /api/chat - Chat with master agent")
     print("  GET /api/session/{session_id} - Get session data")
+    print("  GET /api/session/{session_id}/events - Progress stream (SSE, JSON Patch deltas)")
+    print("  GET /api/sessions/stats - Session store size and evictions")
     print("  GET /api/dossier/{session_id} - Get molecule dossier")
     print("  GET /api/reports - List all reports")
+    print("  GET /api/export?format={csv|parquet|xlsx}&table=... - Export results as tables")
+    print("  POST /api/portfolio-report - One ranked PDF for many candidates")
     print("  GET /downloads/reports/{report_id}.pdf - Download PDF")
     print("="*70)
-    # Use import string to enable reload
-    uvicorn.run("start_server:main_app", host="0.0.0.0", port=8000, reload=True)
+    # SERVER_WORKERS > 1 needs state every worker can see: SESSION_STORE=sqlite|redis
+    # (the event bus follows it, see session_events.py)
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+    if workers > 1 and not (sessions.shared and api_integration.session_events.shared):
+        print("WARNING: sessions / events are per-process; set SESSION_STORE=sqlite or redis for SERVER_WORKERS > 1")
+    # Use import string to enable reload (single process only)
+    uvicorn.run("start_server:main_app", host="0.0.0.0", port=8000, reload=workers == 1, workers=workers)
 
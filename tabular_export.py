@@ -0,0 +1,328 @@
+# tabular_export.py
+# Flattens agent results into typed tables and streams them out as CSV, Parquet or XLSX
+import csv
+import importlib.util
+import io
+import tempfile
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.responses import StreamingResponse
+
+# pyarrow and openpyxl are optional - CSV always works. Both are slow to
+# import, so only their presence is checked here; they load on first export.
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+CHUNK_SIZE = 64 * 1024
+BATCH_ROWS = 5000
+
+_CONTEXT = [("session_id", "string"), ("molecule", "string")]
+
+# Column name and type per table ("string", "int", "float", "bool", "date")
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "markets": _CONTEXT + [
+        ("country", "string"), ("sales_2024_musd", "float"), ("cagr_5y", "float"),
+        ("therapy_area", "string"), ("unmet_need", "bool"),
+    ],
+    "trade": _CONTEXT + [
+        ("product", "string"), ("year", "int"), ("country", "string"),
+        ("exports_tonnes", "float"), ("imports_tonnes", "float"), ("net_position", "string"),
+        ("value_musd", "float"), ("import_dependency", "string"), ("partners", "string"),
+    ],
+    "patents": _CONTEXT + [
+        ("patent_number", "string"), ("title", "string"), ("holder", "string"),
+        ("filing_date", "date"), ("expiry_date", "date"), ("status", "string"),
+        ("geography", "string"), ("indication", "string"), ("fto_flag", "string"),
+    ],
+    "trials": _CONTEXT + [
+        ("nct_id", "string"), ("title", "string"), ("sponsor", "string"), ("phase", "string"),
+        ("status", "string"), ("enrollment", "int"), ("start_date", "date"),
+        ("estimated_completion", "date"), ("indication", "string"),
+    ],
+    "documents": _CONTEXT + [
+        ("kind", "string"), ("title", "string"), ("doc_type", "string"), ("date", "date"),
+        ("author", "string"), ("summary", "string"), ("link", "string"),
+    ],
+    "charts": _CONTEXT + [
+        ("agent", "string"), ("chart_id", "string"), ("title", "string"),
+        ("chart_type", "string"), ("label", "string"), ("value", "float"),
+    ],
+}
+
+
+class ExportFormatUnavailable(Exception):
+    """Raised when the optional library behind an export format isn't installed"""
+
+
+# ============================================================================
+# Flattening
+# ============================================================================
+
+def _coerce(value: Any, kind: str) -> Any:
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "int":
+            return int(value)
+        if kind == "float":
+            return float(value)
+        if kind == "bool":
+            return bool(value)
+        if kind == "date":
+            return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(v) for v in value)
+    return str(value)
+
+
+def _raw_results(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for result in source.get("worker_results") or []:
+        raw = result.get("raw") if isinstance(result, dict) else None
+        if isinstance(raw, dict):
+            yield raw
+
+
+def _market_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for raw in _raw_results(source):
+        for market in raw.get("markets") or []:
+            yield {**market, "therapy_area": raw.get("therapy_area"), "unmet_need": raw.get("unmet_need_flag")}
+
+
+def _trade_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for raw in _raw_results(source):
+        for row in raw.get("trade_data") or []:
+            yield {
+                **row,
+                "product": raw.get("product"),
+                "year": raw.get("year"),
+                "partners": row.get("top_destinations") or row.get("top_sources"),
+            }
+
+
+def _patent_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for raw in _raw_results(source):
+        for patent in raw.get("patent_status") or []:
+            yield {**patent, "indication": raw.get("indication"), "fto_flag": raw.get("fto_flag")}
+
+
+def _trial_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for raw in _raw_results(source):
+        yield from raw.get("active_trials") or []
+
+
+def _document_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    kinds = (
+        ("documents", "internal"),
+        ("recent_documents", "internal"),
+        ("top_results", "web"),
+        ("scientific_publications", "publication"),
+        ("news_articles", "news"),
+    )
+    for raw in _raw_results(source):
+        for key, kind in kinds:
+            for doc in raw.get(key) or []:
+                yield {
+                    "kind": kind,
+                    "title": doc.get("title"),
+                    "doc_type": doc.get("type") or doc.get("journal"),
+                    "date": doc.get("date"),
+                    "author": doc.get("author") or doc.get("source"),
+                    "summary": doc.get("summary"),
+                    "link": doc.get("download_link") or doc.get("url") or doc.get("doi"),
+                }
+
+
+def _chart_rows(source: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    demographics = source.get("demographics") or {}
+    if isinstance(demographics.get("raw"), dict):
+        demographics = demographics["raw"]
+    for agent, charts in (demographics.get("agents") or {}).items():
+        for chart in charts or []:
+            data = chart.get("data") or {}
+            for label, value in zip(data.get("labels") or [], data.get("values") or []):
+                yield {
+                    "agent": agent,
+                    "chart_id": chart.get("id"),
+                    "title": chart.get("title"),
+                    "chart_type": chart.get("recommended_chart"),
+                    "label": label,
+                    "value": value,
+                }
+
+
+_EXTRACTORS = {
+    "markets": _market_rows,
+    "trade": _trade_rows,
+    "patents": _patent_rows,
+    "trials": _trial_rows,
+    "documents": _document_rows,
+    "charts": _chart_rows,
+}
+
+
+def iter_rows(table: str, sources: Iterable[Dict[str, Any]]) -> Iterator[tuple]:
+    """
+    Typed rows of `table` across every source. A source is a dict with
+    `worker_results` (and optionally `demographics`, `session_id`,
+    `molecule`) - one analysis session. Sources are consumed lazily.
+    """
+    columns = TABLES[table]
+    for source in sources:
+        context = {"session_id": source.get("session_id"), "molecule": source.get("molecule")}
+        for row in _EXTRACTORS[table](source):
+            merged = {**row, **{k: v for k, v in context.items() if v is not None}}
+            yield tuple(_coerce(merged.get(name), kind) for name, kind in columns)
+
+
+def _batches(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+def stream_csv(table: str, sources: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in TABLES[table]])
+    for batch in _batches(iter_rows(table, sources), batch_rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands everything written so far to the caller on `drain`"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(table: str) -> "pa.Schema":
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "date": pa.date32()}
+    return pa.schema([(name, types[kind]) for name, kind in TABLES[table]])
+
+
+def stream_parquet(table: str, sources: Iterable[Dict[str, Any]], batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """One row group per batch; each row group is sent as soon as it is encoded"""
+    if not PYARROW_AVAILABLE:
+        raise ExportFormatUnavailable("Parquet export requires pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in _batches(iter_rows(table, sources), batch_rows):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_xlsx(tables: Sequence[str], sources_for: Any) -> Iterator[bytes]:
+    """
+    One sheet per table. openpyxl's write-only mode streams rows to temporary
+    files, so memory stays flat; the finished workbook is spooled to disk
+    and sent in chunks. `sources_for(table)` returns a fresh source iterable.
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise ExportFormatUnavailable("XLSX export requires openpyxl")
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for table in tables:
+        sheet = workbook.create_sheet(title=table)
+        sheet.append([name for name, _ in TABLES[table]])
+        for row in iter_rows(table, sources_for(table)):
+            sheet.append(row)
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_response(fmt: str, table: Optional[str], sources_for: Any, filename: str = "pharmaverse_export") -> StreamingResponse:
+    """
+    Streaming download of one table (CSV / Parquet) or a workbook with
+    one sheet per table (XLSX, all tables unless `table` is given).
+    `sources_for(table)` must return a fresh iterable of sources per call.
+    Raises ValueError for bad arguments, ExportFormatUnavailable for
+    formats whose library isn't installed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if table is not None and table not in TABLES:
+        raise ValueError(f"table must be one of {', '.join(TABLES)}")
+
+    if fmt == "xlsx":
+        if not OPENPYXL_AVAILABLE:
+            raise ExportFormatUnavailable("XLSX export requires openpyxl")
+        body = stream_xlsx([table] if table else list(TABLES), sources_for)
+        name = f"{filename}.xlsx"
+    else:
+        if table is None:
+            raise ValueError(f"table is required for {fmt} exports")
+        if fmt == "parquet" and not PYARROW_AVAILABLE:
+            raise ExportFormatUnavailable("Parquet export requires pyarrow")
+        stream = stream_parquet if fmt == "parquet" else stream_csv
+        body = stream(table, sources_for(table))
+        name = f"{filename}_{table}.{fmt}"
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
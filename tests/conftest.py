@@ -0,0 +1,9 @@
+# tests/conftest.py
+# The repo's modules are flat at the top level; make them importable from tests/
+# (and pharma_agents/ modules by their bare name, as api_integration.py does)
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "pharma_agents"))
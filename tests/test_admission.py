@@ -0,0 +1,42 @@
+# tests/test_admission.py
+# Per-client identity for the rate limit can't be changed by made-up headers
+from admission import AdmissionController, AdmissionRejected, client_key
+
+PROXIES = frozenset({"127.0.0.1"})
+KEYS = frozenset({"team-key"})
+
+
+def test_unknown_api_key_falls_back_to_peer_ip():
+    assert client_key({"x-api-key": "random-1"}, "1.2.3.4", PROXIES, KEYS) == "ip:1.2.3.4"
+    assert client_key({"x-api-key": "team-key"}, "1.2.3.4", PROXIES, KEYS).startswith("key:")
+
+
+def test_forwarded_for_only_from_trusted_proxies():
+    assert client_key({"x-forwarded-for": "9.9.9.9"}, "1.2.3.4", PROXIES, KEYS) == "ip:1.2.3.4"
+    # The hop the proxy appended wins over whatever the caller put in front
+    assert client_key({"x-forwarded-for": "6.6.6.6, 9.9.9.9"}, "127.0.0.1", PROXIES, KEYS) == "ip:9.9.9.9"
+
+
+def test_rotating_headers_share_one_bucket():
+    admission = AdmissionController(client_burst=2, client_rate_per_min=1)
+    statuses = []
+    for i in range(4):
+        client = client_key({"x-api-key": f"random-{i}", "x-forwarded-for": f"10.0.0.{i}"}, "1.2.3.4", PROXIES, KEYS)
+        try:
+            admission.admit_job(client, queued=0, running=0, slots=2)
+            statuses.append(200)
+        except AdmissionRejected as e:
+            statuses.append(e.status_code)
+    assert statuses == [200, 200, 429, 429]
+
+
+def test_refunded_job_frees_its_llm_budget():
+    admission = AdmissionController(client_burst=10, tokens_per_min=600, est_tokens=600, max_queue_wait_s=1000)
+    admission.admit_job("ip:1.2.3.4", queued=0, running=0, slots=2)
+    assert admission.admit_job("ip:1.2.3.4", queued=0, running=0, slots=2)["estimated_wait_s"] > 50
+
+    # Both jobs cancelled before they ran: the next one needn't wait for budget
+    admission.refund_job()
+    admission.refund_job()
+    assert admission.admit_job("ip:1.2.3.4", queued=0, running=0, slots=2) == {"admission": "accepted", "estimated_wait_s": 0.0}
+    assert admission.stats()["refunded"] == 2
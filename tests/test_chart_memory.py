@@ -0,0 +1,73 @@
+# tests/test_chart_memory.py
+# Thousands of chart renders (valid and rejected specs) must leave RSS flat and no Figures alive
+#
+# CHART_MEMORY_RENDERS sets the number of chart specs (default 1200, a third of them rejected).
+import functools
+import gc
+import os
+import resource
+
+from matplotlib.figure import Figure
+
+import chart_renderer
+
+RENDERS = int(os.getenv("CHART_MEMORY_RENDERS", "1200"))
+MAX_RSS_GROWTH_MB = 25.0
+
+
+def rss_mb() -> float:
+    """Current resident set size in MiB (Linux /proc, ru_maxrss fallback)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def live_figures() -> int:
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+
+
+def chart_specs(i: int):
+    labels = ["US", "EU", "India", "China", "Japan"]
+    values = [1200 + i % 7, 650, 180, 95, 40]
+    return [
+        {"id": f"bar-{i}", "title": f"Sales {i}", "recommended_chart": "bar", "data": {"labels": labels, "values": values}},
+        {"id": f"line-{i}", "title": f"Trend {i}", "recommended_chart": "line", "data": {"labels": labels, "values": values}},
+        {"id": f"pie-{i}", "title": f"Share {i}", "recommended_chart": "pie", "data": {"labels": labels, "values": values}},
+        {"id": f"donut-{i}", "title": f"Mix {i}", "recommended_chart": "donut", "data": {"labels": labels, "values": values}},
+        # Specs the old pyplot path returned early on (and leaked a figure for)
+        {"id": f"neg-{i}", "title": "Negative pie", "recommended_chart": "pie", "data": {"labels": labels, "values": [-1, 2, 3, 4, 5]}},
+        {"id": f"bad-{i}", "title": "Unsupported", "recommended_chart": "radar", "data": {"labels": labels, "values": values}},
+    ]
+
+
+def test_memory_stays_flat_over_thousands_of_renders(tmp_path, monkeypatch):
+    # Small canvases keep the test fast; the figure lifecycle is the same at any size
+    monkeypatch.setattr(chart_renderer, "render_chart", functools.partial(chart_renderer.render_chart, size=(2, 1.5), dpi=30))
+    batches = max(10, RENDERS // 6)
+    warmup = max(1, batches // 10)
+
+    def render_batch(i: int) -> None:
+        jobs = [(spec, tmp_path / f"{spec['id']}.png") for spec in chart_specs(i % 50)]
+        results = chart_renderer.render_charts(jobs, max_workers=4)
+        assert sum(r is not None for r in results) == 4
+
+    for i in range(warmup):
+        render_batch(i)
+    gc.collect()
+    baseline = rss_mb()
+    samples = []
+    for i in range(warmup, batches):
+        render_batch(i)
+        if (i + 1) % warmup == 0:
+            assert live_figures() == 0
+            samples.append(rss_mb())
+    growth = rss_mb() - baseline
+
+    assert live_figures() == 0
+    assert growth < MAX_RSS_GROWTH_MB, (
+        f"RSS grew {growth:.1f} MiB over {batches * 6} charts (samples: {', '.join(f'{s:.0f}' for s in samples)})"
+    )
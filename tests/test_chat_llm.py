@@ -0,0 +1,26 @@
+# tests/test_chat_llm.py
+# Concurrent first questions share one lazily created chat client
+import threading
+import time
+
+import api_integration
+
+
+def test_chat_client_created_once(monkeypatch):
+    created = []
+
+    class SlowClient:
+        def __init__(self, temperature):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(api_integration, "GroqLLM", SlowClient)
+    monkeypatch.setattr(api_integration, "_chat_llm", None)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(api_integration._get_chat_llm())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1 and all(client is created[0] for client in clients)
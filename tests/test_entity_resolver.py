@@ -0,0 +1,38 @@
+# tests/test_entity_resolver.py
+# Fuzzy matching absorbs typos, but never maps another drug onto a catalog one
+import pytest
+
+from agents.iqvia_agent import IQVIAAgent
+from pharma_agents.entity_resolver import canonical_molecule_id, molecule_resolver
+
+NEAR_MISSES = ["ponatinib", "lapatinib", "erlotinib", "dulaglutide", "gefitinib", "sitagliptin"]
+TYPOS = {
+    "imatinb": "imatinib",
+    "semagultide": "semaglutide",
+    "metfromin": "metformin",
+    "ozempik": "semaglutide",
+    "acetominophen": "paracetamol",
+    "nilotnib": "nilotinib",
+}
+
+
+@pytest.mark.parametrize("name", NEAR_MISSES)
+def test_other_drugs_do_not_resolve(name):
+    assert molecule_resolver.resolve(name) is None
+    assert molecule_resolver.extract(f"Evaluate {name} for NSCLC") == []
+    assert canonical_molecule_id(name) == name
+
+
+@pytest.mark.parametrize("typo, canonical_id", TYPOS.items())
+def test_typos_resolve(typo, canonical_id):
+    assert molecule_resolver.resolve(typo).canonical_id == canonical_id
+    assert [m.canonical_id for m in molecule_resolver.extract(f"Evaluate {typo} in CML")] == [canonical_id]
+
+
+def test_agents_prefer_the_primary_molecule_line():
+    agent = IQVIAAgent("http://localhost", llm=object())
+    context = "Compare imatinib with dasatinib and dasatinib generics\nPrimary molecule: Imatinib"
+    assert agent._resolve_molecule(context).canonical_id == "imatinib"
+    unlisted = agent._resolve_molecule("Evaluate erlotinib for NSCLC\nPrimary molecule: Erlotinib")
+    assert (unlisted.name, unlisted.kind) == ("Erlotinib", "unlisted")
+    assert agent._resolve_molecule("Evaluate dasatinib in CML").canonical_id == "dasatinib"
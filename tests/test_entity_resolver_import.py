@@ -0,0 +1,13 @@
+# tests/test_entity_resolver_import.py
+# The agents and the API share one resolver module (one index, one cache)
+import sys
+
+
+def test_agents_and_api_share_the_resolver():
+    from agents import base_agent
+    import mock_api
+    from pharma_agents import entity_resolver
+
+    assert "entity_resolver" not in sys.modules
+    assert base_agent.molecule_resolver is entity_resolver.molecule_resolver
+    assert mock_api.canonical_molecule_id is entity_resolver.canonical_molecule_id
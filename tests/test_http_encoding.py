@@ -0,0 +1,26 @@
+# tests/test_http_encoding.py
+# Files that may be compressed in transit carry a weak ETag, which still revalidates
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_encoding import ResponseEncodingMiddleware, file_response
+
+
+def test_weak_etag_survives_compression(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("<p>report</p>" * 500)
+    app = FastAPI()
+    app.add_middleware(ResponseEncodingMiddleware)
+
+    @app.get("/page")
+    def view(request: Request):
+        return file_response(request, page, "text/html; charset=utf-8", etag="abc", weak=True)
+
+    client = TestClient(app)
+    response = client.get("/page", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+
+    for tag in ('W/"abc"', '"abc"'):
+        revalidated = client.get("/page", headers={"accept-encoding": "gzip", "if-none-match": tag})
+        assert revalidated.status_code == 304 and revalidated.headers["etag"] == 'W/"abc"'
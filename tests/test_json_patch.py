@@ -0,0 +1,39 @@
+# tests/test_json_patch.py
+# diff() round-trips through apply(), and tells JSON types apart
+import pytest
+
+from json_patch import apply, diff
+
+CASES = [
+    ({}, {"a": 1}),
+    ({"a": 1, "b": 2}, {"a": 1}),
+    ({"a": {"b": [1, 2]}}, {"a": {"b": [1, 2, 3, 4]}}),
+    ({"a": [1, 2, 3]}, {"a": [3]}),
+    ({"a/b": 1, "c~d": 2}, {"a/b": 3, "c~d": 2}),
+    ({"flag": 1, "count": 0}, {"flag": True, "count": False}),
+    ({"xs": [0, 1]}, {"xs": [False, True]}),
+    ({"xs": [1]}, {"xs": [True, 2]}),
+    ({"n": 1}, {"n": 1.0}),
+    ([1, 2], {"a": None}),
+]
+
+
+@pytest.mark.parametrize("old, new", CASES)
+def test_diff_round_trips(old, new):
+    patched = apply(old, diff(old, new))
+    assert patched == new
+    assert [type(v) for v in _leaves(patched)] == [type(v) for v in _leaves(new)]
+
+
+def test_bool_and_int_differ():
+    assert diff({"a": 1}, {"a": True}) == [{"op": "replace", "path": "/a", "value": True}]
+    assert diff([0], [False]) == [{"op": "replace", "path": "", "value": [False]}]
+    assert diff({"a": [True]}, {"a": [True]}) == []
+
+
+def _leaves(value):
+    if isinstance(value, dict):
+        return [leaf for key in sorted(value) for leaf in _leaves(value[key])]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in _leaves(item)]
+    return [value]
@@ -0,0 +1,67 @@
+# tests/test_orchestration_queue.py
+# JobWorker: lost leases cancel the job; stop() hands jobs back only after their threads return
+import asyncio
+import threading
+import time
+
+from orchestration_queue import JobQueue, JobWorker, run_in_thread
+
+
+def test_lost_lease_cancels_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    finished = []
+
+    async def handler(job):
+        await run_in_thread(time.sleep, 0.6)
+        finished.append(job["job_id"])   # not reached once cancelled
+        return {}
+
+    async def main():
+        worker = JobWorker(queue, handler, concurrency=1, visibility_timeout_s=0.3, poll_s=0.05, name="a")
+        runner = asyncio.create_task(worker.run())
+        job = queue.enqueue("orchestration", {})
+        await asyncio.sleep(0.05)
+        # Another worker took the job over
+        queue._conn.execute(
+            "UPDATE jobs SET lease_owner = 'b', lease_expires_at = ? WHERE job_id = ?", (time.time() + 60, job["job_id"])
+        )
+        await asyncio.sleep(0.9)
+        await worker.stop()
+        runner.cancel()
+        return job, worker
+
+    job, worker = asyncio.run(main())
+    assert finished == []
+    assert worker.stats["lease_lost"] == 1
+    assert queue.get(job["job_id"])["lease_owner"] == "b"
+
+
+def test_stop_releases_only_after_threads_return(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    thread_done = threading.Event()
+    status_at_release = []
+
+    def blocking():
+        time.sleep(0.4)
+        status_at_release.append(queue.get(job["job_id"])["status"])
+        thread_done.set()
+
+    async def handler(job):
+        await run_in_thread(blocking)
+        return {}
+
+    async def main():
+        worker = JobWorker(queue, handler, concurrency=1, poll_s=0.05, name="a")
+        runner = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.1)
+        await worker.stop()
+        runner.cancel()
+        return worker
+
+    job = queue.enqueue("orchestration", {})
+    worker = asyncio.run(main())
+    assert thread_done.is_set()
+    assert status_at_release == ["running"]   # still leased while the thread ran
+    released = queue.get(job["job_id"])
+    assert released["status"] == "queued" and released["attempts"] == 0
+    assert worker.stats["released"] == 1
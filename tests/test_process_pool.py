@@ -0,0 +1,27 @@
+# tests/test_process_pool.py
+# SpawnPool.terminate kills a hung worker through the pool's own process handles
+import time
+
+from process_pool import SpawnPool
+
+
+def test_terminate_kills_running_and_cancels_queued():
+    pool = SpawnPool(max_workers=1)
+    running = pool.submit(time.sleep, 60)
+    queued = [pool.submit(time.sleep, 60) for _ in range(4)]
+    while not running.running():
+        time.sleep(0.05)
+    workers = list(pool._owned_context.processes)
+
+    started = time.monotonic()
+    pool.terminate()
+    for process in workers:
+        process.join(timeout=10)
+    while not all(future.done() for future in [running] + queued) and time.monotonic() - started < 10:
+        time.sleep(0.05)   # the pool's manager thread settles the futures
+
+    assert workers and not any(process.is_alive() for process in workers)
+    assert queued[-1].cancelled()
+    # the rest were already handed to the (now dead) worker queue and fail
+    assert all(future.done() for future in [running] + queued)
+    assert time.monotonic() - started < 10
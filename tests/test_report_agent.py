@@ -0,0 +1,22 @@
+# tests/test_report_agent.py
+# ReportAgent asks for the HTML report, so a run never renders a PDF by itself
+from agents import report_agent
+from agents.report_agent import ReportAgent
+
+
+class _Response:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"status": "success", "html_url": "/reports/R1.html", "download_url": "/downloads/reports/R1.pdf"}
+
+
+def test_report_agent_requests_html(monkeypatch):
+    posted = []
+    monkeypatch.setattr(report_agent.requests, "post", lambda url, json, timeout: posted.append(json) or _Response())
+
+    result = ReportAgent("http://localhost", llm=object()).run("Topic", "query", {}, [], {})
+
+    assert posted[0]["format"] == "html"
+    assert result["raw"]["html_url"] == "/reports/R1.html"
@@ -0,0 +1,19 @@
+# tests/test_report_jobs.py
+# A per-job timeout of 0 is honoured, not replaced by the manager's default
+import asyncio
+import time
+
+from report_jobs import ReportJobManager
+
+
+def test_zero_timeout_is_not_the_default():
+    async def main():
+        jobs = ReportJobManager(time.sleep, max_workers=1, timeout_s=60)
+        job = jobs.submit("r1", "topic", 30, timeout_s=0)
+        await jobs.wait(job.job_id, timeout=10)
+        await asyncio.sleep(0.1)   # let the hung pool be reaped
+        jobs.shutdown()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == "failed" and "timed out after 0s" in job.error
@@ -0,0 +1,32 @@
+# tests/test_report_sections.py
+# Cached section fragments are reused across renders; the dated cover never is
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("pypdf")
+
+import pdf_report
+from chart_cache import ChartCache
+from report_sections import SectionCache
+
+REPORT = {
+    "topic": "Imatinib (CML)",
+    "final_answer": "Worth pursuing.",
+    "worker_results": [
+        {"agent": "IQVIA Insights Agent", "summary": "Market grows."},
+        {"agent": "Patent Landscape Agent", "summary": "Clear to operate."},
+    ],
+}
+
+
+def test_second_render_reuses_every_section(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_report, "REPORT_SECTION_CACHE", True)
+    sections = SectionCache(tmp_path / "sections")
+    charts = ChartCache(tmp_path / "charts")
+
+    for name in ("first.pdf", "second.pdf"):
+        pages = pdf_report.generate_pdf(REPORT, tmp_path / name, charts, sections)
+        assert pages == 4   # cover, summary, one page per agent section
+
+    assert sections.stats()["hits"] == 3 and sections.stats()["entries"] == 3
+    assert sorted(p.name for p in tmp_path.glob("*.pdf")) == ["first.pdf", "second.pdf"]
@@ -0,0 +1,57 @@
+# tests/test_session_events.py
+# append_async: state and shared-log writes happen off the event loop, in call order
+import asyncio
+import threading
+
+import pytest
+
+from session_events import SessionEvents, SQLiteSessionEvents
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def events(request, tmp_path):
+    log = SessionEvents() if request.param == "memory" else SQLiteSessionEvents(str(tmp_path / "events.db"))
+    yield log
+    log.stop()
+
+
+def test_append_async_keeps_order_and_patches(events):
+    delivered = []
+    events.subscribe(lambda session_id, event: delivered.append(event["seq"]))
+    loop_thread = []
+
+    def state(n):
+        loop_thread.append(threading.current_thread() is threading.main_thread())
+        return {"n": n}
+
+    async def main():
+        appends = [events.append_async("s", {"type": "status"}, lambda n=n: state(n)) for n in range(5)]
+        events.append_async("s", {"type": "token"})   # not awaited
+        await asyncio.gather(*appends)
+        return await events.append_async("s", {"type": "status"}, lambda: state(5))
+
+    last = asyncio.run(main())
+    assert delivered == [1, 2, 3, 4, 5, 6, 7]
+    assert not any(loop_thread)
+    assert last["patch"] == [{"op": "replace", "path": "/n", "value": 5}]
+    assert [event.get("patch") for event in events.since("s", 4)][:2] == [
+        [{"op": "replace", "path": "/n", "value": 4}],
+        None,
+    ]
+    assert events.state("s") == {"n": 5}
+
+
+def test_append_async_failure_is_not_delivered(events):
+    delivered = []
+    events.subscribe(lambda session_id, event: delivered.append(event["seq"]))
+
+    def broken():
+        raise RuntimeError("store down")
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await events.append_async("s", {"type": "status"}, broken)
+        return await events.append_async("s", {"type": "status"}, lambda: {"n": 1})
+
+    event = asyncio.run(main())
+    assert delivered == [1] and event["seq"] == 1
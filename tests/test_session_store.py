@@ -0,0 +1,159 @@
+# tests/test_session_store.py
+# One contract for the memory, SQLite and Redis (fakeredis) session stores
+import threading
+import time
+
+import pytest
+
+from session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore, SessionStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+BACKENDS = ["memory", "sqlite", "redis"]
+
+
+def make_store(backend: str, tmp_path, **kwargs) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), sweep_interval_s=0, **kwargs)
+    kwargs.pop("max_entries", None)
+    return RedisSessionStore(fakeredis.FakeRedis(), **kwargs)
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path) -> SessionStore:
+    return make_store(request.param, tmp_path)
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_field_level_writes(store):
+    store.create("a", {"status": "processing", "agent_results": {}, "chat_history": []}, keys={"molecule": "imatinib"})
+    assert store.version("a") == 1
+
+    store.update("a", status="completed")
+    store.set_item("a", "agent_results", "iqvia", {"summary": "ok"})
+    store.set_item("a", "agent_results", "trials", {"summary": "3 trials"})
+    store.append("a", "chat_history", {"sender": "user", "message": "hi"})
+    store.append("a", "chat_history", {"sender": "master", "message": "hello"})
+
+    session = store["a"]
+    assert session["status"] == "completed"
+    assert session["agent_results"] == {"iqvia": {"summary": "ok"}, "trials": {"summary": "3 trials"}}
+    assert [m["sender"] for m in session["chat_history"]] == ["user", "master"]
+    assert session["version"] == 6
+    assert store.get("a", fields=("status",)) == {"status": "completed"}
+    assert store.find("molecule", "imatinib") == ["a"]
+    assert "a" in store and "b" not in store
+
+    with pytest.raises(KeyError):
+        store.update("b", status="x")
+
+
+def test_watch_called_per_write(store):
+    seen = []
+    store.watch(seen.append)
+    store.create("a", {"status": "processing"})
+    store.update("a", status="completed")
+    assert seen == ["a", "a"]
+
+
+def test_failed_write_leaves_store_usable(store):
+    store.create("a", {"status": "processing"})
+    with pytest.raises(TypeError):
+        store.update("a", bad={1, 2})
+    with pytest.raises(TypeError):
+        store.set_item("a", "agent_results", "iqvia", object())
+
+    store.update("a", status="completed")
+    store.append("a", "chat_history", {"message": "still writable"})
+    store.create("b", {"status": "processing"})
+    session = store["a"]
+    assert session["status"] == "completed"
+    assert "bad" not in session
+    assert session["chat_history"] == [{"message": "still writable"}]
+    assert "b" in store
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_idle_sessions_expire(backend, tmp_path):
+    store = make_store(backend, tmp_path, ttl_s=1)
+    store.create("a", {"status": "processing"})
+    assert "a" in store
+    time.sleep(1.3)
+    assert store.get("a") is None
+    assert "a" not in store.ids()
+    with pytest.raises(KeyError):
+        store.update("a", status="completed")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_least_recently_used_sessions_are_evicted(backend, tmp_path):
+    # Redis leaves memory bounds to the server's maxmemory policy
+    store = make_store(backend, tmp_path, max_entries=2)
+    store.create("a", {"n": 1})
+    time.sleep(0.01)
+    store.create("b", {"n": 2})
+    time.sleep(0.01)
+    store.get("a")
+    time.sleep(0.01)
+    store.create("c", {"n": 3})
+
+    assert sorted(store.ids()) == ["a", "c"]
+    assert store.stats()["evictions"] == 1
+
+
+def _shared_pair(backend, tmp_path):
+    """Two stores on one database, as two worker processes would have"""
+    if backend == "sqlite":
+        return [SQLiteSessionStore(str(tmp_path / "sessions.db")) for _ in range(2)]
+    server = fakeredis.FakeServer()
+    return [RedisSessionStore(fakeredis.FakeRedis(server=server)) for _ in range(2)]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "redis"])
+def test_concurrent_appends_from_two_workers_keep_every_item(backend, tmp_path):
+    workers = _shared_pair(backend, tmp_path)
+    workers[0].create("a", {"chat_history": []})
+
+    def chat(worker, sender):
+        for n in range(25):
+            worker.append("a", "chat_history", {"sender": sender, "n": n})
+
+    threads = [threading.Thread(target=chat, args=(worker, f"w{i}")) for i, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    history = workers[1]["a"]["chat_history"]
+    assert len(history) == 50
+    for sender in ("w0", "w1"):
+        assert [m["n"] for m in history if m["sender"] == sender] == list(range(25))
+    assert workers[0].version("a") == 51
+
+
+def test_redis_field_reads_skip_the_payloads():
+    store = RedisSessionStore(fakeredis.FakeRedis())
+    store.create("a", {"status": "done", "agent_results": {"iqvia": {"raw": "x" * 10000}}, "chat_history": [1, 2]})
+    store.client.hgetall = None   # any whole-hash read would fail
+    assert store.version("a") == 1 and store.version("b") is None
+    assert store.get("a", fields=("status", "chat_history", "version")) == {"status": "done", "chat_history": [1, 2], "version": 1}
+    assert store.get("a", fields=("agent_results",))["agent_results"]["iqvia"]["raw"] == "x" * 10000
+    assert "a" in store and "b" not in store
+
+
+def test_sqlite_reads_do_not_write(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), sweep_interval_s=0)
+    store.create("a", {"status": "processing"})
+    changes = store._conn.total_changes
+    for _ in range(5):
+        assert store.get("a")["status"] == "processing"
+        assert store.version("a") == 1
+    assert store._conn.total_changes == changes
+    store.update("a", status="completed")   # flushes the read times with the write
+    assert store.get("a")["status"] == "completed"
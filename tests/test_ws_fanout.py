@@ -0,0 +1,54 @@
+# tests/test_ws_fanout.py
+# The coalesce policy only drops queued status messages when the queue is full;
+# a replay / snapshot read after connecting goes ahead of the live messages
+from ws_fanout import Connection, SessionFanout, coalesce_key
+
+
+def _status(agent, state):
+    message = {"type": "agent_status", "agent": agent, "status": state}
+    return str(message), coalesce_key(message)
+
+
+def _queued(connection):
+    return [text for _, _, text, _ in connection._queue]
+
+
+def test_coalesce_keeps_everything_below_the_cap():
+    connection = Connection(None, "s", max_queue=4, policy="coalesce", send_timeout_s=1)
+    for state in ("running", "done"):
+        connection.offer(*_status("iqvia", state))
+    assert len(_queued(connection)) == 2
+    assert connection.stats["coalesced"] == 0
+
+
+def test_coalesce_on_overflow_drops_the_superseded_status_first():
+    connection = Connection(None, "s", max_queue=4, policy="coalesce", send_timeout_s=1)
+    connection.offer(*_status("exim", "running"))
+    connection.offer(*_status("iqvia", "running"))
+    connection.offer("result-1")
+    connection.offer("result-2")
+    connection.offer(*_status("iqvia", "done"))
+    assert _queued(connection) == [_status("exim", "running")[0], "result-1", "result-2", _status("iqvia", "done")[0]]
+    # Nothing superseded: the oldest status goes, results stay
+    connection.offer("result-3")
+    assert _queued(connection) == ["result-1", "result-2", _status("iqvia", "done")[0], "result-3"]
+    assert connection.stats == {**connection.stats, "coalesced": 2, "dropped": 0}
+
+
+def test_catch_up_goes_ahead_of_live_messages_it_does_not_cover():
+    fanout = SessionFanout()
+    held = fanout.connect("s", None, start=False)
+    held._writer = object()   # no writer task outside an event loop
+    for seq in (4, 5, 6):
+        fanout.broadcast("s", {"type": "chat_message", "seq": seq})
+    fanout.catch_up(held, [{"type": "chat_message", "seq": seq} for seq in (2, 3, 4)], covered_seq=4)
+    assert [entry[3] for entry in held._queue] == [2, 3, 4, 5, 6]
+    assert held.last_seq == 6
+
+    snapshot = fanout.connect("s", None, start=False)
+    snapshot._writer = object()
+    fanout.broadcast("s", {"type": "chat_message", "seq": 7})
+    fanout.broadcast("s", {"type": "chat_message", "seq": 8})
+    fanout.catch_up(snapshot, [{"type": "session_data", "seq": 7}], covered_seq=7)
+    assert [entry[3] for entry in snapshot._queue] == [7, 8]
+    assert '"session_data"' in snapshot._queue[0][2]
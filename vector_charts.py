@@ -0,0 +1,107 @@
+# vector_charts.py
+# Charts drawn directly as ReportLab graphics (vector) - no Matplotlib, no PNG round-trip
+from typing import Any, Dict, Optional
+
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.doughnut import Doughnut
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+from chart_specs import prepare_chart
+
+# Same cycle as Matplotlib's default "tab10", so both backends look alike
+PALETTE = [
+    colors.HexColor(c) for c in (
+        "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+        "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    )
+]
+
+TITLE_HEIGHT = 22
+
+
+def _axis_bounds(values) -> tuple:
+    low, high = min(0.0, min(values)), max(0.0, max(values))
+    if low == high:
+        high = low + 1
+    return low, high
+
+
+def _bar(spec: Dict[str, Any], width: float, height: float) -> VerticalBarChart:
+    chart = VerticalBarChart()
+    chart.x, chart.y = 45, 40
+    chart.width, chart.height = width - 65, height - 40 - TITLE_HEIGHT - 10
+    chart.data = [spec["values"]]
+    chart.bars[0].fillColor = PALETTE[0]
+    chart.bars[0].strokeColor = None
+    chart.valueAxis.valueMin, chart.valueAxis.valueMax = _axis_bounds(spec["values"])
+    chart.valueAxis.labels.fontSize = 7
+    chart.categoryAxis.categoryNames = spec["labels"]
+    chart.categoryAxis.labels.fontSize = 7
+    if len(spec["labels"]) > 5:
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = "ne"
+    return chart
+
+
+def _line(spec: Dict[str, Any], width: float, height: float) -> HorizontalLineChart:
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 45, 40
+    chart.width, chart.height = width - 65, height - 40 - TITLE_HEIGHT - 10
+    chart.data = [spec["values"]]
+    chart.joinedLines = 1
+    chart.lines[0].strokeColor = PALETTE[0]
+    chart.lines[0].strokeWidth = 1.5
+    chart.lines[0].symbol = makeMarker("FilledCircle", size=4, fillColor=PALETTE[0])
+    chart.valueAxis.valueMin, chart.valueAxis.valueMax = _axis_bounds(spec["values"])
+    chart.valueAxis.labels.fontSize = 7
+    chart.categoryAxis.categoryNames = spec["labels"]
+    chart.categoryAxis.labels.fontSize = 7
+    if len(spec["labels"]) > 5:
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = "ne"
+    return chart
+
+
+def _pie(spec: Dict[str, Any], width: float, height: float, donut: bool):
+    chart = Doughnut() if donut else Pie()
+    size = min(width, height - TITLE_HEIGHT) - 50
+    chart.x, chart.y = (width - size) / 2, 20
+    chart.width = chart.height = size
+    chart.data = spec["values"]
+    total = sum(spec["values"])
+    chart.labels = [f"{label} ({value / total:.1%})" for label, value in zip(spec["labels"], spec["values"])]
+    chart.slices.fontSize = 7
+    chart.slices.strokeColor = colors.white
+    chart.slices.strokeWidth = 0.5
+    for i in range(len(spec["values"])):
+        chart.slices[i].fillColor = PALETTE[i % len(PALETTE)]
+    if not donut:
+        chart.sideLabels = len(spec["values"]) > 4
+    return chart
+
+
+def build_vector_chart(chart: Dict[str, Any], width: float = 5 * inch, height: float = 3 * inch) -> Optional[Drawing]:
+    """
+    Build a bar/line/pie/donut chart as a ReportLab Drawing flowable.
+    Returns None for specs `prepare_chart` rejects, same as the raster path.
+    """
+    spec = prepare_chart(chart)
+    if spec is None:
+        return None
+
+    drawing = Drawing(width, height)
+    if spec["type"] == "bar":
+        drawing.add(_bar(spec, width, height))
+    elif spec["type"] == "line":
+        drawing.add(_line(spec, width, height))
+    else:
+        drawing.add(_pie(spec, width, height, donut=spec["type"] == "donut"))
+
+    if spec["title"]:
+        drawing.add(String(width / 2, height - 14, spec["title"], fontName="Helvetica-Bold", fontSize=10, textAnchor="middle"))
+    return drawing
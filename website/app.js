@@ -184,7 +184,9 @@ async function callMasterAgent(userQuery, isFollowUp = false) {
             
             if (result.report && result.report.download_link) {
                 const fullUrl = result.download_link || result.report.download_link;
-                addChatMessage('report', `📄 Report generated! <a href=\"${fullUrl}\" target=\"_blank\" class=\"text-purple-600 underline\">Download PDF</a>`);
+                const htmlUrl = result.html_link || result.report.html_link;
+                const viewLink = htmlUrl ? `<a href=\"${htmlUrl}\" target=\"_blank\" class=\"text-purple-600 underline\">View report</a> · ` : '';
+                addChatMessage('report', `📄 Report generated! ${viewLink}<a href=\"${fullUrl}\" target=\"_blank\" class=\"text-purple-600 underline\">Download PDF</a>`);
             }
             
             // Show overview by default after first run
@@ -829,7 +831,13 @@ async function generateReport() {
         const report = AppState.masterAgentResponse.report;
         updateAgentStatus('report', 'done');
         
-        if (report.download_link) {
+        if (report.html_link) {
+            // The HTML report is already rendered; the PDF is only rendered if
+            // the user asks for it, so open the page instead of downloading
+            addChatMessage('report', `✅ Report ready! <a href="${report.html_link}" target="_blank" class="text-purple-600 underline font-semibold">View report</a>` +
+                (report.download_link ? ` · <a href="${report.download_link}" target="_blank" class="text-purple-600 underline">Download PDF</a>` : ''));
+            window.open(report.html_link, '_blank');
+        } else if (report.download_link) {
             // download_link is already a fully-qualified URL from the backend
             const fullUrl = report.download_link;
             addChatMessage('report', `✅ Report ready! <a href="${fullUrl}" target="_blank" class="text-purple-600 underline font-semibold">Download PDF</a>`);
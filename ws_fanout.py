@@ -0,0 +1,241 @@
+# ws_fanout.py
+# WebSocket fan-out: a bounded outbound queue and writer task per connection
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from http_encoding import dumps
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "coalesce")   # drop_oldest | coalesce | disconnect
+WS_SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "10"))    # a send stuck this long drops the client
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Messages that only report current state: a newer one for the same key
+# makes the queued one redundant, so they are the first to go on overflow
+STATUS_TYPES = {"agent_status", "pong"}
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    if message.get("type") in STATUS_TYPES:
+        return message["type"], message.get("agent")
+    return None
+
+
+class Connection:
+    """
+    One client. Messages are encoded once by the broadcaster and queued
+    here; the writer task sends them in order, so a slow client only
+    falls behind itself.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, max_queue: int, policy: str, send_timeout_s: float) -> None:
+        self.websocket = websocket
+        self.session_id = session_id
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout_s = send_timeout_s
+        # (enqueued_at, coalesce key, encoded text, seq)
+        self._queue: Deque[Tuple[float, Optional[Tuple[str, Any]], str, Optional[int]]] = deque()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.last_seq: Optional[int] = None   # highest event seq queued (or covered by a snapshot)
+        self.connected_at = time.time()
+        self.stats = {"sent": 0, "dropped": 0, "coalesced": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0}
+
+    def start(self, on_close) -> None:
+        self._writer = asyncio.create_task(self._write_loop(on_close))
+
+    def offer(self, text: str, key: Optional[Tuple[str, Any]] = None, seq: Optional[int] = None) -> bool:
+        """
+        Queue an encoded message without blocking; False if the connection
+        is (now) closed. A message with a `seq` the client already has (from
+        a replay or snapshot racing another worker's event) is skipped.
+        """
+        if self.closed:
+            return False
+        if seq is not None:
+            if self.last_seq is not None and seq <= self.last_seq:
+                return True
+            self.last_seq = seq
+        if len(self._queue) >= self.max_queue and not self._make_room(key):
+            return False
+        self._queue.append((time.perf_counter(), key, text, seq))
+        self._ready.set()
+        return True
+
+    def catch_up(self, backlog: List[Tuple[str, Optional[Tuple[str, Any]], Optional[int]]], covered_seq: Optional[int]) -> None:
+        """
+        Put `backlog` (a replay or snapshot, as (text, key, seq)) in front of
+        the live messages queued while it was being read, dropping those it
+        already covers (seq <= `covered_seq`)
+        """
+        if covered_seq is not None:
+            self._queue = deque(entry for entry in self._queue if entry[3] is None or entry[3] > covered_seq)
+            self.last_seq = max(self.last_seq or 0, covered_seq)
+        now = time.perf_counter()
+        self._queue.extendleft((now, key, text, seq) for text, key, seq in reversed(backlog))
+        if self._queue:
+            self._ready.set()
+
+    def _make_room(self, key: Optional[Tuple[str, Any]]) -> bool:
+        """
+        Only on overflow. `coalesce` drops the queued status the incoming
+        message supersedes, else the oldest queued status, keeping the order
+        of everything else; without one it falls back to drop_oldest.
+        """
+        if self.policy == "disconnect":
+            self.close(code=1013, reason="Client too slow")
+            return False
+        if self.policy == "coalesce":
+            victim = None
+            for i, (_, queued_key, _, _) in enumerate(self._queue):
+                if queued_key is not None and (queued_key == key or victim is None):
+                    victim = i
+                    if queued_key == key:
+                        break
+            if victim is not None:
+                del self._queue[victim]
+                self.stats["coalesced"] += 1
+                return True
+        self._queue.popleft()
+        self.stats["dropped"] += 1
+        return True
+
+    async def _write_loop(self, on_close) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                enqueued_at, _, text, _ = self._queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout_s)
+                lag_ms = (time.perf_counter() - enqueued_at) * 1000
+                self.stats["sent"] += 1
+                self.stats["last_lag_ms"] = round(lag_ms, 1)
+                self.stats["max_lag_ms"] = round(max(self.stats["max_lag_ms"], lag_ms), 1)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[WS] dropping client of session {self.session_id}: {type(e).__name__}: {e}")
+            self.close(code=1011, reason="Send failed")
+        finally:
+            on_close(self)
+
+    def close(self, code: int = 1000, reason: str = "") -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._ready.set()
+        asyncio.get_running_loop().create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.send_timeout_s)
+        except Exception:
+            pass  # already gone
+
+    def info(self) -> Dict[str, Any]:
+        oldest = self._queue[0][0] if self._queue else None
+        return {
+            "session_id": self.session_id,
+            "queued": len(self._queue),
+            "oldest_queued_ms": round((time.perf_counter() - oldest) * 1000, 1) if oldest is not None else 0.0,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            **self.stats,
+        }
+
+
+class SessionFanout:
+    """
+    WebSocket clients grouped by session. `broadcast` encodes a message once
+    and queues it for every client of the session without awaiting any send,
+    so the orchestration loop never waits on a browser tab.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = WS_QUEUE_SIZE,
+        policy: str = WS_OVERFLOW_POLICY,
+        send_timeout_s: float = WS_SEND_TIMEOUT_S,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"WS_OVERFLOW_POLICY must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout_s = send_timeout_s
+        self.connections: Dict[str, List[Connection]] = {}
+        self.totals = {"connected": 0, "disconnected": 0, "dropped": 0, "coalesced": 0}
+
+    def connect(self, session_id: str, websocket: WebSocket, start: bool = True) -> Connection:
+        """
+        Register an accepted WebSocket and start its writer. With
+        start=False broadcasts queue up unsent until `catch_up`.
+        """
+        conn = Connection(websocket, session_id, self.max_queue, self.policy, self.send_timeout_s)
+        self.connections.setdefault(session_id, []).append(conn)
+        self.totals["connected"] += 1
+        if start:
+            conn.start(self._remove)
+        return conn
+
+    def catch_up(self, conn: Connection, backlog: List[Dict[str, Any]], covered_seq: Optional[int]) -> None:
+        """Queue `backlog` ahead of what was broadcast meanwhile (see Connection.catch_up), then start sending"""
+        if not conn.closed:
+            conn.catch_up(
+                [(dumps(message).decode(), coalesce_key(message), message.get("seq")) for message in backlog],
+                covered_seq,
+            )
+        if conn._writer is None:
+            conn.start(self._remove)
+
+    def disconnect(self, conn: Connection) -> None:
+        conn.closed = True
+        if conn._writer is not None:
+            conn._writer.cancel()
+        self._remove(conn)
+
+    def _remove(self, conn: Connection) -> None:
+        conns = self.connections.get(conn.session_id)
+        if conns and conn in conns:
+            conns.remove(conn)
+            self.totals["disconnected"] += 1
+            self.totals["dropped"] += conn.stats["dropped"]
+            self.totals["coalesced"] += conn.stats["coalesced"]
+            if not conns:
+                del self.connections[conn.session_id]
+
+    def send(self, conn: Connection, message: Dict[str, Any]) -> bool:
+        """Queue a message for one client"""
+        return conn.offer(dumps(message).decode(), coalesce_key(message), message.get("seq"))
+
+    def broadcast(self, session_id: str, message: Dict[str, Any]) -> int:
+        """Queue `message` for every client of the session; returns how many took it"""
+        conns = self.connections.get(session_id)
+        if not conns:
+            return 0
+        text, key, seq = dumps(message).decode(), coalesce_key(message), message.get("seq")
+        return sum(conn.offer(text, key, seq) for conn in list(conns))
+
+    def has_clients(self, session_id: str) -> bool:
+        return bool(self.connections.get(session_id))
+
+    def stats(self) -> Dict[str, Any]:
+        clients = [conn.info() for conns in self.connections.values() for conn in conns]
+        return {
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "sessions": len(self.connections),
+            "clients": len(clients),
+            "totals": self.totals,
+            "max_lag_ms": max((c["max_lag_ms"] for c in clients), default=0.0),
+            "connections": clients,
+        }